@@ -10,8 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.contrib.messages import constants as message_constants
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -44,7 +48,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # CSS/JS com hash e comprimidos, servidos antes de sessão/autenticação (core/estaticos.py)
+    'core.middleware.EstaticosMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -76,12 +83,59 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Perfil escolhido por variável de ambiente:
+#   DB_PERFIL=sqlite   (padrão) instalação de um servidor só, SQLite em modo WAL
+#   DB_PERFIL=postgres produção com PostgreSQL e conexões persistentes ou pool
+
+DB_PERFIL = os.environ.get('DB_PERFIL', 'sqlite')
+
+if DB_PERFIL == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'advocacia'),
+            'USER': os.environ.get('POSTGRES_USER', 'advocacia'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            # Reaproveita a conexão entre requisições e confere se ainda está viva
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
     }
-}
+    if os.environ.get('DB_POOL_MAX'):
+        # Pool do psycopg 3 (psycopg[pool]); não combina com CONN_MAX_AGE
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN', '2')),
+            'max_size': int(os.environ['DB_POOL_MAX']),
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT', '10')),
+        }
+elif DB_PERFIL == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # WAL deixa leituras e a escrita acontecerem ao mesmo tempo; IMMEDIATE pega o
+                # lock de escrita no início da transação, em vez de falhar com "database is
+                # locked" ao tentar promover uma leitura para escrita
+                'transaction_mode': 'IMMEDIATE',
+                # Segundos esperando o lock antes de desistir (é o busy_timeout do SQLite)
+                'timeout': int(os.environ.get('SQLITE_TIMEOUT', '20')),
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    'PRAGMA temp_store=MEMORY;'
+                    'PRAGMA cache_size=-20000;'
+                    'PRAGMA mmap_size=134217728;'
+                ),
+            },
+        }
+    }
+else:
+    raise ImproperlyConfigured(f"DB_PERFIL inválido: {DB_PERFIL!r} (use 'sqlite' ou 'postgres').")
 
 
 # Password validation
@@ -108,7 +162,8 @@ AUTH_PASSWORD_VALIDATORS = [
 
 LANGUAGE_CODE = 'en-us'
 
-TIME_ZONE = 'UTC'
+# Datas exibidas e "hoje" dos documentos no horário de Brasília
+TIME_ZONE = 'America/Sao_Paulo'
 
 USE_I18N = True
 
@@ -119,6 +174,19 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+# Destino do collectstatic; em produção o app serve daqui com cache longo
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    # Nomes com hash do conteúdo + versões .gz/.br (core/estaticos.py)
+    'staticfiles': {'BACKEND': 'core.estaticos.ArmazenamentoEstatico'},
+}
+
+# Arquivos enviados (modelos .docx) e documentos gerados
+# MEDIA_ROOT na raiz do projeto mantém o caminho 'templates_docs/' dos modelos já cadastrados
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -128,4 +196,83 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Redirecionamento após Login/Logout
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'login' 
-LOGIN_URL = 'login' 
\ No newline at end of file
+LOGIN_URL = 'login'
+
+# Classes do Bootstrap para as mensagens (messages.error vira alert-danger)
+MESSAGE_TAGS = {
+    message_constants.ERROR: 'danger',
+}
+
+# Cache
+# Sem serviço externo: memória local para o que pode ficar por processo e
+# arquivo para o que precisa ser igual em todos os workers da máquina.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'advocacia',
+    },
+    # Totais do painel (core/painel.py): invalidados por signals em qualquer worker
+    'painel': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_PAINEL_DIR', BASE_DIR / 'cache' / 'painel'),
+    },
+    # Sessões e usuário logado (core/autenticacao.py). Em arquivo, não em memória:
+    # todos os workers da máquina enxergam o mesmo cache, então um logout ou uma
+    # troca de senha num processo vale nos outros. O FileBasedCache lista a pasta
+    # a cada gravação (só no login, em sessão alterada e quando o usuário expira)
+    'autenticacao': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_AUTENTICACAO_DIR', BASE_DIR / 'cache' / 'autenticacao'),
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+}
+
+CACHE_PAINEL_TIMEOUT = 300
+
+# Sessão lida do cache e gravada também no banco (sobrevive a limpar o cache)
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'autenticacao'
+
+# ModelBackend com o usuário da requisição em cache por CACHE_USUARIO_TIMEOUT
+# segundos. Sessões abertas com o backend anterior pedem um novo login.
+AUTHENTICATION_BACKENDS = ['core.autenticacao.BackendUsuarioEmCache']
+CACHE_USUARIO_TIMEOUT = 60
+
+# manage.py test: caches em arquivo numa pasta temporária (core/executor_testes.py)
+TEST_RUNNER = 'core.executor_testes.ExecutorTestes'
+
+# Fila de renderização de documentos (threads no próprio processo)
+FILA_DOCUMENTOS_WORKERS = 2
+# Depois disso um documento ainda "Na fila" é dado como perdido (processo reiniciado)
+FILA_DOCUMENTOS_TIMEOUT = 5 * 60
+
+# Conversão para PDF: pool de processos unoserver (LibreOffice headless) de vida
+# longa, um pool por processo do servidor. As portas são escolhidas pelo sistema
+# operacional; PDF_PORTA_INICIAL fixa PDF_PORTA_INICIAL + 2*i (XML-RPC) e a porta
+# seguinte (UNO), e só serve com um único processo. Sem o comando instalado, o PDF
+# é gerado em Python puro (pacote fpdf2).
+PDF_COMANDO = os.environ.get('PDF_COMANDO', 'unoserver')
+PDF_TAMANHO = int(os.environ.get('PDF_TAMANHO', 2))
+PDF_PORTA_INICIAL = int(os.environ.get('PDF_PORTA_INICIAL', 0)) or None
+PDF_TIMEOUT = 60
+
+# Views assíncronas (ASGI): threads para renderização de .docx/PDF e leitura de
+# arquivos. Limita quantas dessas tarefas rodam ao mesmo tempo por processo.
+ASYNC_THREADS_BLOQUEANTES = int(os.environ.get('ASYNC_THREADS_BLOQUEANTES', 8))
+
+# Métricas em /metrics (formato Prometheus). Acesso por
+# "Authorization: Bearer <METRICAS_TOKEN>" ou por usuários da equipe (is_staff).
+# METRICAS_IPS (separados por vírgula) libera IPs sem token; fica vazio por padrão:
+# atrás de um proxy reverso todo acesso chega como 127.0.0.1.
+METRICAS_IPS = [ip.strip() for ip in os.environ.get('METRICAS_IPS', '').split(',') if ip.strip()]
+METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN')
+
+# Perfilador por amostragem: desligado sem METRICAS_PERFIL_LIMITE_MS. Quando ligado,
+# amostra a pilha de METRICAS_PERFIL_FRACAO das requisições a cada
+# METRICAS_PERFIL_INTERVALO_MS e, se a requisição passar do limite, entrega as
+# pilhas ao METRICAS_PERFIL_HOOK (padrão: arquivo em METRICAS_PERFIL_PASTA).
+METRICAS_PERFIL_LIMITE_MS = int(os.environ.get('METRICAS_PERFIL_LIMITE_MS', 0)) or None
+METRICAS_PERFIL_FRACAO = float(os.environ.get('METRICAS_PERFIL_FRACAO', 0.1))
+METRICAS_PERFIL_INTERVALO_MS = 5
+METRICAS_PERFIL_HOOK = None
+METRICAS_PERFIL_PASTA = os.path.join(BASE_DIR, 'perfis')
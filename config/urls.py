@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.urls import path, include
-from core.views import home, cadastro  
+from core.views import home, cadastro, metricas
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', home, name='home'),
@@ -8,4 +8,5 @@ urlpatterns = [
     path('accounts/cadastro/', cadastro, name='cadastro'),
     path('clientes/', include('core.urls')),
     path('financeiro/', include('financeiro.urls')),
+    path('metrics', metricas, name='metricas'),
 ]
\ No newline at end of file
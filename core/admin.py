@@ -1,7 +1,99 @@
 from django.contrib import admin
-from .models import Cliente, ModeloDocumento, Documento
+from .busca import buscar_clientes
+from .forms import ModeloDocumentoForm
+from .models import Cliente, Documento, Escritorio, ModeloDocumento, PerfilUsuario
 
 
-admin.site.register(Cliente)
-admin.site.register(ModeloDocumento)
-admin.site.register(Documento)
\ No newline at end of file
+# ========================================================
+# ADMIN PARA TABELAS GRANDES
+# ========================================================
+# As listagens do admin precisam continuar rápidas com centenas de milhares de
+# linhas: FKs da lista vêm no mesmo SELECT (list_select_related), a busca é a
+# busca por prefixo de core/busca.py em vez de icontains (pelo índice quando há
+# filtro de escritório), o total sem filtro não é contado (show_full_result_count)
+# e as FKs do formulário são autocomplete em vez de um <select> com a tabela inteira.
+
+class BuscaClienteAdminMixin:
+    # Caminho até o cliente ('' no próprio Cliente, 'cliente' nos models ligados a ele)
+    campo_cliente = 'cliente'
+
+    def get_search_results(self, request, queryset, search_term):
+        termo = search_term.strip()
+        if not termo:
+            return queryset, False
+        if not self.campo_cliente:
+            return buscar_clientes(queryset, termo), False
+        clientes = buscar_clientes(Cliente.objects.all(), termo)
+        return queryset.filter(**{f'{self.campo_cliente}__in': clientes}), False
+
+
+class EscritorioDoClienteAdminMixin:
+    # O escritório é sempre o do cliente: não aparece no formulário e é acertado ao salvar
+
+    def get_readonly_fields(self, request, obj=None):
+        return (*super().get_readonly_fields(request, obj), 'escritorio')
+
+    def save_model(self, request, obj, form, change):
+        obj.escritorio_id = obj.cliente.escritorio_id
+        super().save_model(request, obj, form, change)
+
+
+class PerfilUsuarioInline(admin.TabularInline):
+    model = PerfilUsuario
+    extra = 0
+    autocomplete_fields = ('usuario',)
+
+
+@admin.register(Escritorio)
+class EscritorioAdmin(admin.ModelAdmin):
+    list_display = ('nome', 'criado_em')
+    search_fields = ('nome',)
+    inlines = [PerfilUsuarioInline]
+
+
+@admin.register(ModeloDocumento)
+class ModeloDocumentoAdmin(admin.ModelAdmin):
+    form = ModeloDocumentoForm
+    list_display = ('titulo', 'arquivo_template')
+    search_fields = ('titulo',)
+    readonly_fields = ('variaveis',)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Deixa o template pré-compilado em cache para a primeira geração
+        from .documentos import cache_templates
+        cache_templates.compilado(obj)
+
+
+@admin.register(Cliente)
+class ClienteAdmin(BuscaClienteAdminMixin, admin.ModelAdmin):
+    campo_cliente = ''
+    list_display = ('nome_completo', 'cpf_cnpj', 'contato', 'escritorio', 'ativo')
+    list_select_related = ('escritorio',)
+    list_filter = ('ativo', 'escritorio')
+    # Só habilita a caixa de busca e o autocomplete; a busca em si é a de core/busca.py
+    search_fields = ('nome_completo',)
+    search_help_text = "Início do nome, CPF/CNPJ ou contato"
+    autocomplete_fields = ('escritorio',)
+    show_full_result_count = False
+
+    def get_ordering(self, request):
+        # Em ordem alfabética só depois que a busca reduziu as linhas ('q' na lista,
+        # 'term' no autocomplete); sem termo, a ordem do índice da chave primária
+        if request.GET.get('q') or request.GET.get('term'):
+            return ('nome_busca', 'id')
+        return ('-id',)
+
+
+@admin.register(Documento)
+class DocumentoAdmin(BuscaClienteAdminMixin, EscritorioDoClienteAdminMixin, admin.ModelAdmin):
+    list_display = ('tipo', 'cliente', 'status', 'data_geracao', 'criado_por')
+    # Documento.__str__ lê o cliente
+    list_select_related = ('cliente', 'criado_por')
+    list_filter = ('status', 'modelo')
+    search_fields = ('cliente__nome_completo',)
+    search_help_text = "Início do nome, CPF/CNPJ ou contato do cliente"
+    date_hierarchy = 'data_geracao'
+    autocomplete_fields = ('cliente', 'modelo')
+    raw_id_fields = ('criado_por',)
+    show_full_result_count = False
@@ -0,0 +1,102 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, StreamingHttpResponse
+from django.shortcuts import render
+from django.utils.http import content_disposition_header
+
+
+# ========================================================
+# APOIO ÀS VIEWS ASSÍNCRONAS
+# ========================================================
+# Sob ASGI, as views de leitura rodam no event loop e só ocupam uma thread
+# enquanto fazem algo bloqueante. O trabalho pesado de .docx/PDF e a leitura de
+# arquivos vão para um pool de threads limitado (ASYNC_THREADS_BLOQUEANTES), para
+# que muitas requisições simultâneas não abram uma thread cada. ORM e render de
+# templates continuam no sync_to_async padrão (thread da própria requisição).
+
+TAMANHO_BLOCO = 64 * 1024
+
+_executor = None
+_lock = threading.Lock()
+
+
+def executor_bloqueante():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'ASYNC_THREADS_BLOQUEANTES', 8), thread_name_prefix='bloqueante'
+            )
+        return _executor
+
+
+async def em_thread(funcao, *args, **kwargs):
+    # Só para código que não usa o ORM: as threads do pool não são as da requisição
+    return await sync_to_async(funcao, thread_sensitive=False, executor=executor_bloqueante())(*args, **kwargs)
+
+
+async def arender(request, template, contexto=None):
+    # O context processor de auth lê request.user (síncrono); reaproveita o usuário
+    # já carregado pelo login_required em vez de buscá-lo de novo
+    request.user = await request.auser()
+    return await sync_to_async(render)(request, template, contexto)
+
+
+async def _ler_em_blocos(caminho):
+    arquivo = await em_thread(default_storage.open, caminho, 'rb')
+    try:
+        while bloco := await em_thread(arquivo.read, TAMANHO_BLOCO):
+            yield bloco
+    finally:
+        await em_thread(arquivo.close)
+
+
+def _proximo_bloco(iterador):
+    # Junta as partes (linhas do CSV, pedaços do ZIP) até TAMANHO_BLOCO: uma ida à
+    # thread por bloco, não por linha
+    partes, tamanho = [], 0
+    for parte in iterador:
+        partes.append(parte)
+        tamanho += len(parte)
+        if tamanho >= TAMANHO_BLOCO:
+            break
+    return partes[0][:0].join(partes) if partes else None
+
+
+async def _iterar_em_thread(iterador):
+    # O StreamingHttpResponse consome um iterador síncrono sob ASGI com
+    # sync_to_async(list): o arquivo inteiro ficaria em memória antes do primeiro
+    # byte. Aqui cada bloco é gerado na thread da requisição (o gerador usa o ORM)
+    # e enviado em seguida.
+    iterador = iter(iterador)
+    try:
+        while (bloco := await sync_to_async(_proximo_bloco)(iterador)) is not None:
+            yield bloco
+    finally:
+        if hasattr(iterador, 'close'):
+            await sync_to_async(iterador.close)()
+
+
+def resposta_gerada(request, iterador, nome, content_type):
+    # Download montado por um gerador síncrono (ZIP do lote, CSV de clientes)
+    if isinstance(request, ASGIRequest):
+        iterador = _iterar_em_thread(iterador)
+    response = StreamingHttpResponse(iterador, content_type=content_type)
+    response['Content-Disposition'] = content_disposition_header(True, nome)
+    return response
+
+
+async def resposta_arquivo(request, caminho, nome, content_type):
+    if not isinstance(request, ASGIRequest):
+        # Sob WSGI o próprio servidor envia o arquivo em blocos (wsgi.file_wrapper)
+        return FileResponse(default_storage.open(caminho, 'rb'), as_attachment=True, filename=nome, content_type=content_type)
+
+    response = StreamingHttpResponse(_ler_em_blocos(caminho), content_type=content_type)
+    response['Content-Length'] = await em_thread(default_storage.size, caminho)
+    response['Content-Disposition'] = content_disposition_header(True, nome)
+    return response
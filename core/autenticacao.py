@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.db import transaction
+
+
+# ========================================================
+# SESSÃO E USUÁRIO DA REQUISIÇÃO EM CACHE
+# ========================================================
+# Toda view com login lê a sessão e o auth_user antes de começar. A sessão usa o
+# backend cached_db (lê do cache, grava no cache e no banco) e o usuário vem
+# deste backend: o ModelBackend com o objeto guardado por CACHE_USUARIO_TIMEOUT
+# segundos no mesmo cache. Salvar ou excluir o usuário (troca de senha,
+# is_active, is_staff, is_superuser) apaga a entrada (ver core/signals.py).
+# As permissões de grupo/usuário não entram no cache: o ModelBackend as consulta
+# quando precisa e guarda só no objeto da requisição. Um update() em lote na
+# tabela de usuários não dispara signals e passa a valer quando o TTL expira.
+
+
+def cache_autenticacao():
+    return caches[settings.SESSION_CACHE_ALIAS]
+
+
+def chave_usuario(usuario_id):
+    return f'usuario:{usuario_id}'
+
+
+def invalidar_usuario(*ids):
+    chaves = [chave_usuario(usuario_id) for usuario_id in ids]
+    cache_autenticacao().delete_many(chaves)
+    # De novo no commit: outra requisição pode ter lido a linha antiga nesse meio-tempo
+    transaction.on_commit(lambda: cache_autenticacao().delete_many(chaves))
+
+
+class BackendUsuarioEmCache(ModelBackend):
+
+    def get_user(self, user_id):
+        cache = cache_autenticacao()
+        usuario = cache.get(chave_usuario(user_id))
+        if usuario is None:
+            usuario = super().get_user(user_id)
+            if usuario is not None:
+                cache.set(chave_usuario(user_id), usuario, getattr(settings, 'CACHE_USUARIO_TIMEOUT', 60))
+        return usuario
+
+    async def aget_user(self, user_id):
+        # Usado pelo request.auser() das views assíncronas
+        cache = cache_autenticacao()
+        usuario = await cache.aget(chave_usuario(user_id))
+        if usuario is None:
+            usuario = await super().aget_user(user_id)
+            if usuario is not None:
+                await cache.aset(chave_usuario(user_id), usuario, getattr(settings, 'CACHE_USUARIO_TIMEOUT', 60))
+        return usuario
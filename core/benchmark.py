@@ -0,0 +1,128 @@
+import math
+import os
+import statistics
+import tempfile
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from django.db import connection, connections
+
+from financeiro.models import Honorario
+from financeiro.relatorios import recalcular_resumo
+
+from .models import Cliente, Documento, ModeloDocumento
+
+
+# ========================================================
+# SEMENTES PARA TESTES E BENCHMARKS
+# ========================================================
+# Gera clientes, documentos e honorários em blocos de bulk_create, para caber
+# 1 milhão de clientes sem montar tudo em memória. Os dados seguem um padrão
+# fixo (1 em cada 10 clientes inativo, status PEN/PAG/CAN alternados) para que
+# as medições sejam comparáveis entre execuções.
+
+TEMPLATE_BENCHMARK = 'templates_docs/ProcuraçãoJudicialExtra.docx'
+
+
+def _novo_cliente(escritorio_id, i):
+    cliente = Cliente(
+        escritorio_id=escritorio_id, nome_completo=f'Cliente {i:06d}', estado_civil='S', cpf_cnpj=f'{i:011d}',
+        endereco='Rua A', numero=str(i), cep='40000-000', profissao='Autônomo',
+        contato=f'(71) 9{i:08d}', ativo=(i % 10 != 0),
+    )
+    cliente.atualizar_busca()
+    return cliente
+
+
+def semear(usuario, clientes, honorarios_por_cliente=1, documentos_por_cliente=1, lote=5000, modelo=None):
+    # Tudo vai para o escritório do usuário
+    if modelo is None:
+        modelo = ModeloDocumento.objects.create(titulo='Procuração', arquivo_template=TEMPLATE_BENCHMARK)
+    escritorio_id = usuario.perfil.escritorio_id
+    hoje = date.today()
+    for inicio in range(0, clientes, lote):
+        criados = Cliente.objects.bulk_create([
+            _novo_cliente(escritorio_id, i) for i in range(inicio, min(inicio + lote, clientes))
+        ])
+        if criados[0].pk is None:
+            # Banco sem RETURNING no INSERT em lote: busca os ids recém-criados
+            criados = list(Cliente.objects.order_by('-id')[:len(criados)])[::-1]
+
+        Documento.objects.bulk_create([
+            Documento(escritorio_id=escritorio_id, cliente=cliente, modelo=modelo, tipo=modelo.titulo, criado_por=usuario)
+            for cliente in criados
+            for _ in range(documentos_por_cliente)
+        ])
+        Honorario.objects.bulk_create([
+            Honorario(
+                escritorio_id=escritorio_id, cliente=cliente, descricao='Honorários', valor=100 + i,
+                data_vencimento=hoje + timedelta(days=i % 365), status=('PEN', 'PAG', 'CAN')[i % 3],
+            )
+            for i, cliente in enumerate(criados, start=inicio)
+            for _ in range(honorarios_por_cliente)
+        ])
+    recalcular_resumo(escritorios=[escritorio_id])
+    return modelo
+
+
+@contextmanager
+def banco_descartavel(opcoes_sqlite=None):
+    # Cria um banco de teste (nunca toca o banco real) e o remove no fim
+    configuracao = connection.settings_dict
+    if connection.vendor == 'sqlite':
+        if opcoes_sqlite is not None:
+            configuracao['OPTIONS'] = opcoes_sqlite
+        # Banco em arquivo: em memória cada conexão (thread) veria um banco diferente
+        arquivo_sqlite = os.path.join(tempfile.mkdtemp(), 'benchmark.sqlite3')
+        configuracao['TEST'] = {**configuracao.get('TEST', {}), 'NAME': arquivo_sqlite}
+
+    nome_original = configuracao['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connections.close_all()
+        connection.creation.destroy_test_db(nome_original, verbosity=0)
+
+
+# ========================================================
+# ESTATÍSTICAS E COMPARAÇÃO ENTRE VERSÕES
+# ========================================================
+
+def percentil(ordenados, fracao):
+    return ordenados[max(math.ceil(len(ordenados) * fracao) - 1, 0)]
+
+
+def resumir(latencias):
+    # Latências em segundos -> resumo em milissegundos
+    ordenados = sorted(latencias)
+    return {
+        'amostras': len(ordenados),
+        'media_ms': round(statistics.fmean(ordenados) * 1000, 2),
+        'p50_ms': round(statistics.median(ordenados) * 1000, 2),
+        'p95_ms': round(percentil(ordenados, 0.95) * 1000, 2),
+        'p99_ms': round(percentil(ordenados, 0.99) * 1000, 2),
+        'max_ms': round(ordenados[-1] * 1000, 2),
+    }
+
+
+def comparar(anterior, atual, tolerancia=0.2):
+    # Devolve [(item, métrica, antes, depois, variação, regrediu)]. Latência pior
+    # é subir; vazão pior é cair. Só conta como regressão acima da tolerância.
+    linhas = []
+    for nome, resumo in atual.get('cenarios', {}).items():
+        antes = anterior.get('cenarios', {}).get(nome)
+        if not antes:
+            continue
+        for metrica in ('p50_ms', 'p95_ms', 'queries'):
+            if antes.get(metrica) and metrica in resumo:
+                variacao = (resumo[metrica] - antes[metrica]) / antes[metrica]
+                linhas.append((nome, metrica, antes[metrica], resumo[metrica], variacao, variacao > tolerancia))
+
+    carga, carga_antes = atual.get('carga'), anterior.get('carga')
+    # Vazão só é comparável com a mesma interface (wsgi x asgi)
+    if carga and carga_antes and carga_antes.get('interface') == carga['interface']:
+        antes, depois = carga_antes['requisicoes_por_segundo'], carga['requisicoes_por_segundo']
+        variacao = (depois - antes) / antes
+        linhas.append(('carga', 'requisicoes_por_segundo', antes, depois, variacao, variacao < -tolerancia))
+    return linhas
@@ -0,0 +1,59 @@
+import re
+import unicodedata
+
+from django.db.models import Q
+
+
+# ========================================================
+# BUSCA DE CLIENTES
+# ========================================================
+# Nome, CPF/CNPJ e contato são gravados normalizados (sem acento, minúsculo,
+# só dígitos no documento) em colunas indexadas. A busca por prefixo vira um
+# intervalo [termo, termo + '\uffff') nessas colunas, que o banco resolve pelo índice.
+# O nome também casa pelo início de qualquer palavra (sobrenome): " termo" em
+# qualquer posição. Isso não usa o intervalo; o banco percorre as entradas do
+# índice (escritorio, nome_busca) do escritório, sem ler a tabela.
+
+TAMANHO_MINIMO_TERMO = 2
+
+
+def normalizar_texto(valor):
+    valor = unicodedata.normalize('NFKD', valor or '')
+    valor = ''.join(c for c in valor if not unicodedata.combining(c))
+    return ' '.join(valor.lower().split())
+
+
+def somente_digitos(valor):
+    return re.sub(r'\D', '', valor or '')
+
+
+def normalizar_contato(valor):
+    # Telefone vira só dígitos; e-mail (ou qualquer coisa com letras) fica como texto
+    if re.search(r'[^\W\d_]', valor or ''):
+        return normalizar_texto(valor)
+    return somente_digitos(valor)
+
+
+def _prefixo(campo, termo):
+    return Q(**{f'{campo}__gte': termo, f'{campo}__lt': termo + '\uffff'})
+
+
+def filtro_busca(termo):
+    texto = normalizar_texto(termo)
+    digitos = somente_digitos(termo)
+    if len(texto) < TAMANHO_MINIMO_TERMO:
+        return None
+
+    filtro = (
+        _prefixo('nome_busca', texto) | Q(nome_busca__contains=' ' + texto) | _prefixo('contato_busca', texto)
+    )
+    if len(digitos) >= TAMANHO_MINIMO_TERMO:
+        filtro |= _prefixo('documento_busca', digitos) | _prefixo('contato_busca', digitos)
+    return filtro
+
+
+def buscar_clientes(queryset, termo):
+    filtro = filtro_busca(termo)
+    if filtro is None:
+        return queryset.none()
+    return queryset.filter(filtro)
@@ -0,0 +1,126 @@
+import hashlib
+import os
+from calendar import timegm
+from functools import lru_cache, wraps
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.contrib.messages.storage.session import SessionStorage
+from django.db.models import Count, Max, Value
+from django.middleware.csrf import get_token
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .escritorios import aescritorio_da_requisicao
+
+
+# ========================================================
+# GET CONDICIONAL (ETag / Last-Modified)
+# ========================================================
+# Antes da consulta da página e do render, a view calcula uma impressão digital
+# barata do que mostra: max(atualizado_em) + quantidade de linhas do escritório
+# (a contagem pega as exclusões), numa consulta que só lê o índice
+# (escritorio, atualizado_em). Se o navegador já tem essa versão (If-None-Match /
+# If-Modified-Since), a resposta é um 304 sem corpo.
+# O ETag leva também o usuário, o segredo do CSRF (formulários da página), a data
+# (o rodapé mostra o ano; os documentos, a data por extenso) e a versão do código.
+# Com mensagens pendentes a página é sempre renderizada, para exibi-las.
+
+EXTENSOES_VERSAO = ('.py', '.html', '.css', '.js')
+
+
+@lru_cache(maxsize=1)
+def versao_aplicacao():
+    # Pelo conteúdo, não pelo mtime: igual em todos os servidores do mesmo deploy
+    pastas = [app.path for app in apps.get_app_configs() if app.path.startswith(str(settings.BASE_DIR))]
+    for configuracao in settings.TEMPLATES:
+        pastas.extend(str(pasta) for pasta in configuracao.get('DIRS', []))
+
+    hasher = hashlib.sha256()
+    for pasta in sorted(pastas):
+        for raiz, subpastas, arquivos in os.walk(pasta):
+            subpastas[:] = sorted(nome for nome in subpastas if nome != '__pycache__')
+            for nome in sorted(arquivos):
+                if nome.endswith(EXTENSOES_VERSAO):
+                    caminho = os.path.join(raiz, nome)
+                    hasher.update(caminho[len(pasta):].encode())
+                    with open(caminho, 'rb') as arquivo:
+                        hasher.update(arquivo.read())
+    return hasher.hexdigest()[:16]
+
+
+async def aetag(request, *partes):
+    usuario = await request.auser()
+    # get_token cria o segredo já no primeiro acesso (senão só o render criaria, e o
+    # ETag mudaria na segunda visita)
+    get_token(request)
+    bruto = '|'.join(str(parte) for parte in (
+        versao_aplicacao(), usuario.pk, request.META['CSRF_COOKIE'], timezone.localdate(), *partes
+    ))
+    return quote_etag(hashlib.sha256(bruto.encode()).hexdigest()[:32])
+
+
+async def atem_mensagens(request):
+    # Sem carregar as mensagens (o que as marcaria como lidas)
+    return CookieStorage.cookie_name in request.COOKIES or await request.session.ahas_key(SessionStorage.session_key)
+
+
+async def aimpressao(escritorio_id, *modelos):
+    # [(último atualizado_em, total)] de cada model no escritório, numa consulta só
+    # (UNION ALL), e a alteração mais recente entre eles
+    consultas = [
+        modelo.objects.do_escritorio(escritorio_id).order_by().values('escritorio')
+        .annotate(ordem=Value(indice), ultimo=Max('atualizado_em'), total=Count('id'))
+        .values_list('ordem', 'ultimo', 'total')
+        for indice, modelo in enumerate(modelos)
+    ]
+    consulta = consultas[0].union(*consultas[1:], all=True) if len(consultas) > 1 else consultas[0]
+    # Escritório sem linhas num dos models: o GROUP BY não devolve nada para ele
+    encontrados = {ordem: (ultimo, total) async for ordem, ultimo, total in consulta}
+    partes = [encontrados.get(indice, (None, 0)) for indice in range(len(modelos))]
+    datas = [ultimo for ultimo, _ in partes if ultimo is not None]
+    return partes, max(datas) if datas else None
+
+
+def resposta_nao_modificada(request, etag, modificado_em=None):
+    # 304 se o navegador já tem esta versão; None para seguir com a view
+    ultima = timegm(modificado_em.utctimetuple()) if modificado_em else None
+    resposta = get_conditional_response(request, etag=etag, last_modified=ultima)
+    if resposta is not None:
+        marcar_condicional(resposta, etag, modificado_em)
+    return resposta
+
+
+def marcar_condicional(resposta, etag, modificado_em=None):
+    resposta['ETag'] = etag
+    if modificado_em:
+        resposta['Last-Modified'] = http_date(timegm(modificado_em.utctimetuple()))
+    # Dados do escritório: só no navegador do usuário, que revalida a cada acesso
+    patch_cache_control(resposta, private=True, no_cache=True)
+    return resposta
+
+
+def condicional(*modelos):
+    # Para as listagens assíncronas: @condicional(Documento, Cliente) usa a impressão
+    # digital dos documentos e dos clientes do escritório (a lista mostra o nome deles)
+    def decorador(view):
+        @wraps(view)
+        async def interna(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await view(request, *args, **kwargs)
+            escritorio_id = await aescritorio_da_requisicao(request)
+            if await atem_mensagens(request):
+                return await view(request, *args, **kwargs)
+
+            partes, modificado_em = await aimpressao(escritorio_id, *modelos)
+            etag = await aetag(request, *partes)
+            resposta = resposta_nao_modificada(request, etag, modificado_em)
+            if resposta is None:
+                resposta = await view(request, *args, **kwargs)
+                if resposta.status_code == 200:
+                    marcar_condicional(resposta, etag, modificado_em)
+            return resposta
+        return interna
+    return decorador
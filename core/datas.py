@@ -0,0 +1,47 @@
+from datetime import datetime
+
+from django.utils import timezone
+
+
+# ========================================================
+# DATAS EM PORTUGUÊS (SEM LOCALE DO SISTEMA)
+# ========================================================
+# strftime("%B") depende do locale do processo, que é global (não é seguro com
+# threads) e nem sempre existe no servidor. Os nomes dos meses ficam aqui e a
+# formatação é só montagem de string, igual em qualquer máquina.
+
+MESES = (
+    'janeiro', 'fevereiro', 'março', 'abril', 'maio', 'junho',
+    'julho', 'agosto', 'setembro', 'outubro', 'novembro', 'dezembro',
+)
+
+
+def _local(valor):
+    # datetime com fuso vira horário local (TIME_ZONE); date passa direto
+    if isinstance(valor, datetime) and timezone.is_aware(valor):
+        return timezone.localtime(valor)
+    return valor
+
+
+def data_curta(valor):
+    valor = _local(valor)
+    return f"{valor.day:02d}/{valor.month:02d}/{valor.year:04d}"
+
+
+def data_hora(valor, com_ano=True):
+    valor = _local(valor)
+    data = data_curta(valor) if com_ano else f"{valor.day:02d}/{valor.month:02d}"
+    return f"{data} {valor.hour:02d}:{valor.minute:02d}"
+
+
+def data_por_extenso(valor):
+    valor = _local(valor)
+    return f"{valor.day:02d} de {MESES[valor.month - 1]} de {valor.year}"
+
+
+def mes_ano(valor):
+    return f"{MESES[valor.month - 1]}/{valor.year}"
+
+
+def hoje_por_extenso():
+    return data_por_extenso(timezone.localdate())
@@ -0,0 +1,387 @@
+import copy
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from docx import Document
+from docxtpl import DocxTemplate
+from jinja2 import Environment, TemplateSyntaxError, meta
+
+from .datas import data_curta, hoje_por_extenso
+from .metricas import ETAPAS_DOCUMENTO, cronometro
+from .models import Documento
+from .painel import invalidar_painel
+
+
+# ========================================================
+# PRÉ-COMPILAÇÃO DE TEMPLATES .DOCX
+# ========================================================
+# A cada render, o docxtpl extrai o XML do documento, roda uma série de regex de
+# limpeza (patch_xml) e compila o resultado como template Jinja. Nada disso depende
+# do cliente: fazemos uma vez por versão do arquivo e guardamos o documento
+# parseado, os templates Jinja já compilados (corpo, cabeçalhos e rodapés) e o
+# conjunto de variáveis usadas. Cada render recebe só uma cópia do documento.
+# Notas de rodapé e propriedades do arquivo (título, autor...) o próprio docxtpl
+# renderiza a cada render(): não são pré-compiladas, mas as tags delas entram nas
+# variáveis. Notas de fim o docxtpl não renderiza; tag nelas é recusada no upload.
+
+CONTENT_TYPE_NOTAS_RODAPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.footnotes+xml'
+CONTENT_TYPE_NOTAS_FIM = 'application/vnd.openxmlformats-officedocument.wordprocessingml.endnotes+xml'
+# As propriedades que o DocxTemplate.render_properties renderiza
+PROPRIEDADES_RENDERIZADAS = ('author', 'comments', 'identifier', 'language', 'subject', 'title')
+
+class ErroTemplate(Exception):
+    pass
+
+
+class TemplateCompilado:
+
+    def __init__(self, documento, corpo, partes, variaveis):
+        self.documento = documento
+        self.corpo = corpo
+        self.partes = partes  # relKey do cabeçalho/rodapé -> (template Jinja, encoding)
+        self.variaveis = variaveis
+
+
+def _compilar_xml(ambiente, xml):
+    # Mesmo pré-processamento que o DocxTemplate.render_xml_part faz antes do Jinja
+    return ambiente.from_string(re.sub(r"<w:p([ >])", r"\n<w:p\1", xml))
+
+
+def compilar_template(arquivo):
+    # Aceita caminho ou arquivo aberto (upload). Levanta ErroTemplate se o Jinja não entender o modelo.
+    try:
+        template = DocxTemplate(arquivo)
+        template.docx = Document(arquivo)
+    except Exception as erro:
+        raise ErroTemplate(f"Arquivo .docx inválido: {erro}")
+
+    ambiente = Environment()
+    fontes = {'corpo': (template.patch_xml(template.get_xml()), None)}
+    for uri in (template.HEADER_URI, template.FOOTER_URI):
+        for rel_key, parte in template.get_headers_footers(uri):
+            xml = template.get_part_xml(parte)
+            fontes[rel_key] = (template.patch_xml(xml), template.get_headers_footers_encoding(xml))
+
+    renderizados_pelo_docxtpl = [getattr(template.docx.core_properties, nome) or '' for nome in PROPRIEDADES_RENDERIZADAS]
+    for parte in template.docx.part.package.parts:
+        if parte.content_type == CONTENT_TYPE_NOTAS_RODAPE:
+            renderizados_pelo_docxtpl.append(template.patch_xml(parte.blob.decode('utf-8')))
+        elif parte.content_type == CONTENT_TYPE_NOTAS_FIM and re.search(r'\{[{%]', template.patch_xml(parte.blob.decode('utf-8'))):
+            raise ErroTemplate("Tags em notas de fim não são suportadas. Use o corpo ou as notas de rodapé.")
+
+    variaveis = set()
+    compilados = {}
+    try:
+        for chave, (xml, encoding) in fontes.items():
+            variaveis |= meta.find_undeclared_variables(ambiente.parse(xml))
+            compilados[chave] = (_compilar_xml(ambiente, xml), encoding)
+        for texto in renderizados_pelo_docxtpl:
+            variaveis |= meta.find_undeclared_variables(ambiente.parse(texto))
+    except TemplateSyntaxError as erro:
+        raise ErroTemplate(f"Tag mal formada no modelo (linha {erro.lineno}): {erro.message}")
+
+    corpo, _ = compilados.pop('corpo')
+    return TemplateCompilado(template.docx, corpo, compilados, frozenset(variaveis))
+
+
+def validar_variaveis(variaveis):
+    desconhecidas = set(variaveis) - set(CAMPOS_CONTEXTO)
+    if desconhecidas:
+        raise ErroTemplate("Tags desconhecidas no modelo: " + ", ".join(sorted(desconhecidas)))
+
+
+class DocxPrecompilado(DocxTemplate):
+    # Renderiza a partir do TemplateCompilado: pula get_xml/patch_xml/compilação do Jinja
+
+    def __init__(self, caminho, compilado):
+        super().__init__(caminho)
+        self.docx = copy.deepcopy(compilado.documento)
+        self._compilado = compilado
+
+    def _renderizar(self, template, parte, contexto):
+        self.current_rendering_part = parte
+        xml = template.render(contexto)
+        xml = re.sub(r"\n<w:p([ >])", r"<w:p\1", xml)
+        xml = xml.replace("{_{", "{{").replace("}_}", "}}").replace("{_%", "{%").replace("%_}", "%}")
+        return self.resolve_listing(xml)
+
+    def build_xml(self, context, jinja_env=None):
+        return self._renderizar(self._compilado.corpo, self.docx._part, context)
+
+    def build_headers_footers_xml(self, context, uri, jinja_env=None):
+        for rel_key, parte in self.get_headers_footers(uri):
+            template, encoding = self._compilado.partes[rel_key]
+            yield rel_key, self._renderizar(template, parte, context).encode(encoding)
+
+
+# ========================================================
+# CACHE DE TEMPLATES .DOCX (POR PROCESSO)
+# ========================================================
+
+TAMANHO_MAXIMO_PADRAO = 64 * 1024 * 1024  # 64 MB de arquivos .docx em memória
+
+
+class CacheTemplates:
+
+    def __init__(self, tamanho_maximo=None):
+        self.tamanho_maximo = tamanho_maximo
+        self._entradas = OrderedDict()
+        self._tamanho_total = 0
+        self._lock = threading.Lock()
+
+    def _limite(self):
+        if self.tamanho_maximo is not None:
+            return self.tamanho_maximo
+        return getattr(settings, 'CACHE_TEMPLATES_DOCX_MAX_BYTES', TAMANHO_MAXIMO_PADRAO)
+
+    def compilado(self, modelo):
+        caminho = modelo.arquivo_template.path
+        info = os.stat(caminho)
+        # A chave inclui mtime e tamanho: se o arquivo for trocado no disco, o cache expira sozinho
+        assinatura = versao_template(modelo, info)
+
+        with self._lock:
+            entrada = self._entradas.get(modelo.pk)
+            if entrada and entrada[0] == assinatura:
+                self._entradas.move_to_end(modelo.pk)
+                return entrada[1]
+
+        compilado = compilar_template(caminho)
+        self._guardar(modelo.pk, assinatura, compilado, info.st_size)
+        return compilado
+
+    def obter(self, modelo):
+        return DocxPrecompilado(modelo.arquivo_template.path, self.compilado(modelo))
+
+    def _guardar(self, chave, assinatura, compilado, tamanho):
+        with self._lock:
+            self._remover(chave)
+            if tamanho > self._limite():
+                return
+            self._entradas[chave] = (assinatura, compilado, tamanho)
+            self._tamanho_total += tamanho
+            # LRU: descarta os menos usados até caber no limite
+            while self._tamanho_total > self._limite():
+                antiga = next(iter(self._entradas))
+                self._remover(antiga)
+
+    def _remover(self, chave):
+        entrada = self._entradas.pop(chave, None)
+        if entrada:
+            self._tamanho_total -= entrada[2]
+
+    def invalidar(self, chave):
+        with self._lock:
+            self._remover(chave)
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._tamanho_total = 0
+
+
+cache_templates = CacheTemplates()
+
+
+def versao_template(modelo, info=None):
+    caminho = modelo.arquivo_template.path
+    info = info or os.stat(caminho)
+    return (caminho, info.st_mtime_ns, info.st_size)
+
+
+def carregar_template(modelo):
+    return cache_templates.obter(modelo)
+
+
+# ========================================================
+# CONTEXTO E RENDERIZAÇÃO
+# ========================================================
+
+CONTENT_TYPE_DOCX = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+
+def _sufixo(cliente):
+    # Lógica de Gênero
+    return 'a' if cliente.sexo == 'F' else 'o'
+
+
+def _rg_tag(cliente):
+    # Frase completa do RG, ou vazio quando não há RG
+    if not cliente.rg:
+        return ""
+    return f", portador{_sufixo(cliente)} da cédula de identidade RG nº {cliente.rg} {cliente.orgao_expeditor}"
+
+
+# Tag do Word -> como calcular a partir do cliente. Só as tags que o modelo usa são calculadas.
+CAMPOS_CONTEXTO = {
+    'nome': lambda cliente: cliente.nome_completo,
+    'nacionalidade': lambda cliente: f"brasileir{_sufixo(cliente)}",
+    'estado_civil': lambda cliente: cliente.get_estado_civil_display().lower(),
+    'deficiente_tag': lambda cliente: ", deficiente" if cliente.eh_deficiente else "",
+    'nascido_tag': lambda cliente: f"nascid{_sufixo(cliente)}",
+    'data_nasc': lambda cliente: data_curta(cliente.data_nascimento) if cliente.data_nascimento else "XX/XX/XXXX",
+    'rg_tag': _rg_tag,
+    'cpf': lambda cliente: cliente.cpf_cnpj,
+    'rua': lambda cliente: cliente.endereco,
+    'num': lambda cliente: cliente.numero,
+    'bairro': lambda cliente: cliente.bairro,
+    'cidade': lambda cliente: cliente.cidade,
+    'cep': lambda cliente: cliente.cep,
+    'telefone': lambda cliente: cliente.contato,
+    'profissao': lambda cliente: cliente.profissao,
+    'hoje': lambda cliente: hoje_por_extenso(),
+}
+
+
+def montar_contexto(cliente, variaveis=None):
+    # Sem lista de variáveis monta o contexto completo
+    if variaveis is None:
+        variaveis = CAMPOS_CONTEXTO
+    validar_variaveis(variaveis)
+    return {chave: CAMPOS_CONTEXTO[chave](cliente) for chave in variaveis}
+
+
+def nome_arquivo(cliente, modelo):
+    return f"{cliente.nome_completo}_{modelo.titulo}.docx"
+
+
+# ========================================================
+# ARMAZENAMENTO ENDEREÇADO POR CONTEÚDO
+# ========================================================
+# O arquivo gerado é identificado pelo hash de (versão do template, contexto).
+# Se nada mudou no cliente nem no modelo, o .docx já está no disco e é reaproveitado.
+# Como "existe no storage" significa "pronto para servir", a gravação é atômica:
+# o conteúdo vai para um nome temporário na mesma pasta e só então é renomeado.
+
+PASTA_GERADOS = 'documentos_gerados'
+
+
+def hash_documento(modelo, contexto):
+    chave = json.dumps({'template': versao_template(modelo), 'contexto': contexto}, sort_keys=True, default=str)
+    return hashlib.sha256(chave.encode('utf-8')).hexdigest()
+
+
+def caminho_gerado(hash_conteudo):
+    return f"{PASTA_GERADOS}/{hash_conteudo[:2]}/{hash_conteudo}.docx"
+
+
+def gravar_atomico(caminho, dados):
+    # Só para o FileSystemStorage (default_storage.path). Duas gravações simultâneas do
+    # mesmo hash têm os mesmos bytes: a última a renomear vence e ninguém lê pela metade
+    destino = default_storage.path(caminho)
+    pasta = os.path.dirname(destino)
+    os.makedirs(pasta, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=pasta, prefix='.gravando-')
+    try:
+        with os.fdopen(descritor, 'wb') as arquivo:
+            arquivo.write(dados)
+        if default_storage.file_permissions_mode is not None:
+            os.chmod(temporario, default_storage.file_permissions_mode)
+        os.replace(temporario, destino)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+def obter_documento_gerado(modelo, cliente):
+    # Devolve (caminho no storage, hash), renderizando só quando o arquivo ainda não existe
+    # Etapas medidas em documento_etapa_segundos: carregar (template compilado + contexto),
+    # renderizar e salvar (as duas últimas só quando o arquivo ainda não existe)
+    with cronometro(ETAPAS_DOCUMENTO, etapa='carregar'):
+        compilado = cache_templates.compilado(modelo)
+        contexto = montar_contexto(cliente, compilado.variaveis)
+        hash_conteudo = hash_documento(modelo, contexto)
+        caminho = caminho_gerado(hash_conteudo)
+
+    if not default_storage.exists(caminho):
+        with cronometro(ETAPAS_DOCUMENTO, etapa='renderizar'):
+            doc = DocxPrecompilado(modelo.arquivo_template.path, compilado)
+            doc.render(contexto)
+        with cronometro(ETAPAS_DOCUMENTO, etapa='salvar'):
+            buffer = io.BytesIO()
+            doc.save(buffer)
+            gravar_atomico(caminho, buffer.getvalue())
+
+    return caminho, hash_conteudo
+
+
+# ========================================================
+# GERAÇÃO EM LOTE (ZIP EM STREAMING)
+# ========================================================
+
+WORKERS_LOTE_PADRAO = 4
+
+
+def renderizar_em_lote(pares, max_workers=None):
+    # Gera os pares (cliente, modelo) num pool de threads e devolve (cliente, modelo, caminho, hash) na ordem de entrada.
+    # Só mantém uma janela de tarefas em andamento, para não acumular o lote inteiro em memória.
+    max_workers = max_workers or getattr(settings, 'DOCUMENTOS_LOTE_WORKERS', WORKERS_LOTE_PADRAO)
+    pendentes = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for cliente, modelo in pares:
+            pendentes.append((cliente, modelo, pool.submit(obter_documento_gerado, modelo, cliente)))
+            if len(pendentes) >= max_workers * 2:
+                cliente_pronto, modelo_pronto, futuro = pendentes.popleft()
+                yield (cliente_pronto, modelo_pronto, *futuro.result())
+        while pendentes:
+            cliente_pronto, modelo_pronto, futuro = pendentes.popleft()
+            yield (cliente_pronto, modelo_pronto, *futuro.result())
+
+
+class _SaidaZip:
+    # Arquivo "só escrita" e sem seek: o zipfile grava cada entrada com data descriptor
+    # e nós repassamos os bytes assim que ficam prontos.
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def consumir(self):
+        dados = b''.join(self._partes)
+        self._partes.clear()
+        return dados
+
+
+def gerar_zip_lote(clientes, modelos, usuario, max_workers=None):
+    pares = [(cliente, modelo) for cliente in clientes for modelo in modelos]
+    saida = _SaidaZip()
+    gerados = []
+
+    with zipfile.ZipFile(saida, 'w', compression=zipfile.ZIP_DEFLATED) as arquivo_zip:
+        for cliente, modelo, caminho, hash_conteudo in renderizar_em_lote(pares, max_workers):
+            # Uma pasta por cliente evita colisão entre homônimos
+            pasta = f"{cliente.id} - {cliente.nome_completo}"
+            with default_storage.open(caminho, 'rb') as origem, \
+                    arquivo_zip.open(f"{pasta}/{nome_arquivo(cliente, modelo)}", 'w') as destino:
+                shutil.copyfileobj(origem, destino)
+            gerados.append(Documento(
+                escritorio_id=cliente.escritorio_id, cliente=cliente, modelo=modelo, tipo=modelo.titulo, criado_por=usuario,
+                arquivo_gerado=caminho, hash_conteudo=hash_conteudo
+            ))
+            yield saida.consumir()
+    yield saida.consumir()
+
+    # Os registros só entram depois do último byte: um download interrompido (o
+    # navegador desconectou e o servidor fechou o gerador) não deixa Documento
+    # nenhum. Os .docx já renderizados ficam no disco e a próxima tentativa os reaproveita.
+    Documento.objects.bulk_create(gerados)
+    # bulk_create não dispara signals
+    invalidar_painel(*{documento.escritorio_id for documento in gerados})
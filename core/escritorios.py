@@ -0,0 +1,46 @@
+from asgiref.sync import sync_to_async
+from django.db import transaction
+
+from .models import Escritorio, PerfilUsuario
+
+
+# ========================================================
+# ESCRITÓRIO DA REQUISIÇÃO
+# ========================================================
+# O id do escritório do usuário vai para a sessão no login, então as views
+# filtram por ele sem nenhuma consulta a mais (a sessão já é lida para saber
+# quem é o usuário). Sessões anteriores a isso buscam uma vez e guardam.
+# Se um usuário mudar de escritório no admin, vale no próximo login.
+
+CHAVE_SESSAO = 'escritorio_id'
+
+
+def escritorio_do_usuario(usuario):
+    escritorio_id = PerfilUsuario.objects.filter(usuario=usuario).values_list('escritorio_id', flat=True).first()
+    if escritorio_id is None:
+        escritorio_id = criar_escritorio_pessoal(usuario).pk
+    return escritorio_id
+
+
+def criar_escritorio_pessoal(usuario):
+    # Usuário novo (cadastro, createsuperuser) começa com um escritório só dele
+    with transaction.atomic():
+        escritorio = Escritorio.objects.create(nome=f"Escritório de {usuario.get_username()}")
+        PerfilUsuario.objects.create(usuario=usuario, escritorio=escritorio)
+    return escritorio
+
+
+def escritorio_da_requisicao(request):
+    escritorio_id = request.session.get(CHAVE_SESSAO)
+    if escritorio_id is None:
+        escritorio_id = escritorio_do_usuario(request.user)
+        request.session[CHAVE_SESSAO] = escritorio_id
+    return escritorio_id
+
+
+async def aescritorio_da_requisicao(request):
+    escritorio_id = await request.session.aget(CHAVE_SESSAO)
+    if escritorio_id is None:
+        escritorio_id = await sync_to_async(escritorio_do_usuario)(await request.auser())
+        await request.session.aset(CHAVE_SESSAO, escritorio_id)
+    return escritorio_id
@@ -0,0 +1,118 @@
+import gzip
+import mimetypes
+import os
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# ========================================================
+# ARQUIVOS ESTÁTICOS (CSS/JS) COM HASH, COMPRIMIDOS E EM CACHE
+# ========================================================
+# O collectstatic grava cada arquivo com o hash do conteúdo no nome
+# (style.3f9a1c.css) e, ao lado, as versões .gz e .br (a .br só com o pacote
+# opcional brotli instalado). O próprio app serve STATIC_ROOT (EstaticosMiddleware):
+# escolhe a versão comprimida pelo Accept-Encoding e marca os nomes com hash como
+# imutáveis por um ano; mudar o arquivo muda o nome, então o navegador nunca
+# precisa revalidar. Sem o collectstatic (desenvolvimento, testes), o {% static %}
+# devolve o nome original e o runserver serve pelos finders, como antes.
+
+EXTENSOES_COMPRIMIVEIS = ('.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.xml', '.ttf', '.eot', '.ico')
+TAMANHO_MINIMO_COMPRESSAO = 256
+# Nomes sem hash (ex.: referências diretas do admin) podem mudar a qualquer deploy
+MAX_AGE_SEM_HASH = 60 * 60
+MAX_AGE_COM_HASH = 365 * 24 * 60 * 60
+
+CODIFICACOES = [
+    # (Content-Encoding, extensão, função)
+    ('br', '.br', brotli.compress if brotli else None),
+    ('gzip', '.gz', lambda dados: gzip.compress(dados, compresslevel=9, mtime=0)),
+]
+
+
+class ArmazenamentoEstatico(ManifestStaticFilesStorage):
+
+    def stored_name(self, name):
+        if not self.hashed_files and not self.exists(self.manifest_name):
+            # collectstatic ainda não rodou: nome original
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for nome in {*paths, *self.hashed_files.values()}:
+            self.comprimir(nome)
+
+    def comprimir(self, nome):
+        if not nome.endswith(EXTENSOES_COMPRIMIVEIS) or not self.exists(nome):
+            return
+        with self.open(nome) as arquivo:
+            dados = arquivo.read()
+        if len(dados) < TAMANHO_MINIMO_COMPRESSAO:
+            return
+        for _, extensao, funcao in CODIFICACOES:
+            if funcao is None:
+                continue
+            comprimido = funcao(dados)
+            # Só vale a pena se economizar de verdade
+            if len(comprimido) < len(dados) * 0.95:
+                with open(self.path(nome + extensao), 'wb') as destino:
+                    destino.write(comprimido)
+
+
+# --------------------------------------------------------
+# Leitura para o EstaticosMiddleware
+# --------------------------------------------------------
+
+class ArquivoEstatico:
+
+    def __init__(self, conteudo, content_type, codificacao, cache_control, modificado_em):
+        self.conteudo = conteudo
+        self.content_type = content_type
+        self.codificacao = codificacao
+        self.cache_control = cache_control
+        self.modificado_em = modificado_em
+
+
+def nomes_com_hash():
+    return set(staticfiles_storage.hashed_files.values()) if hasattr(staticfiles_storage, 'hashed_files') else set()
+
+
+@lru_cache(maxsize=1024)
+def carregar_estatico(nome, aceita_br, aceita_gzip):
+    # Em cache no processo: arquivos com hash nunca mudam; os sem hash mudam só no deploy
+    if not settings.STATIC_ROOT:
+        return None
+    try:
+        caminho = safe_join(settings.STATIC_ROOT, nome)
+    except SuspiciousFileOperation:
+        return None
+    if not os.path.isfile(caminho):
+        return None
+
+    aceitas = {'br': aceita_br, 'gzip': aceita_gzip}
+    for codificacao, extensao, _ in CODIFICACOES:
+        if aceitas[codificacao] and os.path.isfile(caminho + extensao):
+            escolhido = caminho + extensao
+            break
+    else:
+        codificacao, escolhido = None, caminho
+
+    with open(escolhido, 'rb') as arquivo:
+        conteudo = arquivo.read()
+    content_type = mimetypes.guess_type(nome)[0] or 'application/octet-stream'
+    if nome in nomes_com_hash():
+        cache_control = f'public, max-age={MAX_AGE_COM_HASH}, immutable'
+    else:
+        cache_control = f'public, max-age={MAX_AGE_SEM_HASH}'
+    return ArquivoEstatico(conteudo, content_type, codificacao, cache_control, os.path.getmtime(caminho))
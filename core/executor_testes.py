@@ -0,0 +1,37 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+# ========================================================
+# EXECUTOR DA SUÍTE (manage.py test)
+# ========================================================
+# Os caches em arquivo (sessões, usuário logado, painel) ficam na pasta do projeto
+# e são os mesmos do servidor de desenvolvimento. Na suíte eles vão para uma pasta
+# temporária: os testes não apagam as sessões de quem está usando o runserver, e
+# os usuários do banco de teste (pk 1, 2, ...) não aparecem em "usuario:1" para
+# o servidor, nem o contrário.
+
+class ExecutorTestes(DiscoverRunner):
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._pasta_caches = tempfile.mkdtemp(prefix='caches-testes-')
+        caches_teste = {
+            alias: (
+                {**configuracao, 'LOCATION': os.path.join(self._pasta_caches, alias)}
+                if configuracao['BACKEND'].endswith('.FileBasedCache') else configuracao
+            )
+            for alias, configuracao in settings.CACHES.items()
+        }
+        self._ajuste_caches = override_settings(CACHES=caches_teste)
+        self._ajuste_caches.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._ajuste_caches.disable()
+        shutil.rmtree(self._pasta_caches, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,79 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .documentos import obter_documento_gerado
+from .models import Documento
+
+logger = logging.getLogger(__name__)
+
+
+# ========================================================
+# FILA DE RENDERIZAÇÃO (EM PROCESSO, SEM BROKER)
+# ========================================================
+# A view só cria o Documento com status "Na fila" e devolve. Uma thread do pool
+# renderiza o .docx, grava em Documento.arquivo_gerado e marca como concluído.
+# O status fica no banco, então qualquer processo consegue responder ao polling.
+# O pool é em memória: se o processo reiniciar, o que estava na fila ou em
+# andamento se perde. Por isso o polling marca como erro o documento parado
+# "Na fila" há mais de FILA_DOCUMENTOS_TIMEOUT segundos (o usuário gera de novo).
+
+TIMEOUT_PADRAO = 5 * 60
+
+class FilaRenderizacao:
+
+    def __init__(self, workers=None):
+        self.workers = workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _obter_pool(self):
+        with self._lock:
+            if self._pool is None:
+                workers = self.workers or getattr(settings, 'FILA_DOCUMENTOS_WORKERS', 2)
+                self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='fila-docs')
+            return self._pool
+
+    def enfileirar(self, documento):
+        # Só dispara depois do commit, para a thread enxergar o registro
+        transaction.on_commit(lambda: self._obter_pool().submit(processar_documento, documento.pk))
+
+
+def processar_documento(documento_id):
+    try:
+        documento = Documento.objects.select_related('cliente', 'modelo').get(pk=documento_id)
+        try:
+            caminho, hash_conteudo = obter_documento_gerado(documento.modelo, documento.cliente)
+            documento.arquivo_gerado.name = caminho
+            documento.hash_conteudo = hash_conteudo
+            documento.status = 'OK'
+        except Exception:
+            logger.exception('Falha ao renderizar o documento %s', documento_id)
+            documento.status = 'ERR'
+        documento.save(update_fields=['arquivo_gerado', 'hash_conteudo', 'status', 'atualizado_em'])
+    finally:
+        # Threads do pool não passam pelo ciclo de request, então fechamos a conexão aqui
+        close_old_connections()
+
+
+def expirar_se_parado(documento):
+    if documento.status != 'FIL':
+        return documento
+    limite = timezone.now() - timedelta(seconds=getattr(settings, 'FILA_DOCUMENTOS_TIMEOUT', TIMEOUT_PADRAO))
+    if documento.data_geracao < limite:
+        # Só se ainda estiver na fila: se a thread concluir depois, o resultado dela vale
+        expirados = Documento.objects.filter(pk=documento.pk, status='FIL').update(
+            status='ERR', atualizado_em=timezone.now()
+        )
+        if expirados:
+            logger.warning('Documento %s abandonado na fila; marcado como erro', documento.pk)
+        documento.refresh_from_db(fields=['status', 'arquivo_gerado', 'atualizado_em'])
+    return documento
+
+
+fila_documentos = FilaRenderizacao()
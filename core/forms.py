@@ -1,5 +1,5 @@
 from django import forms
-from .models import Cliente
+from .models import Cliente, ModeloDocumento
 
 class ClienteForm(forms.ModelForm):
     class Meta:
@@ -34,4 +34,77 @@ class ClienteForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super(ClienteForm, self).__init__(*args, **kwargs)
         self.fields['rg'].required = False
-        self.fields['orgao_expeditor'].required = False
\ No newline at end of file
+        self.fields['orgao_expeditor'].required = False
+
+    def validate_unique(self):
+        super().validate_unique()
+        # O escritório não é campo do form, então o Django pula a constraint
+        # (escritorio, cpf_cnpj); a instância já chega com o escritório da view
+        cpf_cnpj = self.cleaned_data.get('cpf_cnpj')
+        if cpf_cnpj and (
+            Cliente.objects.do_escritorio(self.instance.escritorio_id)
+            .filter(cpf_cnpj=cpf_cnpj).exclude(pk=self.instance.pk).exists()
+        ):
+            self.add_error('cpf_cnpj', "Já existe um cliente com este CPF/CNPJ.")
+
+class GerarLoteForm(forms.Form):
+    # Os clientes chegam marcados da listagem, então só os escolhidos são renderizados no HTML
+    clientes = forms.ModelMultipleChoiceField(
+        queryset=Cliente.objects.none(),
+        widget=forms.MultipleHiddenInput,
+    )
+    modelos = forms.ModelMultipleChoiceField(
+        queryset=ModeloDocumento.objects.all(),
+        widget=forms.CheckboxSelectMultiple(attrs={'class': 'form-check-input'}),
+    )
+
+    def __init__(self, *args, escritorio, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['clientes'].queryset = Cliente.objects.do_escritorio(escritorio).filter(ativo=True)
+
+    def clean_modelos(self):
+        # Falha aqui, antes de começar o ZIP, se algum modelo tiver tag que não sabemos preencher
+        from .documentos import ErroTemplate, cache_templates, validar_variaveis
+
+        modelos = self.cleaned_data['modelos']
+        for modelo in modelos:
+            try:
+                validar_variaveis(cache_templates.compilado(modelo).variaveis)
+            except ErroTemplate as erro:
+                raise forms.ValidationError(f"{modelo.titulo}: {erro}")
+        return modelos
+
+
+class ModeloDocumentoForm(forms.ModelForm):
+    class Meta:
+        model = ModeloDocumento
+        fields = ['titulo', 'descricao', 'arquivo_template']
+
+    def clean_arquivo_template(self):
+        arquivo = self.cleaned_data['arquivo_template']
+        if 'arquivo_template' not in self.changed_data:
+            return arquivo
+        if not arquivo.name.lower().endswith('.docx'):
+            raise forms.ValidationError("Envie um arquivo .docx.")
+
+        # Valida o template no upload em vez de esperar a primeira geração.
+        # Import tardio: o admin carrega este form na inicialização e core.documentos
+        # traz docx/docxtpl/lxml junto (ver benchmark_inicializacao)
+        from .documentos import ErroTemplate, compilar_template, validar_variaveis
+
+        try:
+            compilado = compilar_template(arquivo)
+            validar_variaveis(compilado.variaveis)
+        except ErroTemplate as erro:
+            raise forms.ValidationError(str(erro))
+        finally:
+            arquivo.seek(0)
+        self.instance.variaveis = sorted(compilado.variaveis)
+        return arquivo
+
+
+class ImportarClientesForm(forms.Form):
+    arquivo = forms.FileField(
+        help_text="Arquivo .csv ou .xlsx com uma coluna por campo do cadastro (nome_completo, cpf_cnpj, ...).",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'}),
+    )
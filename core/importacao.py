@@ -0,0 +1,216 @@
+import csv
+import io
+import re
+from datetime import date, datetime
+
+from django.db import transaction
+from django.utils import timezone
+
+from .forms import ClienteForm
+from .models import Cliente
+from .painel import invalidar_painel
+
+
+# ========================================================
+# IMPORTAÇÃO / EXPORTAÇÃO DE CLIENTES (CSV / XLSX)
+# ========================================================
+# As linhas são lidas uma a uma, validadas com as regras do ClienteForm e gravadas
+# em lotes: cada lote é uma transação com um bulk_create (novos) e um bulk_update
+# (CPF/CNPJ já cadastrado no escritório). A memória não cresce com o tamanho do arquivo.
+# Na atualização só são gravadas as colunas que o arquivo traz: uma planilha sem a
+# coluna "ativo" não reativa clientes, e sem "rg" não apaga o RG já cadastrado.
+
+CAMPOS = ClienteForm._meta.fields
+CAMPOS_BOOLEANOS = ('ativo', 'eh_deficiente')
+TAMANHO_LOTE = 500
+
+
+class ErroImportacao(Exception):
+    pass
+
+
+class ResultadoImportacao:
+
+    def __init__(self):
+        self.criados = 0
+        self.atualizados = 0
+        self.erros = []  # (número da linha, mensagem)
+
+    @property
+    def total_erros(self):
+        return len(self.erros)
+
+
+class ClienteImportacaoForm(ClienteForm):
+
+    def validate_unique(self):
+        # CPF/CNPJ repetido não é erro aqui: vira atualização (upsert)
+        pass
+
+
+# --------------------------------------------------------
+# Leitura
+# --------------------------------------------------------
+
+def ler_csv(arquivo):
+    # UploadedFile do Django expõe o arquivo binário em .file
+    texto = io.TextIOWrapper(getattr(arquivo, 'file', arquivo), encoding='utf-8-sig', newline='')
+    amostra = texto.read(4096)
+    texto.seek(0)
+    try:
+        dialeto = csv.Sniffer().sniff(amostra, delimiters=',;')
+    except csv.Error:
+        dialeto = csv.excel
+    yield from csv.DictReader(texto, dialect=dialeto)
+
+
+def ler_xlsx(arquivo):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ErroImportacao("Para importar .xlsx instale o pacote openpyxl.")
+
+    planilha = load_workbook(arquivo, read_only=True, data_only=True).active
+    linhas = planilha.iter_rows(values_only=True)
+    cabecalho = [str(celula or '').strip() for celula in next(linhas, [])]
+    for valores in linhas:
+        yield dict(zip(cabecalho, valores))
+
+
+def ler_arquivo(arquivo, nome):
+    if nome.lower().endswith('.xlsx'):
+        return ler_xlsx(arquivo)
+    if nome.lower().endswith('.csv'):
+        return ler_csv(arquivo)
+    raise ErroImportacao("Formato não suportado. Envie um arquivo .csv ou .xlsx.")
+
+
+def _normalizar_linha(linha):
+    dados = {}
+    for campo in CAMPOS:
+        valor = linha.get(campo)
+        if isinstance(valor, (date, datetime)):
+            valor = valor.strftime('%Y-%m-%d')
+        dados[campo] = '' if valor is None else str(valor).strip()
+
+        # Coluna ausente ou vazia assume o default do model (ex.: nacionalidade)
+        padrao = Cliente._meta.get_field(campo).default
+        if dados[campo] == '' and isinstance(padrao, str):
+            dados[campo] = padrao
+
+    # Datas no formato brasileiro (dd/mm/aaaa)
+    data = re.fullmatch(r'(\d{2})/(\d{2})/(\d{4})', dados['data_nascimento'])
+    if data:
+        dados['data_nascimento'] = f'{data[3]}-{data[2]}-{data[1]}'
+
+    # Checkbox: só vai no POST quando marcado; sem coluna, o cliente entra ativo
+    for campo in CAMPOS_BOOLEANOS:
+        valor = dados[campo].lower()
+        if campo == 'ativo' and valor == '':
+            valor = 'sim'
+        if valor in ('1', 'sim', 's', 'true', 'verdadeiro', 'x'):
+            dados[campo] = 'on'
+        else:
+            dados.pop(campo)
+    return dados
+
+
+# --------------------------------------------------------
+# Gravação em lotes
+# --------------------------------------------------------
+
+def _gravar_lote(lote, escritorio, resultado, colunas):
+    # lote: [(número da linha, cliente)]. Mesmo CPF/CNPJ repetido dentro do lote:
+    # vale a última linha e as anteriores entram nos erros
+    por_documento, linhas = {}, {}
+    for numero, cliente in lote:
+        if cliente.cpf_cnpj in linhas:
+            resultado.erros.append((
+                linhas[cliente.cpf_cnpj], f"cpf_cnpj: {cliente.cpf_cnpj} repetido no arquivo; vale a linha {numero}."
+            ))
+        por_documento[cliente.cpf_cnpj] = cliente
+        linhas[cliente.cpf_cnpj] = numero
+    agora = timezone.now()
+
+    with transaction.atomic():
+        existentes = dict(
+            Cliente.objects.do_escritorio(escritorio).filter(cpf_cnpj__in=por_documento).values_list('cpf_cnpj', 'id')
+        )
+        novos, alterados = [], []
+        for cpf_cnpj, cliente in por_documento.items():
+            cliente.atualizar_busca()
+            if cpf_cnpj in existentes:
+                cliente.pk = existentes[cpf_cnpj]
+                cliente.atualizado_em = agora
+                alterados.append(cliente)
+            else:
+                novos.append(cliente)
+
+        Cliente.objects.bulk_create(novos)
+        Cliente.objects.bulk_update(alterados, [*colunas, *Cliente.CAMPOS_BUSCA, 'atualizado_em'])
+
+    resultado.criados += len(novos)
+    resultado.atualizados += len(alterados)
+
+
+def importar_clientes(linhas, escritorio, tamanho_lote=TAMANHO_LOTE):
+    resultado = ResultadoImportacao()
+    lote = []
+    colunas = None
+
+    # A linha 1 é o cabeçalho
+    for numero, linha in enumerate(linhas, start=2):
+        if colunas is None:
+            colunas = [campo for campo in CAMPOS if campo in linha]
+        form = ClienteImportacaoForm(_normalizar_linha(linha), instance=Cliente(escritorio_id=escritorio))
+        if not form.is_valid():
+            mensagens = '; '.join(
+                f"{campo}: {' '.join(erros)}" for campo, erros in form.errors.items()
+            )
+            resultado.erros.append((numero, mensagens))
+            continue
+
+        lote.append((numero, form.instance))
+        if len(lote) >= tamanho_lote:
+            _gravar_lote(lote, escritorio, resultado, colunas)
+            lote = []
+
+    if lote:
+        _gravar_lote(lote, escritorio, resultado, colunas)
+
+    # Os repetidos só aparecem ao gravar o lote: erros na ordem das linhas
+    resultado.erros.sort()
+    # bulk_create/bulk_update não disparam signals
+    invalidar_painel(escritorio)
+    return resultado
+
+
+# --------------------------------------------------------
+# Exportação
+# --------------------------------------------------------
+
+class _Eco:
+    # Pseudo-arquivo: o csv.writer escreve e nós devolvemos a linha pronta para o streaming
+    def write(self, valor):
+        return valor
+
+
+def exportar_clientes_csv(queryset=None, chunk_size=2000):
+    queryset = Cliente.objects.all() if queryset is None else queryset
+    escritor = csv.writer(_Eco())
+
+    yield '\ufeff'  # BOM para o Excel reconhecer UTF-8
+    yield escritor.writerow(CAMPOS)
+    for valores in queryset.order_by('id').values_list(*CAMPOS).iterator(chunk_size=chunk_size):
+        yield escritor.writerow(_formatar_exportacao(valores))
+
+
+def _formatar_exportacao(valores):
+    linha = []
+    for campo, valor in zip(CAMPOS, valores):
+        if campo in CAMPOS_BOOLEANOS:
+            valor = 'sim' if valor else 'não'
+        elif valor is None:
+            valor = ''
+        linha.append(valor)
+    return linha
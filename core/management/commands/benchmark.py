@@ -0,0 +1,308 @@
+import asyncio
+import http.client
+import json
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from core.benchmark import banco_descartavel, comparar, resumir, semear
+from core.middleware import ContadorSql
+from core.models import Cliente
+
+CENARIOS = (
+    'painel', 'lista_clientes', 'busca_clientes', 'lista_documentos', 'lista_honorarios',
+    'gerar_documento', 'gerar_lote',
+)
+
+
+class _HandlerSilencioso(WSGIRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Suíte de benchmark das jornadas principais: semeia um banco descartável, mede cada cenário '
+        '(painel, listas, geração de documentos) e roda uma carga concorrente contra o app WSGI ou ASGI. '
+        'O resultado em JSON pode ser comparado com o de outra versão (--comparar).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clientes', type=int, default=10000, help='Clientes semeados (ex.: 10000 a 1000000)')
+        parser.add_argument('--honorarios', type=int, default=1, help='Honorários por cliente')
+        parser.add_argument('--documentos', type=int, default=1, help='Documentos por cliente')
+        parser.add_argument(
+            '--outros-escritorios', type=int, default=0,
+            help='Escritórios vizinhos semeados com o mesmo volume (as consultas medidas devem ignorá-los)',
+        )
+        parser.add_argument('--repeticoes', type=int, default=30, help='Requisições medidas por cenário')
+        parser.add_argument('--lote', type=int, default=20, help='Clientes no cenário gerar_lote')
+        parser.add_argument('--cenarios', nargs='+', choices=CENARIOS, default=CENARIOS)
+        parser.add_argument('--carga', choices=('wsgi', 'asgi', 'nenhuma'), default='wsgi')
+        parser.add_argument('--concorrencia', type=int, default=8, help='Clientes simultâneos na carga')
+        parser.add_argument('--segundos', type=float, default=10, help='Duração da carga')
+        parser.add_argument('--json', help='Grava o resultado neste arquivo')
+        parser.add_argument('--comparar', help='JSON de uma execução anterior para comparar')
+        parser.add_argument('--tolerancia', type=float, default=0.2, help='Piora aceita antes de acusar regressão')
+
+    def handle(self, *args, **options):
+        # Sem setup_test_environment: ele troca o render de templates por uma versão
+        # instrumentada, o que distorceria justamente o que estamos medindo
+        media = tempfile.mkdtemp()
+        shutil.copytree(settings.BASE_DIR / 'templates_docs', f'{media}/templates_docs')
+        ajustes = override_settings(
+            DEBUG=False, MEDIA_ROOT=media, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+        )
+        try:
+            with ajustes, banco_descartavel():
+                resultado = self.executar(options)
+        finally:
+            shutil.rmtree(media, ignore_errors=True)
+
+        self.imprimir(resultado)
+        if options['json']:
+            with open(options['json'], 'w') as destino:
+                json.dump(resultado, destino, indent=2)
+        if options['comparar']:
+            with open(options['comparar']) as origem:
+                self.comparar(json.load(origem), resultado, options['tolerancia'])
+
+    def executar(self, options):
+        inicio = time.perf_counter()
+        usuario = User.objects.create_user('benchmark', password='benchmark')
+        modelo = semear(usuario, options['clientes'], options['honorarios'], options['documentos'])
+        for numero in range(options['outros_escritorios']):
+            vizinho = User.objects.create_user(f'benchmark-{numero + 2}', password='benchmark')
+            semear(vizinho, options['clientes'], options['honorarios'], options['documentos'], modelo=modelo)
+        semeadura = time.perf_counter() - inicio
+
+        resultado = {
+            'versao': self.versao(),
+            'data': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'banco': connection.vendor,
+            'parametros': {
+                chave: options[chave]
+                for chave in (
+                    'clientes', 'honorarios', 'documentos', 'outros_escritorios', 'repeticoes', 'lote', 'concorrencia',
+                    'segundos',
+                )
+            },
+            'semeadura_segundos': round(semeadura, 1),
+            'cenarios': {},
+        }
+
+        cliente_http = Client()
+        cliente_http.force_login(usuario)
+        ids_ativos = list(
+            Cliente.objects.do_escritorio(usuario.perfil.escritorio_id).filter(ativo=True).values_list('id', flat=True)
+        )
+        aleatorio = random.Random(0)
+        cenarios = self.cenarios(modelo, ids_ativos, options)
+        for nome in options['cenarios']:
+            self.stdout.write(f'Cenário {nome}...')
+            resultado['cenarios'][nome] = self.medir(cenarios[nome], cliente_http, aleatorio, options['repeticoes'])
+
+        if options['carga'] != 'nenhuma':
+            self.stdout.write(f"Carga {options['carga']} com {options['concorrencia']} clientes...")
+            sessao = cliente_http.cookies[settings.SESSION_COOKIE_NAME].value
+            urls = [reverse('home'), reverse('lista_clientes'), reverse('lista_documentos'), reverse('lista_honorarios')]
+            carga = self.carga_wsgi if options['carga'] == 'wsgi' else self.carga_asgi
+            resultado['carga'] = carga(urls, sessao, options)
+        return resultado
+
+    # --------------------------------------------------------
+    # Cenários medidos um a um
+    # --------------------------------------------------------
+
+    def cenarios(self, modelo, ids_ativos, options):
+        def busca(cliente_http, aleatorio):
+            termo = f'Cliente {aleatorio.randrange(options["clientes"]):06d}'
+            return cliente_http.get(reverse('lista_clientes'), {'q': termo})
+
+        def gerar_documento(cliente_http, aleatorio):
+            # Cliente sorteado a cada vez: quase sempre um documento novo, renderizado de fato
+            return cliente_http.get(reverse('gerar_documento', args=[aleatorio.choice(ids_ativos), modelo.id]))
+
+        def gerar_lote(cliente_http, aleatorio):
+            clientes = aleatorio.sample(ids_ativos, min(options['lote'], len(ids_ativos)))
+            return cliente_http.post(reverse('gerar_lote'), {'clientes': clientes, 'modelos': [modelo.id]})
+
+        return {
+            'painel': lambda cliente_http, aleatorio: cliente_http.get(reverse('home')),
+            'lista_clientes': lambda cliente_http, aleatorio: cliente_http.get(reverse('lista_clientes')),
+            'busca_clientes': busca,
+            'lista_documentos': lambda cliente_http, aleatorio: cliente_http.get(reverse('lista_documentos')),
+            'lista_honorarios': lambda cliente_http, aleatorio: cliente_http.get(reverse('lista_honorarios')),
+            'gerar_documento': gerar_documento,
+            'gerar_lote': gerar_lote,
+        }
+
+    def medir(self, cenario, cliente_http, aleatorio, repeticoes):
+        # 1 requisição de aquecimento fora da conta; queries só da thread da requisição
+        self.consumir(cenario(cliente_http, aleatorio))
+        latencias = []
+        contador = ContadorSql()
+        with connection.execute_wrapper(contador):
+            for _ in range(repeticoes):
+                inicio = time.perf_counter()
+                resposta = self.consumir(cenario(cliente_http, aleatorio))
+                latencias.append(time.perf_counter() - inicio)
+                if resposta.status_code >= 400:
+                    raise CommandError(f'{resposta.status_code} em {resposta.request["PATH_INFO"]}')
+        return {**resumir(latencias), 'queries': round(contador.consultas / repeticoes, 1)}
+
+    def consumir(self, resposta):
+        # Streaming (ZIP, FileResponse) só termina o trabalho quando o conteúdo é lido
+        if resposta.streaming:
+            for _ in resposta.streaming_content:
+                pass
+        resposta.close()
+        return resposta
+
+    # --------------------------------------------------------
+    # Carga concorrente
+    # --------------------------------------------------------
+
+    def carga_wsgi(self, urls, sessao, options):
+        # Servidor WSGI com uma thread por requisição (o mesmo do runserver), na
+        # porta livre que o sistema der, e clientes HTTP de verdade em threads
+        servidor = ThreadedWSGIServer(('127.0.0.1', 0), _HandlerSilencioso, allow_reuse_address=False)
+        servidor.set_app(get_wsgi_application())
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        porta = servidor.server_port
+        cabecalhos = {'Host': 'testserver', 'Cookie': f'{settings.SESSION_COOKIE_NAME}={sessao}'}
+
+        latencias, erros = [], []
+        lock = threading.Lock()
+        fim = time.perf_counter() + options['segundos']
+
+        def trabalhador(semente):
+            aleatorio = random.Random(semente)
+            while time.perf_counter() < fim:
+                conexao = http.client.HTTPConnection('127.0.0.1', porta, timeout=60)
+                inicio = time.perf_counter()
+                try:
+                    conexao.request('GET', aleatorio.choice(urls), headers=cabecalhos)
+                    resposta = conexao.getresponse()
+                    resposta.read()
+                    status = resposta.status
+                except OSError:
+                    status = 599
+                finally:
+                    conexao.close()
+                with lock:
+                    latencias.append(time.perf_counter() - inicio)
+                    if status >= 400:
+                        erros.append(status)
+
+        try:
+            total = self.rodar_threads(trabalhador, options['concorrencia'])
+        finally:
+            servidor.shutdown()
+            servidor.server_close()
+        return self.resumir_carga('wsgi', latencias, erros, total, options)
+
+    def carga_asgi(self, urls, sessao, options):
+        # AsyncClient chama o ASGIHandler no próprio processo; as views síncronas
+        # rodam via sync_to_async, como sob um servidor ASGI (uvicorn, daphne)
+        latencias, erros = [], []
+
+        async def trabalhador(cliente_http, semente, fim):
+            aleatorio = random.Random(semente)
+            while time.perf_counter() < fim:
+                inicio = time.perf_counter()
+                resposta = await cliente_http.get(aleatorio.choice(urls))
+                latencias.append(time.perf_counter() - inicio)
+                if resposta.status_code >= 400:
+                    erros.append(resposta.status_code)
+
+        async def principal():
+            cliente_http = AsyncClient()
+            cliente_http.cookies[settings.SESSION_COOKIE_NAME] = sessao
+            inicio = time.perf_counter()
+            fim = inicio + options['segundos']
+            await asyncio.gather(*(trabalhador(cliente_http, i, fim) for i in range(options['concorrencia'])))
+            return time.perf_counter() - inicio
+
+        total = asyncio.run(principal())
+        return self.resumir_carga('asgi', latencias, erros, total, options)
+
+    def rodar_threads(self, alvo, quantidade):
+        threads = [threading.Thread(target=alvo, args=(i,)) for i in range(quantidade)]
+        inicio = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - inicio
+
+    def resumir_carga(self, interface, latencias, erros, total, options):
+        if not latencias:
+            raise CommandError('A carga não completou nenhuma requisição.')
+        return {
+            'interface': interface,
+            'concorrencia': options['concorrencia'],
+            'segundos': round(total, 2),
+            'requisicoes': len(latencias),
+            'erros': len(erros),
+            'requisicoes_por_segundo': round(len(latencias) / total, 1),
+            **resumir(latencias),
+        }
+
+    # --------------------------------------------------------
+    # Saída
+    # --------------------------------------------------------
+
+    def versao(self):
+        try:
+            processo = subprocess.run(
+                ['git', 'describe', '--always', '--dirty'], cwd=settings.BASE_DIR, capture_output=True, text=True,
+            )
+        except OSError:
+            return None
+        return processo.stdout.strip() or None
+
+    def imprimir(self, resultado):
+        self.stdout.write(
+            f"\nversão {resultado['versao']}, {resultado['banco']}, {resultado['parametros']['clientes']} clientes "
+            f"(semeadura {resultado['semeadura_segundos']}s)"
+        )
+        self.stdout.write(f"{'cenário':>18} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'queries':>8}")
+        for nome, resumo in resultado['cenarios'].items():
+            self.stdout.write(
+                f"{nome:>18} {resumo['p50_ms']:>9} {resumo['p95_ms']:>9} {resumo['max_ms']:>9} {resumo['queries']:>8}"
+            )
+        carga = resultado.get('carga')
+        if carga:
+            self.stdout.write(
+                f"\ncarga {carga['interface']}: {carga['requisicoes_por_segundo']} req/s com {carga['concorrencia']} "
+                f"clientes, p50 {carga['p50_ms']} ms, p95 {carga['p95_ms']} ms, {carga['erros']} erro(s)"
+            )
+
+    def comparar(self, anterior, atual, tolerancia):
+        self.stdout.write(f"\nComparação com {anterior.get('versao')} ({anterior.get('data')}):")
+        regressoes = 0
+        for item, metrica, antes, depois, variacao, regrediu in comparar(anterior, atual, tolerancia):
+            marca = '  REGRESSÃO' if regrediu else ''
+            self.stdout.write(f'{item:>18} {metrica:>24} {antes:>10} -> {depois:<10} {variacao:+.0%}{marca}')
+            regressoes += regrediu
+        if regressoes:
+            raise CommandError(f'{regressoes} métrica(s) pioraram mais de {tolerancia:.0%}.')
@@ -0,0 +1,120 @@
+import json
+import os
+import random
+import statistics
+import threading
+import time
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment
+
+from core.benchmark import banco_descartavel
+from core.models import Cliente
+from financeiro.models import Honorario
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede a vazão de requisições concorrentes (leituras e lançamentos de honorários) '
+        'no perfil de banco configurado em DB_PERFIL. Roda num banco de teste descartável.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--requisicoes', type=int, default=50, help='Requisições por thread')
+        parser.add_argument('--escrita', type=float, default=0.3, help='Fração de requisições que gravam')
+        parser.add_argument('--clientes', type=int, default=500, help='Clientes semeados antes do teste')
+        parser.add_argument(
+            '--sem-otimizacoes', action='store_true',
+            help='SQLite sem WAL/pragmas (journal padrão), para comparar com o perfil otimizado',
+        )
+        parser.add_argument('--json', help='Grava o resultado neste arquivo')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        # Sem otimizações: SQLite sem WAL/pragmas (OPTIONS vazio)
+        with banco_descartavel({} if options['sem_otimizacoes'] else None):
+            resultado = self.executar(options)
+
+        resultado['perfil'] = os.environ.get('DB_PERFIL', 'sqlite')
+        resultado['otimizado'] = not options['sem_otimizacoes']
+        self.imprimir(resultado)
+        if options['json']:
+            with open(options['json'], 'w') as destino:
+                json.dump(resultado, destino, indent=2)
+
+    def semear(self, quantidade):
+        usuario = User.objects.create_user('benchmark', password='benchmark')
+        Cliente.objects.bulk_create([
+            Cliente(
+                escritorio_id=usuario.perfil.escritorio_id, nome_completo=f'Cliente {i:06d}', estado_civil='S', cpf_cnpj=f'{i:011d}',
+                endereco='Rua A', numero='1', cep='40000-000', profissao='Autônomo', contato='71',
+            )
+            for i in range(quantidade)
+        ])
+        return usuario, list(Cliente.objects.values_list('id', flat=True))
+
+    def executar(self, options):
+        usuario, ids_clientes = self.semear(options['clientes'])
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                journal = cursor.execute('PRAGMA journal_mode').fetchone()[0]
+        else:
+            journal = None
+
+        latencias = []
+        erros = []
+        lock = threading.Lock()
+        leituras = ['/', '/clientes/', '/financeiro/']
+
+        def trabalhador(semente):
+            aleatorio = random.Random(semente)
+            cliente_http = Client(raise_request_exception=False)
+            cliente_http.force_login(usuario)
+            try:
+                for _ in range(options['requisicoes']):
+                    inicio = time.perf_counter()
+                    if aleatorio.random() < options['escrita']:
+                        resposta = cliente_http.post('/financeiro/novo/', {
+                            'cliente': aleatorio.choice(ids_clientes), 'descricao': 'Benchmark',
+                            'valor': '150.00', 'data_vencimento': date.today().isoformat(), 'status': 'PEN',
+                        })
+                    else:
+                        resposta = cliente_http.get(aleatorio.choice(leituras))
+                    duracao = time.perf_counter() - inicio
+                    with lock:
+                        latencias.append(duracao)
+                        if resposta.status_code >= 500:
+                            erros.append(resposta.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=trabalhador, args=(i,)) for i in range(options['threads'])]
+        inicio = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        total = time.perf_counter() - inicio
+
+        latencias.sort()
+        return {
+            'banco': connection.vendor,
+            'journal_mode': journal,
+            'threads': options['threads'],
+            'requisicoes': len(latencias),
+            'honorarios_gravados': Honorario.objects.count(),
+            'erros': len(erros),
+            'segundos': round(total, 3),
+            'requisicoes_por_segundo': round(len(latencias) / total, 1),
+            'latencia_p50_ms': round(statistics.median(latencias) * 1000, 1),
+            'latencia_p95_ms': round(latencias[int(len(latencias) * 0.95) - 1] * 1000, 1),
+        }
+
+    def imprimir(self, resultado):
+        for chave, valor in resultado.items():
+            self.stdout.write(f'{chave:>22}: {valor}')
@@ -0,0 +1,94 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Roda num processo Python novo: mede o import do config.wsgi (django.setup, apps,
+# admin) e, separado, o carregamento do urlconf/views que acontece na 1ª requisição
+SCRIPT = """
+import json, time
+inicio = time.perf_counter()
+import config.wsgi
+wsgi = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(json.dumps({'wsgi': wsgi - inicio, 'urls': time.perf_counter() - wsgi}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede a inicialização a frio de um worker: importar config.wsgi e carregar as URLs '
+        'em processos Python novos, com os módulos mais lentos segundo -X importtime.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticoes', type=int, default=10)
+        parser.add_argument('--modulos', type=int, default=15, help='Quantos módulos mais lentos listar')
+        parser.add_argument('--json', help='Grava o resultado neste arquivo')
+
+    def ambiente(self):
+        ambiente = os.environ.copy()
+        ambiente.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+        caminhos = [str(settings.BASE_DIR)] + [p for p in ambiente.get('PYTHONPATH', '').split(os.pathsep) if p]
+        ambiente['PYTHONPATH'] = os.pathsep.join(caminhos)
+        return ambiente
+
+    def executar(self, *opcoes):
+        processo = subprocess.run(
+            [sys.executable, *opcoes, '-c', SCRIPT], cwd=settings.BASE_DIR, env=self.ambiente(),
+            capture_output=True, text=True,
+        )
+        if processo.returncode != 0:
+            raise CommandError(f'Falha ao importar config.wsgi:\n{processo.stderr}')
+        return processo
+
+    def handle(self, *args, **options):
+        tempos_wsgi, tempos_urls = [], []
+        for _ in range(options['repeticoes']):
+            medida = json.loads(self.executar().stdout.strip().splitlines()[-1])
+            tempos_wsgi.append(medida['wsgi'])
+            tempos_urls.append(medida['urls'])
+
+        resultado = {
+            'repeticoes': options['repeticoes'],
+            'wsgi_min_ms': round(min(tempos_wsgi) * 1000, 1),
+            'wsgi_mediana_ms': round(statistics.median(tempos_wsgi) * 1000, 1),
+            'wsgi_max_ms': round(max(tempos_wsgi) * 1000, 1),
+            'urls_mediana_ms': round(statistics.median(tempos_urls) * 1000, 1),
+            'modulos_mais_lentos': self.modulos_mais_lentos(options['modulos']),
+        }
+        self.imprimir(resultado)
+        if options['json']:
+            with open(options['json'], 'w') as destino:
+                json.dump(resultado, destino, indent=2)
+
+    def modulos_mais_lentos(self, quantidade):
+        # Linhas do -X importtime: "import time: self [us] | cumulative | nome"
+        tempos = []
+        for linha in self.executar('-X', 'importtime').stderr.splitlines():
+            partes = linha.removeprefix('import time:').split('|')
+            if len(partes) != 3 or not partes[0].strip().isdigit():
+                continue
+            tempos.append((partes[2].strip(), int(partes[0]), int(partes[1])))
+        tempos.sort(key=lambda item: item[2], reverse=True)
+        # Só os pacotes de primeiro nível (o cumulativo já inclui os submódulos)
+        return [
+            {'modulo': nome, 'proprio_ms': round(proprio / 1000, 1), 'acumulado_ms': round(acumulado / 1000, 1)}
+            for nome, proprio, acumulado in tempos
+            if '.' not in nome
+        ][:quantidade]
+
+    def imprimir(self, resultado):
+        for chave, valor in resultado.items():
+            if chave == 'modulos_mais_lentos':
+                continue
+            self.stdout.write(f'{chave:>22}: {valor}')
+        self.stdout.write('\nMódulos de primeiro nível mais lentos (acumulado, import do wsgi + URLs):')
+        for modulo in resultado['modulos_mais_lentos']:
+            self.stdout.write(f"{modulo['acumulado_ms']:>10} ms  {modulo['modulo']}")
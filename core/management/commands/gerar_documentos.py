@@ -0,0 +1,34 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.documentos import gerar_zip_lote
+from core.models import Cliente, ModeloDocumento
+
+
+class Command(BaseCommand):
+    help = 'Gera em lote os documentos de vários clientes x modelos e grava tudo num arquivo ZIP.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clientes', nargs='+', type=int, required=True, help='IDs dos clientes')
+        parser.add_argument('--modelos', nargs='+', type=int, required=True, help='IDs dos ModeloDocumento')
+        parser.add_argument('--usuario', required=True, help='Username registrado como autor dos documentos')
+        parser.add_argument('--saida', default='documentos_lote.zip', help='Caminho do ZIP gerado')
+        parser.add_argument('--workers', type=int, default=None, help='Threads de renderização')
+
+    def handle(self, *args, **options):
+        try:
+            usuario = User.objects.get(username=options['usuario'])
+        except User.DoesNotExist:
+            raise CommandError(f"Usuário '{options['usuario']}' não encontrado.")
+
+        clientes = list(Cliente.objects.filter(id__in=options['clientes']).order_by('nome_completo'))
+        modelos = list(ModeloDocumento.objects.filter(id__in=options['modelos']))
+        if not clientes or not modelos:
+            raise CommandError('Nenhum cliente ou modelo encontrado com os IDs informados.')
+
+        with open(options['saida'], 'wb') as destino:
+            for parte in gerar_zip_lote(clientes, modelos, usuario, options['workers']):
+                destino.write(parte)
+
+        total = len(clientes) * len(modelos)
+        self.stdout.write(self.style.SUCCESS(f"{total} documento(s) gravado(s) em {options['saida']}"))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importacao import ErroImportacao, ler_arquivo, importar_clientes
+from core.models import Escritorio
+
+
+class Command(BaseCommand):
+    help = 'Importa clientes de um arquivo .csv ou .xlsx (atualiza os que já existem pelo CPF/CNPJ).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help='Caminho do arquivo .csv ou .xlsx')
+        parser.add_argument('--escritorio', type=int, required=True, help='Id do escritório que recebe os clientes')
+        parser.add_argument('--lote', type=int, default=500, help='Linhas gravadas por transação')
+
+    def handle(self, *args, **options):
+        caminho = options['arquivo']
+        if not Escritorio.objects.filter(pk=options['escritorio']).exists():
+            raise CommandError(f"Escritório {options['escritorio']} não existe.")
+        try:
+            with open(caminho, 'rb') as arquivo:
+                resultado = importar_clientes(ler_arquivo(arquivo, caminho), options['escritorio'], options['lote'])
+        except (OSError, ErroImportacao) as erro:
+            raise CommandError(str(erro))
+
+        for linha, mensagem in resultado.erros:
+            self.stderr.write(f"Linha {linha}: {mensagem}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado.criados} criado(s), {resultado.atualizados} atualizado(s), {resultado.total_erros} erro(s)."
+        ))
@@ -0,0 +1,158 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+
+# ========================================================
+# MÉTRICAS EM MEMÓRIA (FORMATO PROMETHEUS)
+# ========================================================
+# Contadores e histogramas agregados no próprio processo: registrar um valor é
+# achar o bucket (bisect) e somar, sob um lock curto. O /metrics só formata o que
+# já está somado. Cada worker tem os seus números; o Prometheus coleta um por um
+# (ou soma por instância), como é o normal para métricas em processo.
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_QUERIES = (1, 2, 3, 5, 10, 25, 50, 100, 250)
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _rotulos(nomes, valores, extra=None):
+    pares = list(zip(nomes, valores))
+    if extra:
+        pares.append(extra)
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{nome}="{_escapar(valor)}"' for nome, valor in pares) + '}'
+
+
+def _numero(valor):
+    if isinstance(valor, float):
+        return repr(round(valor, 6))
+    return str(valor)
+
+
+class Contador:
+    tipo = 'counter'
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def incrementar(self, valor=1, **rotulos):
+        chave = tuple(rotulos[nome] for nome in self.rotulos)
+        with self._lock:
+            self._series[chave] = self._series.get(chave, 0) + valor
+
+    def valor(self, **rotulos):
+        return self._series.get(tuple(rotulos[nome] for nome in self.rotulos), 0)
+
+    def exportar(self):
+        with self._lock:
+            series = list(self._series.items())
+        for chave, valor in sorted(series):
+            yield f'{self.nome}{_rotulos(self.rotulos, chave)} {_numero(valor)}'
+
+    def limpar(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Histograma(Contador):
+    tipo = 'histogram'
+
+    def __init__(self, nome, ajuda, rotulos=(), buckets=BUCKETS_SEGUNDOS):
+        super().__init__(nome, ajuda, rotulos)
+        self.buckets = tuple(buckets)
+
+    def observar(self, valor, **rotulos):
+        chave = tuple(rotulos[nome] for nome in self.rotulos)
+        indice = bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                # [contagem por bucket (o último é +Inf), soma, total]
+                serie = self._series[chave] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            serie[0][indice] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def total(self, **rotulos):
+        serie = self._series.get(tuple(rotulos[nome] for nome in self.rotulos))
+        return serie[2] if serie else 0
+
+    def exportar(self):
+        with self._lock:
+            series = [(chave, (list(serie[0]), serie[1], serie[2])) for chave, serie in self._series.items()]
+        for chave, (contagens, soma, total) in sorted(series):
+            acumulado = 0
+            for limite, contagem in zip((*self.buckets, '+Inf'), contagens):
+                acumulado += contagem
+                yield f'{self.nome}_bucket{_rotulos(self.rotulos, chave, ("le", limite))} {acumulado}'
+            yield f'{self.nome}_sum{_rotulos(self.rotulos, chave)} {_numero(soma)}'
+            yield f'{self.nome}_count{_rotulos(self.rotulos, chave)} {total}'
+
+
+class Registro:
+
+    def __init__(self):
+        self._metricas = []
+
+    def contador(self, nome, ajuda, rotulos=()):
+        metrica = Contador(nome, ajuda, rotulos)
+        self._metricas.append(metrica)
+        return metrica
+
+    def histograma(self, nome, ajuda, rotulos=(), buckets=BUCKETS_SEGUNDOS):
+        metrica = Histograma(nome, ajuda, rotulos, buckets)
+        self._metricas.append(metrica)
+        return metrica
+
+    def exportar(self):
+        linhas = []
+        for metrica in self._metricas:
+            linhas.append(f'# HELP {metrica.nome} {metrica.ajuda}')
+            linhas.append(f'# TYPE {metrica.nome} {metrica.tipo}')
+            linhas.extend(metrica.exportar())
+        return '\n'.join(linhas) + '\n'
+
+    def limpar(self):
+        for metrica in self._metricas:
+            metrica.limpar()
+
+
+registro = Registro()
+
+DURACAO_REQUISICAO = registro.histograma(
+    'http_requisicao_segundos', 'Latência das requisições por view.', ('view', 'metodo'),
+)
+REQUISICOES = registro.contador(
+    'http_requisicoes_total', 'Requisições atendidas por view e status.', ('view', 'metodo', 'status'),
+)
+QUERIES_POR_REQUISICAO = registro.histograma(
+    'sql_consultas_por_requisicao', 'Quantidade de consultas SQL por requisição.', ('view',), BUCKETS_QUERIES,
+)
+TEMPO_SQL = registro.contador(
+    'sql_consultas_segundos_total', 'Tempo total gasto em SQL por view.', ('view',),
+)
+ETAPAS_DOCUMENTO = registro.histograma(
+    'documento_etapa_segundos', 'Tempo de cada etapa da geração do .docx (carregar, renderizar, salvar).', ('etapa',),
+)
+PERFIS_COLETADOS = registro.contador(
+    'perfil_amostras_total', 'Requisições lentas que tiveram as pilhas amostradas.', ('view',),
+)
+
+
+@contextmanager
+def cronometro(histograma, **rotulos):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        histograma.observar(time.perf_counter() - inicio, **rotulos)
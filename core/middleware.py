@@ -0,0 +1,162 @@
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from .assincrono import em_thread
+from .estaticos import carregar_estatico
+from .metricas import DURACAO_REQUISICAO, PERFIS_COLETADOS, QUERIES_POR_REQUISICAO, REQUISICOES, TEMPO_SQL
+from .perfilador import AmostradorPilhas, obter_hook
+
+
+class ContadorSql:
+    # execute_wrapper: conta e cronometra cada consulta feita pela requisição
+
+    def __init__(self):
+        self.consultas = 0
+        self.tempo = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tempo += time.perf_counter() - inicio
+            self.consultas += 1
+
+
+# Contador da requisição em andamento. Fica num ContextVar (e não num
+# execute_wrapper por requisição) porque sob ASGI as consultas das views async
+# rodam em outra thread, com outra conexão; o contexto acompanha o sync_to_async.
+_contador_atual = ContextVar('contador_sql', default=None)
+
+
+def _contar_sql(execute, sql, params, many, context):
+    contador = _contador_atual.get()
+    if contador is None:
+        return execute(sql, params, many, context)
+    return contador(execute, sql, params, many, context)
+
+
+def instalar_contador_sql(sender, connection, **kwargs):
+    # Receiver de connection_created (ligado em CoreConfig.ready)
+    if _contar_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_contar_sql)
+
+
+class MetricasMiddleware:
+    # Fica no topo do MIDDLEWARE para medir a requisição inteira (sessão e usuário
+    # incluídos). Em respostas em streaming (ZIP, CSV) mede até o início do envio.
+    # Atende WSGI e ASGI sem adaptação, para não tirar as views async do event loop.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self._acall(request)
+        estado = self._iniciar()
+        try:
+            response = self.get_response(request)
+        finally:
+            estado = self._parar(estado)
+        self._registrar(request, response, *estado)
+        return response
+
+    async def _acall(self, request):
+        estado = self._iniciar()
+        try:
+            response = await self.get_response(request)
+        finally:
+            estado = self._parar(estado)
+        self._registrar(request, response, *estado)
+        return response
+
+    def _iniciar(self):
+        contador = ContadorSql()
+        token = _contador_atual.set(contador)
+        return contador, token, self._iniciar_perfil(), time.perf_counter()
+
+    def _parar(self, estado):
+        contador, token, amostrador, inicio = estado
+        duracao = time.perf_counter() - inicio
+        _contador_atual.reset(token)
+        return contador, duracao, amostrador.parar() if amostrador else None
+
+    def _registrar(self, request, response, contador, duracao, pilhas):
+        resolver = getattr(request, 'resolver_match', None)
+        view = resolver.view_name if resolver else 'nao_resolvida'
+        DURACAO_REQUISICAO.observar(duracao, view=view, metodo=request.method)
+        REQUISICOES.incrementar(view=view, metodo=request.method, status=response.status_code)
+        QUERIES_POR_REQUISICAO.observar(contador.consultas, view=view)
+        TEMPO_SQL.incrementar(contador.tempo, view=view)
+
+        if pilhas and duracao * 1000 >= settings.METRICAS_PERFIL_LIMITE_MS:
+            PERFIS_COLETADOS.incrementar(view=view)
+            obter_hook()(request, view, duracao, pilhas)
+
+    def _iniciar_perfil(self):
+        limite = getattr(settings, 'METRICAS_PERFIL_LIMITE_MS', None)
+        if not limite or random.random() >= getattr(settings, 'METRICAS_PERFIL_FRACAO', 1.0):
+            return None
+        intervalo = getattr(settings, 'METRICAS_PERFIL_INTERVALO_MS', 5) / 1000
+        return AmostradorPilhas(intervalo).iniciar()
+
+
+class EstaticosMiddleware:
+    # Serve STATIC_ROOT (ver core/estaticos.py) antes de sessão e autenticação, sem
+    # passar pelas views. O que não estiver lá segue adiante (no runserver com
+    # DEBUG, o handler de staticfiles já respondeu antes de chegar aqui).
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefixo = '/' + settings.STATIC_URL.lstrip('/')
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        nome = self._nome(request)
+        if iscoroutinefunction(self):
+            return self._acall(request, nome)
+        arquivo = self._carregar(request, nome) if nome else None
+        if arquivo is None:
+            return self.get_response(request)
+        return self._resposta(request, arquivo)
+
+    async def _acall(self, request, nome):
+        # Leitura de disco fora do event loop (só na primeira vez: depois vem do cache)
+        arquivo = await em_thread(self._carregar, request, nome) if nome else None
+        if arquivo is None:
+            return await self.get_response(request)
+        return self._resposta(request, arquivo)
+
+    def _nome(self, request):
+        if request.method not in ('GET', 'HEAD') or not request.path.startswith(self.prefixo):
+            return None
+        return request.path[len(self.prefixo):]
+
+    def _carregar(self, request, nome):
+        aceitas = request.headers.get('Accept-Encoding', '')
+        return carregar_estatico(nome, 'br' in aceitas, 'gzip' in aceitas)
+
+    def _resposta(self, request, arquivo):
+        if not was_modified_since(request.headers.get('If-Modified-Since'), arquivo.modificado_em):
+            return HttpResponseNotModified()
+        response = HttpResponse(arquivo.conteudo, content_type=arquivo.content_type)
+        if arquivo.codificacao:
+            response['Content-Encoding'] = arquivo.codificacao
+        response['Vary'] = 'Accept-Encoding'
+        response['Cache-Control'] = arquivo.cache_control
+        response['Last-Modified'] = http_date(arquivo.modificado_em)
+        return response
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_alter_cliente_orgao_expeditor_alter_cliente_rg'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documento',
+            name='status',
+            field=models.CharField(choices=[('FIL', 'Na fila'), ('OK', 'Concluído'), ('ERR', 'Erro')], default='OK', max_length=3),
+        ),
+    ]
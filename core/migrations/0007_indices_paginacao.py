@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_documento_hash_conteudo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['ativo', 'nome_completo', 'id'], name='cliente_ativo_nome_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='documento',
+            index=models.Index(fields=['data_geracao', 'id'], name='documento_data_idx'),
+        ),
+    ]
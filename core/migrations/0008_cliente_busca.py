@@ -0,0 +1,66 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:51
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+
+# Cópia das normalizações de core/busca.py como estavam nesta migração: ela não
+# pode mudar de resultado se as funções do app mudarem depois
+
+def normalizar_texto(valor):
+    valor = unicodedata.normalize('NFKD', valor or '')
+    valor = ''.join(c for c in valor if not unicodedata.combining(c))
+    return ' '.join(valor.lower().split())
+
+
+def somente_digitos(valor):
+    return re.sub(r'\D', '', valor or '')
+
+
+def normalizar_contato(valor):
+    if re.search(r'[^\W\d_]', valor or ''):
+        return normalizar_texto(valor)
+    return somente_digitos(valor)
+
+
+def preencher_busca(apps, schema_editor):
+    Cliente = apps.get_model('core', 'Cliente')
+    lote = []
+    for cliente in Cliente.objects.only('nome_completo', 'cpf_cnpj', 'contato').iterator(chunk_size=1000):
+        cliente.nome_busca = normalizar_texto(cliente.nome_completo)
+        cliente.documento_busca = somente_digitos(cliente.cpf_cnpj)
+        cliente.contato_busca = normalizar_contato(cliente.contato)
+        lote.append(cliente)
+        if len(lote) >= 1000:
+            Cliente.objects.bulk_update(lote, ['nome_busca', 'documento_busca', 'contato_busca'])
+            lote = []
+    if lote:
+        Cliente.objects.bulk_update(lote, ['nome_busca', 'documento_busca', 'contato_busca'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_indices_paginacao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='contato_busca',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='documento_busca',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='nome_busca',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255),
+        ),
+        migrations.RunPython(preencher_busca, migrations.RunPython.noop),
+    ]
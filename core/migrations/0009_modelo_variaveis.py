@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:02
+
+from django.db import migrations, models
+
+
+def preencher_variaveis(apps, schema_editor):
+    # Só o docxtpl, importado aqui: nada do código do app (core.documentos muda com o tempo)
+    from docxtpl import DocxTemplate
+
+    ModeloDocumento = apps.get_model('core', 'ModeloDocumento')
+    for modelo in ModeloDocumento.objects.all():
+        try:
+            variaveis = DocxTemplate(modelo.arquivo_template.path).get_undeclared_template_variables()
+        except Exception:
+            # Arquivo ausente ou inválido: fica vazio até um novo upload
+            continue
+        modelo.variaveis = sorted(variaveis)
+        modelo.save(update_fields=['variaveis'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_cliente_busca'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='modelodocumento',
+            name='variaveis',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.RunPython(preencher_variaveis, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,125 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def criar_escritorio_principal(apps, schema_editor):
+    # Tudo o que já existe (usuários, clientes, documentos) passa a ser de um único escritório
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Escritorio = apps.get_model('core', 'Escritorio')
+    PerfilUsuario = apps.get_model('core', 'PerfilUsuario')
+    Cliente = apps.get_model('core', 'Cliente')
+    Documento = apps.get_model('core', 'Documento')
+
+    if not User.objects.exists() and not Cliente.objects.exists():
+        return
+    escritorio = Escritorio.objects.create(nome='Escritório principal')
+    PerfilUsuario.objects.bulk_create([
+        PerfilUsuario(usuario_id=usuario_id, escritorio=escritorio)
+        for usuario_id in User.objects.values_list('id', flat=True)
+    ])
+    Cliente.objects.update(escritorio=escritorio)
+    Documento.objects.update(escritorio=escritorio)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_modelo_variaveis'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Escritorio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=150)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PerfilUsuario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('escritorio', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='membros', to='core.escritorio')),
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='perfil', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='escritorio',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='clientes', db_index=False, to='core.escritorio'),
+        ),
+        migrations.AddField(
+            model_name='documento',
+            name='escritorio',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='documentos', db_index=False, to='core.escritorio'),
+        ),
+        migrations.RunPython(criar_escritorio_principal, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='cliente',
+            name='escritorio',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='clientes', db_index=False, to='core.escritorio'),
+        ),
+        migrations.AlterField(
+            model_name='documento',
+            name='escritorio',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='documentos', db_index=False, to='core.escritorio'),
+        ),
+        # Índices e unicidade passam a começar pelo escritório
+        migrations.RemoveIndex(
+            model_name='cliente',
+            name='cliente_ativo_nome_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='documento',
+            name='documento_data_idx',
+        ),
+        migrations.AlterField(
+            model_name='cliente',
+            name='cpf_cnpj',
+            field=models.CharField(max_length=20, verbose_name='CPF/CNPJ'),
+        ),
+        migrations.AlterField(
+            model_name='cliente',
+            name='nome_busca',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='cliente',
+            name='documento_busca',
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='cliente',
+            name='contato_busca',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddConstraint(
+            model_name='cliente',
+            constraint=models.UniqueConstraint(fields=('escritorio', 'cpf_cnpj'), name='cliente_escritorio_cpf_unico'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['escritorio', 'nome_completo', 'id'], name='cliente_esc_nome_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['escritorio', 'nome_busca'], name='cliente_esc_nome_busca_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['escritorio', 'documento_busca'], name='cliente_esc_doc_busca_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['escritorio', 'contato_busca'], name='cliente_esc_contato_busca_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='documento',
+            index=models.Index(fields=['escritorio', 'data_geracao', 'id'], name='documento_esc_data_idx'),
+        ),
+    ]
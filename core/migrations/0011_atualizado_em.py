@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:33
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def preencher_atualizado_em(apps, schema_editor):
+    # Documentos existentes: a última alteração conhecida é a geração
+    Documento = apps.get_model('core', 'Documento')
+    Documento.objects.update(atualizado_em=F('data_geracao'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_escritorios'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documento',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(preencher_atualizado_em, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['escritorio', 'atualizado_em'], name='cliente_esc_atualizado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='documento',
+            index=models.Index(fields=['escritorio', 'atualizado_em'], name='documento_esc_atualizado_idx'),
+        ),
+    ]
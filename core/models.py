@@ -1,6 +1,43 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+from .busca import normalizar_contato, normalizar_texto, somente_digitos
+
+
+# ========================================================
+# ESCRITÓRIOS (DADOS SEPARADOS POR ESCRITÓRIO)
+# ========================================================
+# Cliente, Documento e Honorario têm a coluna escritorio e todos os índices das
+# listagens começam por ela: a consulta de um escritório só percorre as linhas
+# dele. Por isso a FK não ganha o índice próprio (db_index=False), que seria só
+# um prefixo repetido. As views filtram com Model.objects.do_escritorio(...)
+# (ver core/escritorios.py).
+
+class Escritorio(models.Model):
+    nome = models.CharField(max_length=150)
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.nome
+
+
+class PerfilUsuario(models.Model):
+    usuario = models.OneToOneField(User, on_delete=models.CASCADE, related_name='perfil')
+    escritorio = models.ForeignKey(Escritorio, on_delete=models.PROTECT, related_name='membros')
+
+    def __str__(self):
+        return f"{self.usuario} ({self.escritorio})"
+
+
+class EscritorioQuerySet(models.QuerySet):
+
+    def do_escritorio(self, escritorio):
+        # Aceita o Escritorio ou só o id (como fica guardado na sessão)
+        return self.filter(escritorio=escritorio)
+
+
+EscritorioManager = models.Manager.from_queryset(EscritorioQuerySet)
+
 
 class Cliente(models.Model):
 
@@ -17,6 +54,8 @@ class Cliente(models.Model):
         ('V', 'Viúvo(a)'),
     ]
 
+    escritorio = models.ForeignKey(Escritorio, on_delete=models.PROTECT, related_name='clientes', db_index=False)
+
     #Dados Pessoais 
     nome_completo = models.CharField(max_length=255)
     sexo = models.CharField(max_length=1, choices=SEXO_CHOICES, default='M', verbose_name="Sexo")
@@ -25,7 +64,7 @@ class Cliente(models.Model):
     eh_deficiente = models.BooleanField(default=False, verbose_name="É Pessoa com Deficiência?")
 
     #Documentos  e Nascimento 
-    cpf_cnpj = models.CharField(max_length=20, unique=True, verbose_name="CPF/CNPJ")
+    cpf_cnpj = models.CharField(max_length=20, verbose_name="CPF/CNPJ")
     rg = models.CharField(max_length=20, blank=True, null=True, verbose_name="RG")
     orgao_expeditor = models.CharField(max_length=20, blank=True, null=True, verbose_name="Órgão Expeditor")
     data_nascimento = models.DateField(null=True, blank=True, verbose_name="Data de Nascimento")
@@ -45,24 +84,91 @@ class Cliente(models.Model):
     criado_em = models.DateTimeField(auto_now_add=True)
     atualizado_em = models.DateTimeField(auto_now=True)
 
+    # Colunas normalizadas para a busca (preenchidas no save)
+    nome_busca = models.CharField(max_length=255, blank=True, editable=False)
+    documento_busca = models.CharField(max_length=20, blank=True, editable=False)
+    contato_busca = models.CharField(max_length=100, blank=True, editable=False)
+
+    CAMPOS_BUSCA = ['nome_busca', 'documento_busca', 'contato_busca']
+
+    objects = EscritorioManager()
+
+    class Meta:
+        constraints = [
+            # O mesmo CPF/CNPJ pode ser cliente de escritórios diferentes
+            models.UniqueConstraint(fields=['escritorio', 'cpf_cnpj'], name='cliente_escritorio_cpf_unico'),
+        ]
+        indexes = [
+            # Listagem paginada por (nome_completo, id) dentro do escritório. O ativo fica
+            # fora da chave: o ORM gera "WHERE ativo" (sem "= 1") e o SQLite não casa
+            # isso com uma coluna do índice; a linha é descartada durante a varredura
+            models.Index(fields=['escritorio', 'nome_completo', 'id'], name='cliente_esc_nome_idx'),
+            # Busca por prefixo (ver core/busca.py) dentro do escritório
+            models.Index(fields=['escritorio', 'nome_busca'], name='cliente_esc_nome_busca_idx'),
+            models.Index(fields=['escritorio', 'documento_busca'], name='cliente_esc_doc_busca_idx'),
+            models.Index(fields=['escritorio', 'contato_busca'], name='cliente_esc_contato_busca_idx'),
+            # Última alteração do escritório, para o ETag das listagens (core/condicional.py)
+            models.Index(fields=['escritorio', 'atualizado_em'], name='cliente_esc_atualizado_idx'),
+        ]
+
     def __str__(self):
         return self.nome_completo
 
+    def atualizar_busca(self):
+        self.nome_busca = normalizar_texto(self.nome_completo)
+        self.documento_busca = somente_digitos(self.cpf_cnpj)
+        self.contato_busca = normalizar_contato(self.contato)
+
+    def save(self, *args, **kwargs):
+        self.atualizar_busca()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | set(self.CAMPOS_BUSCA)
+        super().save(*args, **kwargs)
+
 class ModeloDocumento(models.Model):
     titulo = models.CharField(max_length=100)
     descricao = models.TextField(blank=True)
     arquivo_template = models.FileField(upload_to='templates_docs/', help_text="Arquivo .docx base com as tags {{nome}}, etc.")
-    
+    # Tags usadas no .docx, extraídas no upload (ver core/documentos.py)
+    variaveis = models.JSONField(default=list, blank=True, editable=False)
+
     def __str__(self):
         return self.titulo
 
 class Documento(models.Model):
+    STATUS_CHOICES = [
+        ('FIL', 'Na fila'),
+        ('OK', 'Concluído'),
+        ('ERR', 'Erro'),
+    ]
+
+    escritorio = models.ForeignKey(Escritorio, on_delete=models.PROTECT, related_name='documentos', db_index=False)
     cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE, related_name='documentos')
     modelo = models.ForeignKey(ModeloDocumento, on_delete=models.SET_NULL, null=True, blank=True)
     tipo = models.CharField(max_length=50)
     arquivo_gerado = models.FileField(upload_to='documentos_gerados/')
     data_geracao = models.DateTimeField(auto_now_add=True)
     criado_por = models.ForeignKey(User, on_delete=models.PROTECT)
+    status = models.CharField(max_length=3, choices=STATUS_CHOICES, default='OK')
+    # Hash de (versão do template, contexto): documentos idênticos compartilham o mesmo arquivo
+    hash_conteudo = models.CharField(max_length=64, blank=True, db_index=True)
+    # Muda também quando a fila conclui o documento (a data_geracao não)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    objects = EscritorioManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['escritorio', 'data_geracao', 'id'], name='documento_esc_data_idx'),
+            models.Index(fields=['escritorio', 'atualizado_em'], name='documento_esc_atualizado_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.tipo} - {self.cliente.nome_completo}"
\ No newline at end of file
+        return f"{self.tipo} - {self.cliente.nome_completo}"
+
+    def save(self, *args, **kwargs):
+        # O escritório é sempre o do cliente (repetido aqui para o índice da listagem)
+        if self.escritorio_id is None:
+            self.escritorio_id = self.cliente.escritorio_id
+        super().save(*args, **kwargs)
\ No newline at end of file
@@ -0,0 +1,111 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import Http404
+
+
+# ========================================================
+# PAGINAÇÃO POR CURSOR (KEYSET)
+# ========================================================
+# Em vez de OFFSET, cada página começa logo depois da última linha da anterior,
+# comparando a tupla de ordenação. Com um índice composto na mesma ordem, o custo
+# de qualquer página é o mesmo, não importa o tamanho do histórico.
+
+TAMANHO_PAGINA = 50
+
+
+class PaginaKeyset:
+
+    def __init__(self, itens, cursor_atual, proximo_cursor):
+        self.itens = itens
+        self.cursor_atual = cursor_atual
+        self.proximo_cursor = proximo_cursor
+
+    def __iter__(self):
+        return iter(self.itens)
+
+    def __len__(self):
+        return len(self.itens)
+
+
+class _EncoderCursor(DjangoJSONEncoder):
+    # O DjangoJSONEncoder corta datetimes em milissegundos; no cursor precisamos do valor exato
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def codificar_cursor(valores):
+    dados = json.dumps(valores, cls=_EncoderCursor).encode('utf-8')
+    return base64.urlsafe_b64encode(dados).decode('ascii')
+
+
+def decodificar_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise Http404("Página inválida.")
+
+
+def _valores_do_cursor(modelo, ordenacao, valores):
+    # O cursor vem da URL: cada valor precisa ser válido para o campo (um id "x" não
+    # pode chegar ao banco como filtro)
+    if not isinstance(valores, list) or len(valores) != len(ordenacao):
+        raise Http404("Página inválida.")
+    convertidos = []
+    for campo, valor in zip(ordenacao, valores):
+        try:
+            convertido = modelo._meta.get_field(campo.lstrip('-')).to_python(valor)
+        except (ValidationError, TypeError, ValueError):
+            raise Http404("Página inválida.")
+        if convertido is None or not isinstance(valor, (str, int, float)):
+            raise Http404("Página inválida.")
+        convertidos.append(convertido)
+    return convertidos
+
+
+def _filtro_apos(ordenacao, valores):
+    # (a, b) > (va, vb)  ==>  a > va OR (a = va AND b > vb)
+    filtro = Q()
+    iguais = {}
+    for campo, valor in zip(ordenacao, valores):
+        nome = campo.lstrip('-')
+        operador = 'lt' if campo.startswith('-') else 'gt'
+        filtro |= Q(**iguais, **{f'{nome}__{operador}': valor})
+        iguais[nome] = valor
+    return filtro
+
+
+def _consulta_pagina(queryset, ordenacao, cursor, tamanho):
+    queryset = queryset.order_by(*ordenacao)
+    if cursor:
+        valores = _valores_do_cursor(queryset.model, ordenacao, decodificar_cursor(cursor))
+        queryset = queryset.filter(_filtro_apos(ordenacao, valores))
+    # Uma linha a mais só para saber se existe próxima página
+    return queryset[:tamanho + 1]
+
+
+def _montar_pagina(itens, ordenacao, cursor, tamanho):
+    proximo_cursor = None
+    if len(itens) > tamanho:
+        itens = itens[:tamanho]
+        ultimo = itens[-1]
+        proximo_cursor = codificar_cursor([getattr(ultimo, campo.lstrip('-')) for campo in ordenacao])
+    return PaginaKeyset(itens, cursor, proximo_cursor)
+
+
+def paginar_keyset(queryset, ordenacao, cursor=None, tamanho=TAMANHO_PAGINA):
+    itens = list(_consulta_pagina(queryset, ordenacao, cursor, tamanho))
+    return _montar_pagina(itens, ordenacao, cursor, tamanho)
+
+
+async def apaginar_keyset(queryset, ordenacao, cursor=None, tamanho=TAMANHO_PAGINA):
+    # Mesma página, lida com o ORM assíncrono (views async)
+    itens = [item async for item in _consulta_pagina(queryset, ordenacao, cursor, tamanho)]
+    return _montar_pagina(itens, ordenacao, cursor, tamanho)
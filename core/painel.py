@@ -0,0 +1,67 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Q, Sum
+
+from financeiro.models import Honorario
+from .models import Cliente, Documento
+
+
+# ========================================================
+# TOTAIS DO PAINEL (HOME) EM CACHE
+# ========================================================
+# Os contadores e somas da home ficam em cache, um por escritório, e são invalidados pelos signals
+# de Cliente, Documento e Honorario. O cache é o alias "painel", em arquivo: a
+# invalidação feita por um worker vale para todos os da máquina. O timeout só
+# cobre o que não passa pelos signals (update() direto no banco).
+
+
+def cache_painel():
+    return caches['painel']
+
+
+def chave_painel(escritorio_id):
+    return f'painel:totais:{escritorio_id}'
+
+
+def calcular_totais(escritorio_id):
+    # Uma única agregação condicional para os dois totais financeiros
+    financeiro = Honorario.objects.do_escritorio(escritorio_id).aggregate(
+        total_receber=Sum('valor', filter=Q(status='PEN'), default=0),
+        total_recebido=Sum('valor', filter=Q(status='PAG'), default=0),
+    )
+    return {
+        'total_clientes': Cliente.objects.do_escritorio(escritorio_id).count(),
+        'total_docs': Documento.objects.do_escritorio(escritorio_id).count(),
+        **financeiro,
+    }
+
+
+async def acalcular_totais(escritorio_id):
+    # As três consultas numa ida só à thread da requisição
+    return await sync_to_async(calcular_totais)(escritorio_id)
+
+
+def obter_totais(escritorio_id):
+    cache = cache_painel()
+    totais = cache.get(chave_painel(escritorio_id))
+    if totais is None:
+        totais = calcular_totais(escritorio_id)
+        cache.set(chave_painel(escritorio_id), totais, getattr(settings, 'CACHE_PAINEL_TIMEOUT', 300))
+    return totais
+
+
+async def aobter_totais(escritorio_id):
+    cache = cache_painel()
+    totais = await cache.aget(chave_painel(escritorio_id))
+    if totais is None:
+        totais = await acalcular_totais(escritorio_id)
+        await cache.aset(chave_painel(escritorio_id), totais, getattr(settings, 'CACHE_PAINEL_TIMEOUT', 300))
+    return totais
+
+
+def invalidar_painel(*escritorios):
+    # Depois do commit: antes disso outra requisição poderia recalcular com os dados antigos
+    chaves = [chave_painel(escritorio_id) for escritorio_id in escritorios]
+    transaction.on_commit(lambda: cache_painel().delete_many(chaves))
@@ -0,0 +1,269 @@
+import atexit
+import http.client
+import io
+import logging
+import queue
+import shutil
+import socket
+import subprocess
+import threading
+import time
+import xmlrpc.client
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.table import Table
+
+from .documentos import gravar_atomico
+
+logger = logging.getLogger(__name__)
+
+
+# ========================================================
+# CONVERSÃO DOCX -> PDF
+# ========================================================
+# O LibreOffice leva alguns segundos para subir, então não dá para abrir um
+# "soffice --convert-to" por requisição. Mantemos um pool de processos unoserver
+# (LibreOffice headless que recebe conversões por XML-RPC) já aquecidos: cada
+# conversão pega um processo livre, manda o .docx em memória e recebe o PDF.
+# Sem unoserver instalado, cai para um PDF simples gerado em Python (fpdf2),
+# só com o texto dos parágrafos e tabelas.
+#
+# As portas de cada unoserver vêm do sistema operacional a cada início: com vários
+# workers (gunicorn/uvicorn) cada processo tem o seu pool, e portas fixas fariam os
+# pools de workers diferentes disputarem as mesmas. PDF_PORTA_INICIAL fixa as
+# portas, só para quem roda um processo só.
+#
+# O PDF fica no storage ao lado do .docx (mesmo hash, extensão .pdf), então
+# cada documento é convertido uma vez só.
+
+CONTENT_TYPE_PDF = 'application/pdf'
+
+
+class ErroConversao(Exception):
+    pass
+
+
+class _TransporteComTimeout(xmlrpc.client.Transport):
+
+    def __init__(self, timeout):
+        super().__init__()
+        self.timeout = timeout
+
+    def make_connection(self, host):
+        conexao = super().make_connection(host)
+        conexao.timeout = self.timeout
+        return conexao
+
+
+def portas_livres(quantidade):
+    # Abertas ao mesmo tempo, para o sistema não devolver a mesma porta duas vezes
+    soquetes = [socket.socket() for _ in range(quantidade)]
+    try:
+        for soquete in soquetes:
+            soquete.bind(('127.0.0.1', 0))
+        return [soquete.getsockname()[1] for soquete in soquetes]
+    finally:
+        for soquete in soquetes:
+            soquete.close()
+
+
+class ProcessoUnoserver:
+    # Um LibreOffice headless de vida longa, reiniciado se morrer.
+    # Sem porta, pede duas portas livres ao sistema a cada início.
+
+    def __init__(self, comando, porta, porta_uno, timeout):
+        self.comando = comando
+        self.porta = porta
+        self.porta_uno = porta_uno
+        self.timeout = timeout
+        self._portas_automaticas = porta is None
+        self._processo = None
+
+    def _proxy(self, timeout=None):
+        return xmlrpc.client.ServerProxy(
+            f'http://127.0.0.1:{self.porta}', transport=_TransporteComTimeout(timeout or self.timeout), allow_none=True
+        )
+
+    def ativo(self):
+        return self._processo is not None and self._processo.poll() is None
+
+    def iniciar(self):
+        self.encerrar()
+        if self._portas_automaticas:
+            self.porta, self.porta_uno = portas_livres(2)
+        self._processo = subprocess.Popen(
+            [self.comando, '--interface', '127.0.0.1', '--port', str(self.porta), '--uno-port', str(self.porta_uno)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        limite = time.monotonic() + self.timeout
+        while time.monotonic() < limite:
+            if not self.ativo():
+                raise ErroConversao(f"O unoserver na porta {self.porta} encerrou ao iniciar.")
+            try:
+                self._proxy(timeout=2).info()
+                return
+            except (OSError, http.client.HTTPException, xmlrpc.client.Error):
+                time.sleep(0.5)
+        self.encerrar()
+        raise ErroConversao(f"O unoserver na porta {self.porta} não respondeu em {self.timeout}s.")
+
+    def converter(self, dados):
+        if not self.ativo():
+            self.iniciar()
+        try:
+            resultado = self._proxy().convert(None, xmlrpc.client.Binary(dados), None, 'pdf')
+        except (OSError, http.client.HTTPException, xmlrpc.client.Error) as erro:
+            # Processo travado ou corrompido: descarta para o próximo uso subir outro
+            logger.warning('Conversão para PDF falhou no unoserver da porta %s: %s', self.porta, erro)
+            self.encerrar()
+            raise ErroConversao(f"Falha na conversão para PDF: {erro}")
+        return resultado.data
+
+    def encerrar(self):
+        if self._processo is None:
+            return
+        if self._processo.poll() is None:
+            self._processo.terminate()
+            try:
+                self._processo.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._processo.kill()
+        self._processo = None
+
+
+class PoolConversores:
+
+    def __init__(self, tamanho=None, porta_inicial=None, comando=None, timeout=None):
+        self.tamanho = tamanho
+        self.porta_inicial = porta_inicial
+        self.comando = comando
+        self.timeout = timeout
+        self._livres = None
+        self._processos = []
+        self._lock = threading.Lock()
+
+    def _config(self, nome, padrao):
+        return getattr(self, nome) or getattr(settings, f'PDF_{nome.upper()}', padrao)
+
+    def disponivel(self):
+        return shutil.which(self._config('comando', 'unoserver')) is not None
+
+    def _obter_livres(self):
+        # Os processos sobem sob demanda (no primeiro uso de cada um) e ficam vivos
+        with self._lock:
+            if self._livres is None:
+                comando = shutil.which(self._config('comando', 'unoserver'))
+                porta = self._config('porta_inicial', None)
+                timeout = self._config('timeout', 60)
+                self._livres = queue.Queue()
+                for indice in range(self._config('tamanho', 2)):
+                    if porta:
+                        processo = ProcessoUnoserver(comando, porta + 2 * indice, porta + 2 * indice + 1, timeout)
+                    else:
+                        processo = ProcessoUnoserver(comando, None, None, timeout)
+                    self._processos.append(processo)
+                    self._livres.put(processo)
+            return self._livres
+
+    def converter(self, dados):
+        livres = self._obter_livres()
+        try:
+            processo = livres.get(timeout=self._config('timeout', 60))
+        except queue.Empty:
+            raise ErroConversao("Todos os conversores de PDF estão ocupados. Tente novamente.")
+        try:
+            return processo.converter(dados)
+        finally:
+            livres.put(processo)
+
+    def encerrar(self):
+        with self._lock:
+            for processo in self._processos:
+                processo.encerrar()
+
+
+pool_conversores = PoolConversores()
+atexit.register(pool_conversores.encerrar)
+
+
+# --------------------------------------------------------
+# Alternativa em Python puro
+# --------------------------------------------------------
+
+ALINHAMENTOS = {
+    WD_ALIGN_PARAGRAPH.CENTER: 'C',
+    WD_ALIGN_PARAGRAPH.RIGHT: 'R',
+    WD_ALIGN_PARAGRAPH.JUSTIFY: 'J',
+}
+
+# As fontes padrão do PDF só têm Latin-1
+SUBSTITUICOES = {'“': '"', '”': '"', '‘': "'", '’': "'", '–': '-', '—': '-', '…': '...'}
+
+
+def _texto_latin1(texto):
+    for original, troca in SUBSTITUICOES.items():
+        texto = texto.replace(original, troca)
+    return texto.encode('latin-1', 'replace').decode('latin-1')
+
+
+def converter_pdf_simples(dados):
+    try:
+        from fpdf import FPDF
+    except ImportError:
+        raise ErroConversao("Para gerar PDF instale o unoserver (LibreOffice) ou o pacote fpdf2.")
+
+    documento = Document(io.BytesIO(dados))
+    pdf = FPDF(format='A4')
+    pdf.set_margins(25, 25, 25)
+    pdf.set_auto_page_break(True, margin=25)
+    pdf.add_page()
+    pdf.set_font('Helvetica', size=11)
+
+    # Parágrafos e tabelas na ordem em que aparecem no corpo
+    for bloco in documento.iter_inner_content():
+        if isinstance(bloco, Table):
+            pdf.set_font('Helvetica', size=10)
+            for linha in bloco.rows:
+                texto = ' | '.join(celula.text for celula in linha.cells)
+                pdf.multi_cell(0, 6, _texto_latin1(texto), new_x='LMARGIN', new_y='NEXT')
+        else:
+            negrito = any(run.text.strip() for run in bloco.runs) and all(run.bold for run in bloco.runs if run.text.strip())
+            pdf.set_font('Helvetica', style='B' if negrito else '', size=11)
+            pdf.multi_cell(
+                0, 6, _texto_latin1(bloco.text), align=ALINHAMENTOS.get(bloco.alignment, 'L'), new_x='LMARGIN', new_y='NEXT'
+            )
+        pdf.ln(2)
+
+    return bytes(pdf.output())
+
+
+def converter_pdf(dados):
+    if pool_conversores.disponivel():
+        return pool_conversores.converter(dados)
+    return converter_pdf_simples(dados)
+
+
+# --------------------------------------------------------
+# Cache no storage
+# --------------------------------------------------------
+
+def caminho_pdf(caminho_docx):
+    return caminho_docx.rsplit('.', 1)[0] + '.pdf'
+
+
+def obter_pdf(caminho_docx):
+    # Devolve o caminho do PDF no storage, convertendo só na primeira vez
+    caminho = caminho_pdf(caminho_docx)
+    if not default_storage.exists(caminho):
+        with default_storage.open(caminho_docx, 'rb') as origem:
+            dados = converter_pdf(origem.read())
+        # Atômico como o .docx: exists() nunca vê um PDF pela metade
+        gravar_atomico(caminho, dados)
+    return caminho
+
+
+def nome_pdf(nome_docx):
+    return nome_docx.rsplit('.', 1)[0] + '.pdf'
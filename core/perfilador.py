@@ -0,0 +1,74 @@
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+# ========================================================
+# PERFILADOR POR AMOSTRAGEM (REQUISIÇÕES LENTAS)
+# ========================================================
+# Enquanto a requisição roda, uma thread olha as pilhas de todas as threads do
+# processo a cada poucos milissegundos (sys._current_frames) e conta as pilhas
+# vistas, com o nome da thread na raiz. Todas, e não só a da requisição, porque
+# uma view async roda no event loop e no pool de core.assincrono; em contrapartida
+# requisições simultâneas também aparecem (filtre pela thread). Se a requisição
+# passar do limite, as pilhas vão para o hook configurado; por padrão viram um
+# arquivo "collapsed stacks" (formato do flamegraph.pl / speedscope).
+#
+# Desligado por padrão. METRICAS_PERFIL_LIMITE_MS liga; METRICAS_PERFIL_FRACAO
+# controla que fração das requisições é amostrada (o custo é uma thread extra).
+
+
+class AmostradorPilhas:
+
+    def __init__(self, intervalo):
+        self.intervalo = intervalo
+        self.pilhas = Counter()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._amostrar, name='perfilador', daemon=True)
+
+    def _amostrar(self):
+        while not self._parar.wait(self.intervalo):
+            nomes = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == self._thread.ident:
+                    continue
+                pilha = []
+                while frame is not None:
+                    codigo = frame.f_code
+                    pilha.append(f'{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{frame.f_lineno})')
+                    frame = frame.f_back
+                pilha.append(nomes.get(thread_id, str(thread_id)))
+                self.pilhas[';'.join(reversed(pilha))] += 1
+
+    def iniciar(self):
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+        self._thread.join()
+        return self.pilhas
+
+
+def gravar_pilhas(request, view, duracao, pilhas):
+    # Hook padrão: um arquivo por requisição lenta em METRICAS_PERFIL_PASTA
+    pasta = getattr(settings, 'METRICAS_PERFIL_PASTA', None) or os.path.join(settings.BASE_DIR, 'perfis')
+    os.makedirs(pasta, exist_ok=True)
+    nome = f"{time.strftime('%Y%m%d-%H%M%S')}-{view.replace(':', '_')}-{int(duracao * 1000)}ms.txt"
+    with open(os.path.join(pasta, nome), 'w') as arquivo:
+        for pilha, quantidade in pilhas.most_common():
+            arquivo.write(f'{pilha} {quantidade}\n')
+    logger.warning('Requisição lenta em %s (%.0f ms): pilhas em %s', view, duracao * 1000, nome)
+
+
+def obter_hook():
+    caminho = getattr(settings, 'METRICAS_PERFIL_HOOK', None)
+    return import_string(caminho) if caminho else gravar_pilhas
@@ -0,0 +1,41 @@
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .autenticacao import invalidar_usuario
+from .escritorios import CHAVE_SESSAO, criar_escritorio_pessoal, escritorio_do_usuario
+from .models import Cliente, Documento, ModeloDocumento
+from .painel import invalidar_painel
+
+
+# Quando o modelo é trocado/removido no admin, o template em cache deixa de valer
+@receiver([post_save, post_delete], sender=ModeloDocumento)
+def invalidar_template_modelo(sender, instance, **kwargs):
+    # Import tardio: core.documentos puxa docx/docxtpl/lxml, caros para carregar no
+    # início de cada worker (ver benchmark_inicializacao)
+    from .documentos import cache_templates
+    cache_templates.invalidar(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Cliente)
+@receiver([post_save, post_delete], sender=Documento)
+def atualizar_painel(sender, instance, **kwargs):
+    invalidar_painel(instance.escritorio_id)
+
+
+@receiver(post_save, sender=User)
+def criar_escritorio_do_usuario(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        criar_escritorio_pessoal(instance)
+
+
+# Senha, is_active, is_staff e is_superuser ficam no objeto em cache
+@receiver([post_save, post_delete], sender=User)
+def invalidar_usuario_em_cache(sender, instance, **kwargs):
+    invalidar_usuario(instance.pk)
+
+
+@receiver(user_logged_in)
+def guardar_escritorio_na_sessao(sender, request, user, **kwargs):
+    request.session[CHAVE_SESSAO] = escritorio_do_usuario(user)
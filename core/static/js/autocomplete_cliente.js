@@ -0,0 +1,79 @@
+// Troca os <select data-autocomplete> por um campo de busca com sugestões
+// paginadas (ver core/widgets.py). O <select> continua no form, escondido,
+// e recebe só a opção escolhida.
+(function() {
+    function iniciar(select) {
+        var caixa = document.createElement('div');
+        caixa.className = 'position-relative';
+        var campo = document.createElement('input');
+        campo.type = 'search';
+        campo.className = 'form-control';
+        campo.autocomplete = 'off';
+        campo.placeholder = select.dataset.placeholder;
+        var lista = document.createElement('div');
+        lista.className = 'list-group position-absolute w-100 shadow';
+        lista.style.zIndex = 1000;
+
+        var selecionada = select.options[select.selectedIndex];
+        if (selecionada && selecionada.value) {
+            campo.value = selecionada.text;
+        }
+        select.classList.add('d-none');
+        select.parentNode.insertBefore(caixa, select);
+        caixa.appendChild(campo);
+        caixa.appendChild(lista);
+        caixa.appendChild(select);
+
+        var espera = null;
+
+        function escolher(cliente) {
+            select.innerHTML = '';
+            select.add(new Option(cliente.nome, cliente.id, true, true));
+            campo.value = cliente.nome;
+            lista.innerHTML = '';
+        }
+
+        function carregar(termo, cursor) {
+            var url = select.dataset.autocomplete + '&q=' + encodeURIComponent(termo);
+            if (cursor) {
+                url += '&cursor=' + encodeURIComponent(cursor);
+            }
+            fetch(url).then(function(r) { return r.json(); }).then(function(dados) {
+                if (!cursor) {
+                    lista.innerHTML = '';
+                }
+                dados.resultados.forEach(function(cliente) {
+                    var item = document.createElement('button');
+                    item.type = 'button';
+                    item.className = 'list-group-item list-group-item-action';
+                    item.textContent = cliente.nome + ' — ' + cliente.cpf_cnpj;
+                    item.addEventListener('click', function() { escolher(cliente); });
+                    lista.appendChild(item);
+                });
+                if (dados.proximo) {
+                    var mais = document.createElement('button');
+                    mais.type = 'button';
+                    mais.className = 'list-group-item list-group-item-action text-center text-primary';
+                    mais.textContent = 'Carregar mais';
+                    mais.addEventListener('click', function() {
+                        mais.remove();
+                        carregar(termo, dados.proximo);
+                    });
+                    lista.appendChild(mais);
+                }
+            });
+        }
+
+        campo.addEventListener('input', function() {
+            clearTimeout(espera);
+            var termo = campo.value.trim();
+            if (termo.length < 2) {
+                lista.innerHTML = '';
+                return;
+            }
+            espera = setTimeout(function() { carregar(termo, null); }, 200);
+        });
+    }
+
+    document.querySelectorAll('select[data-autocomplete]').forEach(iniciar);
+})();
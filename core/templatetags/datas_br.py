@@ -0,0 +1,27 @@
+from django import template
+
+from core import datas
+
+register = template.Library()
+
+
+# Valor vazio (None, '') não quebra o template: vira string vazia
+
+@register.filter
+def data_br(valor):
+    return datas.data_curta(valor) if valor else ''
+
+
+@register.filter
+def data_hora_br(valor, formato=''):
+    return datas.data_hora(valor, com_ano=formato != 'sem_ano') if valor else ''
+
+
+@register.filter
+def data_extenso(valor):
+    return datas.data_por_extenso(valor) if valor else ''
+
+
+@register.filter
+def mes_ano(valor):
+    return datas.mes_ano(valor) if valor else ''
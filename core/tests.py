@@ -1,3 +1,1205 @@
-from django.test import TestCase
+import gzip
+import importlib.util
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import zipfile
+from io import BytesIO
+from datetime import date, datetime, timedelta, timezone as fuso
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.template import Context, Template
+from django.urls import get_resolver, reverse
+from django.utils import timezone
+
+from financeiro.models import Honorario
+from docx import Document as DocumentoWord
+from docxtpl import DocxTemplate
+
+from .benchmark import comparar, resumir, semear
+from .datas import data_hora, data_por_extenso
+from .estaticos import carregar_estatico
+from .fila import fila_documentos, processar_documento
+from .documentos import (
+    CacheTemplates, DocxPrecompilado, ErroTemplate, caminho_gerado, carregar_template, compilar_template,
+    gerar_zip_lote, gravar_atomico, montar_contexto, obter_documento_gerado,
+)
+from .forms import ClienteForm, ModeloDocumentoForm
+from .metricas import DURACAO_REQUISICAO, ETAPAS_DOCUMENTO, QUERIES_POR_REQUISICAO, registro
+from .perfilador import AmostradorPilhas
+from .importacao import ler_csv, ler_xlsx, importar_clientes
+from .pdf import PoolConversores
+from .autenticacao import BackendUsuarioEmCache, cache_autenticacao
+from .escritorios import CHAVE_SESSAO
+from .models import Cliente, Documento, Escritorio, ModeloDocumento
+from .paginacao import codificar_cursor, paginar_keyset
+from .painel import cache_painel
+
+
+# ========================================================
+# DADOS DE TESTE
+# ========================================================
+
+def semear_dados(usuario, quantidade):
+    modelo = semear(usuario, quantidade)
+    return list(Cliente.objects.order_by('id')), modelo
+
+
+def usar_media_temporaria(teste):
+    # MEDIA_ROOT numa pasta temporária com os templates de exemplo. Recebe o teste
+    # (no setUp) ou a classe (no setUpClass); tudo é desfeito no cleanup
+    limpar = teste.addClassCleanup if isinstance(teste, type) else teste.addCleanup
+    media = tempfile.mkdtemp()
+    limpar(shutil.rmtree, media, ignore_errors=True)
+    shutil.copytree(settings.BASE_DIR / 'templates_docs', f'{media}/templates_docs')
+    override = override_settings(MEDIA_ROOT=media)
+    override.enable()
+    limpar(override.disable)
+    return media
+
+
+# ========================================================
+# ORÇAMENTO DE QUERIES POR URL
+# ========================================================
+# Cada rota do urlconf precisa ter um orçamento. Rota nova sem orçamento, ou view
+# que passe a fazer query por linha (N+1), quebra a suíte.
+
+class OrcamentoQueriesMixin:
+    urlconf = None
+    # nome da rota -> (método, máximo de queries)
+    orcamentos = {}
+    quantidade = 2000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('advogado', password='senha-teste')
+        cls.clientes, cls.modelo = semear_dados(cls.usuario, cls.quantidade)
+
+    def setUp(self):
+        cache_painel().clear()
+        self.client.force_login(self.usuario)
+
+    def argumentos(self, nome):
+        return {}
+
+    def dados(self, nome):
+        return {}
+
+    def assertMaxQueries(self, maximo, func):
+        with CaptureQueriesContext(connection) as contexto:
+            resposta = func()
+        self.assertLessEqual(
+            len(contexto), maximo,
+            f'{len(contexto)} queries (orçamento: {maximo}):\n' + '\n'.join(q['sql'] for q in contexto.captured_queries)
+        )
+        return resposta
+
+    def test_todas_as_rotas_tem_orcamento(self):
+        nomes = {rota.name for rota in get_resolver(self.urlconf).url_patterns}
+        self.assertEqual(nomes, set(self.orcamentos))
+
+    def test_orcamento_de_queries(self):
+        for nome, (metodo, maximo) in self.orcamentos.items():
+            with self.subTest(rota=nome):
+                url = reverse(nome, kwargs=self.argumentos(nome))
+                requisicao = getattr(self.client, metodo)
+                resposta = self.assertMaxQueries(maximo, lambda: self.consumir(requisicao(url, self.dados(nome))))
+                self.assertLess(resposta.status_code, 400)
+
+    def consumir(self, resposta):
+        # Respostas em streaming fazem as queries enquanto o conteúdo é lido
+        if resposta.streaming:
+            resposta.conteudo = b''.join(resposta.streaming_content)
+        return resposta
+
+
+class CoreOrcamentoQueriesTest(OrcamentoQueriesMixin, TestCase):
+    urlconf = 'core.urls'
+    orcamentos = {
+        # sessão + usuário = até 2 queries em toda view com login (nenhuma depois que
+        # estão no cache de autenticação, ver core/autenticacao.py)
+        # As listagens têm mais uma para o ETag (core/condicional.py)
+        'lista_clientes': ('get', 4),
+        'lista_clientes_inativos': ('get', 4),
+        'buscar_clientes': ('get', 3),
+        'novo_cliente': ('get', 2),
+        'importar_clientes': ('get', 2),
+        'exportar_clientes': ('get', 3),
+        'editar_cliente': ('get', 3),
+        'lista_documentos': ('get', 4),
+        'selecionar_modelo': ('get', 4),
+        'gerar_documento': ('get', 5),
+        'enfileirar_documento': ('post', 5),
+        'status_documento': ('get', 3),
+        'baixar_documento': ('get', 3),
+        'gerar_lote': ('get', 3),
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        usar_media_temporaria(cls)
+
+    def argumentos(self, nome):
+        cliente = self.clientes[1]
+        if nome == 'editar_cliente':
+            return {'id': cliente.id}
+        if nome == 'selecionar_modelo':
+            return {'cliente_id': cliente.id}
+        if nome in ('gerar_documento', 'enfileirar_documento'):
+            return {'cliente_id': cliente.id, 'modelo_id': self.modelo.id}
+        if nome == 'status_documento':
+            return {'id': cliente.documentos.first().id}
+        if nome == 'baixar_documento':
+            # Só documentos com arquivo podem ser baixados
+            self.client.get(reverse('gerar_documento', args=[cliente.id, self.modelo.id])).close()
+            return {'id': Documento.objects.latest('id').id}
+        return {}
+
+    def dados(self, nome):
+        if nome == 'buscar_clientes':
+            return {'q': 'cliente 0001'}
+        return {}
+
+    def test_home(self):
+        self.assertMaxQueries(6, lambda: self.client.get(reverse('home')))
+        # Com o painel em cache sobram sessão, usuário e últimos documentos
+        self.assertMaxQueries(3, lambda: self.client.get(reverse('home')))
+
+
+class PaginacaoKeysetTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('advogado', password='senha-teste')
+        semear_dados(cls.usuario, 120)
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def percorrer(self, url):
+        vistos = []
+        cursor = None
+        while True:
+            resposta = self.client.get(url, {'cursor': cursor} if cursor else {})
+            pagina = resposta.context['clientes_ativos']
+            vistos += [cliente.id for cliente in pagina]
+            cursor = pagina.proximo_cursor
+            if not cursor:
+                return vistos
+
+    def test_percorre_todos_os_clientes_sem_repetir(self):
+        # Nomes repetidos obrigam o desempate pelo id
+        Cliente.objects.filter(id__lte=60).update(nome_completo='Mesmo Nome')
+        esperado = list(
+            Cliente.objects.filter(ativo=True).order_by('nome_completo', 'id').values_list('id', flat=True)
+        )
+        self.assertEqual(self.percorrer(reverse('lista_clientes')), esperado)
+
+    def test_cursor_preserva_microssegundos(self):
+        documentos = list(Documento.objects.order_by('id')[:3])
+        base = documentos[0].data_geracao.replace(microsecond=1000)
+        for i, documento in enumerate(documentos):
+            Documento.objects.filter(id=documento.id).update(data_geracao=base.replace(microsecond=1000 + i * 100))
+        Documento.objects.exclude(id__in=[d.id for d in documentos]).update(data_geracao=base.replace(year=base.year - 1))
+
+        primeira = paginar_keyset(Documento.objects.all(), ('-data_geracao', '-id'), tamanho=1)
+        segunda = paginar_keyset(Documento.objects.all(), ('-data_geracao', '-id'), primeira.proximo_cursor, tamanho=1)
+        self.assertEqual([d.id for d in primeira], [documentos[2].id])
+        self.assertEqual([d.id for d in segunda], [documentos[1].id])
+
+    def test_cursor_invalido(self):
+        resposta = self.client.get(reverse('lista_clientes'), {'cursor': 'nao-e-um-cursor'})
+        self.assertEqual(resposta.status_code, 404)
+
+    def test_cursor_adulterado(self):
+        # JSON válido, mas com valores que não servem para os campos da ordenação
+        adulterados = [codificar_cursor(valores) for valores in (['x', 'x'], ['Ana', None], [['a'], 1], {'id': 'x'})]
+        rotas = ('lista_clientes', 'lista_clientes_inativos', 'lista_documentos', 'lista_honorarios', 'buscar_clientes')
+        for nome in rotas:
+            for cursor in adulterados:
+                with self.subTest(rota=nome, cursor=cursor):
+                    self.assertEqual(self.client.get(reverse(nome), {'cursor': cursor}).status_code, 404)
+        data_invalida = codificar_cursor(['ontem', 1])
+        self.assertEqual(self.client.get(reverse('lista_documentos'), {'cursor': data_invalida}).status_code, 404)
+
+
+class BuscaClientesTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('advogado', password='senha-teste')
+        dados = dict(estado_civil='S', endereco='Rua A', numero='1', cep='40000-000', profissao='Autônomo')
+        dados['escritorio'] = cls.usuario.perfil.escritorio
+        cls.joao = Cliente.objects.create(nome_completo='João Conceição', cpf_cnpj='123.456.789-00', contato='(71) 98888-7777', **dados)
+        cls.maria = Cliente.objects.create(nome_completo='Maria Souza', cpf_cnpj='987.654.321-00', contato='Maria@Exemplo.com', **dados)
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def buscar(self, termo):
+        resposta = self.client.get(reverse('buscar_clientes'), {'q': termo})
+        return [item['id'] for item in resposta.json()['resultados']]
+
+    def test_nome_sem_acento_e_maiusculas(self):
+        self.assertEqual(self.buscar('JOAO conc'), [self.joao.id])
+
+    def test_cpf_somente_digitos(self):
+        self.assertEqual(self.buscar('123456'), [self.joao.id])
+        self.assertEqual(self.buscar('123.456.7'), [self.joao.id])
+
+    def test_contato(self):
+        self.assertEqual(self.buscar('7198888'), [self.joao.id])
+        self.assertEqual(self.buscar('maria@ex'), [self.maria.id])
+
+    def test_colunas_acompanham_edicao(self):
+        self.joao.nome_completo = 'Antônio'
+        self.joao.save(update_fields=['nome_completo'])
+        self.assertEqual(self.buscar('antonio'), [self.joao.id])
+        self.assertEqual(self.buscar('joao'), [])
+
+    def test_termo_curto(self):
+        self.assertEqual(self.buscar('j'), [])
+
+    def test_sobrenome(self):
+        self.assertEqual(self.buscar('souza'), [self.maria.id])
+        self.assertEqual(self.buscar('conceicao'), [self.joao.id])
+        # Só início de palavra: "ouza" não é sobrenome de ninguém
+        self.assertEqual(self.buscar('ouza'), [])
+
+    def test_limite_fora_do_intervalo(self):
+        for limite in ('-1', '0', 'abc', '2.5', '1000'):
+            with self.subTest(limite=limite):
+                resposta = self.client.get(reverse('buscar_clientes'), {'q': 'maria', 'limite': limite})
+                self.assertEqual(resposta.status_code, 200)
+                self.assertEqual([item['id'] for item in resposta.json()['resultados']], [self.maria.id])
+
+    def test_paginas_por_cursor(self):
+        self.maria.contato = '(71) 3333-0000'
+        self.maria.save()
+        parametros = {'q': '71', 'limite': 1}
+        primeira = self.client.get(reverse('buscar_clientes'), parametros).json()
+        segunda = self.client.get(reverse('buscar_clientes'), {**parametros, 'cursor': primeira['proximo']}).json()
+        self.assertEqual([item['id'] for item in primeira['resultados']], [self.joao.id])
+        self.assertEqual([item['id'] for item in segunda['resultados']], [self.maria.id])
+        self.assertIsNone(segunda['proximo'])
+
+
+class EscritoriosTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('advogado', password='senha-teste')
+        cls.vizinho = User.objects.create_user('vizinho', password='senha-teste')
+        dados = dict(estado_civil='S', endereco='Rua A', numero='1', cep='40000-000', profissao='Autônomo', contato='71')
+        cls.ana = Cliente.objects.create(
+            escritorio=cls.usuario.perfil.escritorio, nome_completo='Ana Lima', cpf_cnpj='111', **dados
+        )
+        # Mesmo CPF em outro escritório é outro cliente
+        cls.ana_vizinha = Cliente.objects.create(
+            escritorio=cls.vizinho.perfil.escritorio, nome_completo='Ana Vizinha', cpf_cnpj='111', **dados
+        )
+
+    def setUp(self):
+        cache_painel().clear()
+        self.client.force_login(self.usuario)
+
+    def test_usuario_novo_ganha_escritorio_e_login_guarda_na_sessao(self):
+        self.assertNotEqual(self.usuario.perfil.escritorio_id, self.vizinho.perfil.escritorio_id)
+        self.assertEqual(self.client.session[CHAVE_SESSAO], self.usuario.perfil.escritorio_id)
+
+    def test_cliente_de_outro_escritorio_nao_aparece(self):
+        self.assertEqual(self.client.get(reverse('editar_cliente', args=[self.ana_vizinha.id])).status_code, 404)
+        self.assertEqual(
+            self.client.get(reverse('gerar_documento', args=[self.ana_vizinha.id, 1])).status_code, 404
+        )
+        resposta = self.client.get(reverse('lista_clientes'))
+        self.assertEqual([cliente.id for cliente in resposta.context['clientes_ativos']], [self.ana.id])
+        busca = self.client.get(reverse('buscar_clientes'), {'q': 'ana'}).json()['resultados']
+        self.assertEqual([item['id'] for item in busca], [self.ana.id])
+        self.assertEqual(self.client.get(reverse('home')).context['total_clientes'], 1)
+
+    def test_sessao_antiga_sem_escritorio(self):
+        sessao = self.client.session
+        del sessao[CHAVE_SESSAO]
+        sessao.save()
+        self.assertEqual(self.client.get(reverse('editar_cliente', args=[self.ana.id])).status_code, 200)
+        self.assertEqual(self.client.session[CHAVE_SESSAO], self.usuario.perfil.escritorio_id)
+
+    def test_cpf_repetido_so_dentro_do_escritorio(self):
+        dados = {
+            'nome_completo': 'Outra Ana', 'sexo': 'F', 'nacionalidade': 'Brasileira', 'estado_civil': 'S',
+            'cpf_cnpj': '111', 'endereco': 'Rua', 'numero': '1', 'cep': '40000', 'profissao': 'X', 'contato': '71',
+        }
+        form = ClienteForm(dados, instance=Cliente(escritorio_id=self.usuario.perfil.escritorio_id))
+        self.assertIn('cpf_cnpj', form.errors)
+        form = ClienteForm(
+            {**dados, 'cidade': 'Salvador', 'bairro': 'Centro'},
+            instance=Cliente(escritorio=Escritorio.objects.create(nome='Terceiro')),
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', 'plano de execução do SQLite')
+    def test_listagem_usa_indice_do_escritorio(self):
+        consulta = Cliente.objects.do_escritorio(self.usuario.perfil.escritorio).filter(ativo=True)
+        plano = consulta.order_by('nome_completo', 'id')[:20].explain()
+        self.assertIn('cliente_esc_nome_idx', plano)
+
+
+class AdminTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser('admin', password='senha-teste')
+        semear(cls.usuario, 150, honorarios_por_cliente=2)
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def test_listagens_sem_query_por_linha(self):
+        # sessão + usuário + contagem filtrada + página (+ datas do date_hierarchy / opções dos filtros)
+        for url, maximo in (
+            ('/admin/core/cliente/', 5),
+            ('/admin/core/documento/', 7),
+            ('/admin/financeiro/honorario/', 6),
+        ):
+            with self.subTest(url=url), CaptureQueriesContext(connection) as contexto:
+                resposta = self.client.get(url)
+                self.assertEqual(resposta.status_code, 200)
+                self.assertLessEqual(len(contexto), maximo)
+                self.assertEqual(len(resposta.context['cl'].result_list), 100)
+
+    def test_busca_por_prefixo_e_autocomplete(self):
+        resposta = self.client.get('/admin/core/documento/', {'q': 'cliente 00012'})
+        self.assertEqual({str(documento.cliente) for documento in resposta.context['cl'].result_list}, {
+            f'Cliente {i:06d}' for i in range(120, 130)
+        })
+        resposta = self.client.get('/admin/autocomplete/', {
+            'app_label': 'financeiro', 'model_name': 'honorario', 'field_name': 'cliente', 'term': '0000000001',
+        })
+        self.assertEqual([item['text'] for item in resposta.json()['results']], [f'Cliente {i:06d}' for i in range(10, 20)])
+
+
+class ImportacaoClientesTest(TestCase):
+    CABECALHO = 'nome_completo;sexo;estado_civil;cpf_cnpj;data_nascimento;endereco;numero;bairro;cidade;cep;profissao;contato\n'
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('advogado', password='senha-teste')
+        self.escritorio = self.usuario.perfil.escritorio_id
+
+    def importar(self, linhas, tamanho_lote=2):
+        conteudo = (self.CABECALHO + ''.join(linhas)).encode('utf-8')
+        return importar_clientes(ler_csv(BytesIO(conteudo)), self.escritorio, tamanho_lote)
+
+    def test_cria_atualiza_e_reporta_erros(self):
+        Cliente.objects.create(
+            escritorio_id=self.escritorio, nome_completo='Nome Antigo', estado_civil='S', cpf_cnpj='111', endereco='Rua', numero='1',
+            cep='40000', profissao='X', contato='71',
+        )
+        resultado = self.importar([
+            'Ana Lima;F;C;111;15/03/1980;Rua B;2;Centro;Salvador;40001;Professora;ana@ex.com\n',
+            'Bruno Reis;M;S;222;;Rua C;3;Centro;Salvador;40002;Pedreiro;(71) 9999-0000\n',
+            'Sem Estado Civil;M;;333;;Rua D;4;Centro;Salvador;40003;Motorista;71\n',
+            'Carla Dias;F;V;444;;Rua E;5;Centro;Salvador;40004;Médica;71\n',
+        ])
+
+        self.assertEqual((resultado.criados, resultado.atualizados), (2, 1))
+        self.assertEqual([linha for linha, _ in resultado.erros], [4])
+        ana = Cliente.objects.get(cpf_cnpj='111')
+        self.assertEqual((ana.nome_completo, ana.nome_busca, str(ana.data_nascimento)), ('Ana Lima', 'ana lima', '1980-03-15'))
+        self.assertTrue(ana.ativo)
+
+    def test_exportacao_reimporta_sem_alterar(self):
+        self.importar(['Ana Lima;F;C;111;;Rua B;2;Centro;Salvador;40001;Professora;ana@ex.com\n'])
+        self.client.force_login(self.usuario)
+        resposta = self.client.get(reverse('exportar_clientes'))
+        conteudo = b''.join(resposta.streaming_content)
+
+        resultado = importar_clientes(ler_csv(BytesIO(conteudo)), self.escritorio)
+        self.assertEqual((resultado.criados, resultado.atualizados, resultado.erros), (0, 1, []))
+
+    async def test_exportacao_em_blocos_sob_asgi(self):
+        await Cliente.objects.abulk_create([
+            Cliente(escritorio_id=self.escritorio, nome_completo=f'Cliente {i}', cpf_cnpj=str(i), estado_civil='S')
+            for i in range(300)
+        ])
+        await self.async_client.aforce_login(self.usuario)
+        with mock.patch('core.assincrono.TAMANHO_BLOCO', 1024):
+            resposta = await self.async_client.get(reverse('exportar_clientes'))
+            self.assertTrue(resposta.is_async)
+            blocos = [bloco async for bloco in resposta.streaming_content]
+
+        self.assertGreater(len(blocos), 1)
+        linhas = b''.join(blocos).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(linhas), 301)
+
+    def test_cpf_repetido_no_arquivo_vira_erro(self):
+        resultado = self.importar([
+            'Ana Lima;F;C;111;;Rua B;2;Centro;Salvador;40001;Professora;71\n',
+            'Ana Souza;F;C;111;;Rua C;3;Centro;Salvador;40002;Professora;71\n',
+            'Sem Estado Civil;M;;333;;Rua D;4;Centro;Salvador;40003;Motorista;71\n',
+        ], tamanho_lote=10)
+
+        self.assertEqual((resultado.criados, resultado.atualizados), (1, 0))
+        self.assertEqual([linha for linha, _ in resultado.erros], [2, 4])
+        self.assertIn('vale a linha 3', resultado.erros[0][1])
+        self.assertEqual(resultado.criados + resultado.atualizados + resultado.total_erros, 3)
+        self.assertEqual(Cliente.objects.get(cpf_cnpj='111').nome_completo, 'Ana Souza')
+
+    def test_atualizacao_so_grava_as_colunas_do_arquivo(self):
+        Cliente.objects.create(
+            escritorio_id=self.escritorio, nome_completo='Ana Lima', estado_civil='C', cpf_cnpj='111', rg='123', endereco='Rua',
+            numero='1', cep='40000', profissao='X', contato='71', nacionalidade='Portuguesa', ativo=False,
+        )
+        resultado = self.importar(['Ana Souza;F;C;111;;Rua B;2;Centro;Salvador;40001;Professora;71\n'])
+
+        self.assertEqual(resultado.atualizados, 1)
+        ana = Cliente.objects.get(cpf_cnpj='111')
+        self.assertEqual((ana.nome_completo, ana.endereco), ('Ana Souza', 'Rua B'))
+        self.assertEqual((ana.rg, ana.nacionalidade, ana.ativo), ('123', 'Portuguesa', False))
+
+    def test_importa_xlsx(self):
+        from openpyxl import Workbook
+
+        planilha = Workbook()
+        planilha.active.append(self.CABECALHO.strip().split(';'))
+        planilha.active.append(['Ana Lima', 'F', 'C', 111, datetime(1980, 3, 15), 'Rua B', 2, 'Centro', 'Salvador', 40001, 'Professora', 'ana@ex.com'])
+        arquivo = BytesIO()
+        planilha.save(arquivo)
+        arquivo.seek(0)
+
+        resultado = importar_clientes(ler_xlsx(arquivo), self.escritorio)
+        self.assertEqual((resultado.criados, resultado.erros), (1, []))
+        ana = Cliente.objects.get(cpf_cnpj='111')
+        self.assertEqual((ana.nome_completo, str(ana.data_nascimento), ana.numero), ('Ana Lima', '1980-03-15', '2'))
+        self.assertTrue(ana.ativo)
+
+
+class TemplatesPrecompiladosTest(TestCase):
+
+    @staticmethod
+    def docx(*paragrafos):
+        arquivo = BytesIO()
+        documento = DocumentoWord()
+        for paragrafo in paragrafos:
+            documento.add_paragraph(paragrafo)
+        documento.save(arquivo)
+        return SimpleUploadedFile('modelo.docx', arquivo.getvalue())
+
+    @staticmethod
+    def com_notas(upload, tipo, texto):
+        # Acrescenta word/footnotes.xml ou word/endnotes.xml (o python-docx não cria notas)
+        singular = tipo[:-1]
+        entrada, saida = zipfile.ZipFile(BytesIO(upload.read())), BytesIO()
+        with zipfile.ZipFile(saida, 'w') as novo:
+            for nome in entrada.namelist():
+                conteudo = entrada.read(nome)
+                if nome == '[Content_Types].xml':
+                    conteudo = conteudo.replace(b'</Types>', (
+                        f'<Override PartName="/word/{tipo}.xml" ContentType='
+                        f'"application/vnd.openxmlformats-officedocument.wordprocessingml.{tipo}+xml"/></Types>'
+                    ).encode())
+                elif nome == 'word/_rels/document.xml.rels':
+                    conteudo = conteudo.replace(b'</Relationships>', (
+                        f'<Relationship Id="rIdNotas" Target="{tipo}.xml" Type='
+                        f'"http://schemas.openxmlformats.org/officeDocument/2006/relationships/{tipo}"/></Relationships>'
+                    ).encode())
+                novo.writestr(nome, conteudo)
+            novo.writestr(f'word/{tipo}.xml', (
+                f'<w:{tipo} xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+                f'<w:{singular} w:id="1"><w:p><w:r><w:t>{texto}</w:t></w:r></w:p></w:{singular}></w:{tipo}>'
+            ))
+        return SimpleUploadedFile('modelo.docx', saida.getvalue())
+
+    @staticmethod
+    def partes_word(template):
+        arquivo = BytesIO()
+        template.save(arquivo)
+        with zipfile.ZipFile(arquivo) as conteudo:
+            return {nome: conteudo.read(nome) for nome in conteudo.namelist() if nome.startswith('word/')}
+
+    def test_render_igual_ao_docxtpl(self):
+        cliente = Cliente(
+            nome_completo='Ana Lima', sexo='F', estado_civil='C', cpf_cnpj='111', rg='123', orgao_expeditor='SSP',
+            endereco='Rua', numero='1', bairro='Centro', cidade='Salvador', cep='40000', profissao='X', contato='71',
+        )
+        modelo = ModeloDocumento.objects.create(titulo='Procuração', arquivo_template='templates_docs/ProcuraçãoJudicialExtra.docx')
+        contexto = montar_contexto(cliente)
+
+        original = DocxTemplate(modelo.arquivo_template.path)
+        original.render(contexto)
+        precompilado = carregar_template(modelo)
+        precompilado.render(contexto)
+        self.assertEqual(self.partes_word(original), self.partes_word(precompilado))
+
+    def test_upload_guarda_variaveis(self):
+        form = ModeloDocumentoForm({'titulo': 'Declaração'}, {'arquivo_template': self.docx('Eu, {{ nome }}, CPF {{ cpf }}')})
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.instance.variaveis, ['cpf', 'nome'])
+
+    def test_upload_recusa_tag_desconhecida_ou_mal_formada(self):
+        for texto in ('{{ nome }} {{ apelido }}', '{% if nome %} sem fim'):
+            with self.subTest(texto=texto):
+                form = ModeloDocumentoForm({'titulo': 'Declaração'}, {'arquivo_template': self.docx(texto)})
+                self.assertFalse(form.is_valid())
+                self.assertIn('arquivo_template', form.errors)
+
+    def test_tags_das_notas_de_rodape_e_propriedades(self):
+        arquivo = BytesIO()
+        documento = DocumentoWord()
+        documento.add_paragraph('Eu, {{ nome }}')
+        documento.core_properties.title = 'Declaração de {{ cpf }}'
+        documento.save(arquivo)
+        upload = self.com_notas(SimpleUploadedFile('modelo.docx', arquivo.getvalue()), 'footnotes', 'Em {{ cidade }}')
+        form = ModeloDocumentoForm({'titulo': 'Declaração'}, {'arquivo_template': upload})
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.instance.variaveis, ['cidade', 'cpf', 'nome'])
+
+        upload.seek(0)
+        dados = upload.read()
+        compilado = compilar_template(BytesIO(dados))
+        template = DocxPrecompilado(BytesIO(dados), compilado)
+        template.render(montar_contexto(Cliente(nome_completo='Ana', cpf_cnpj='111', cidade='Salvador'), compilado.variaveis))
+        gerado = BytesIO()
+        template.save(gerado)
+        with zipfile.ZipFile(gerado) as conteudo:
+            self.assertIn(b'Em Salvador', conteudo.read('word/footnotes.xml'))
+            self.assertIn(b'Declara\xc3\xa7\xc3\xa3o de 111', conteudo.read('docProps/core.xml'))
+
+        upload = self.com_notas(self.docx('Eu, {{ nome }}'), 'footnotes', '{{ apelido }}')
+        self.assertFalse(ModeloDocumentoForm({'titulo': 'Declaração'}, {'arquivo_template': upload}).is_valid())
+
+    def test_upload_recusa_tag_em_nota_de_fim(self):
+        upload = self.com_notas(self.docx('Eu, {{ nome }}'), 'endnotes', '{{ cpf }}')
+        form = ModeloDocumentoForm({'titulo': 'Declaração'}, {'arquivo_template': upload})
+        self.assertFalse(form.is_valid())
+        self.assertIn('notas de fim', str(form.errors['arquivo_template']))
+
+    def test_contexto_so_com_as_tags_usadas(self):
+        cliente = Cliente(nome_completo='Ana', cpf_cnpj='111')
+        self.assertEqual(montar_contexto(cliente, {'nome', 'cpf'}), {'nome': 'Ana', 'cpf': '111'})
+        with self.assertRaises(ErroTemplate):
+            montar_contexto(cliente, {'nome', 'apelido'})
+
+
+class CacheTemplatesTest(TestCase):
+
+    def setUp(self):
+        usar_media_temporaria(self)
+        self.procuracao = ModeloDocumento.objects.create(
+            titulo='Procuração', arquivo_template='templates_docs/ProcuraçãoJudicialExtra.docx'
+        )
+        self.declaracao = ModeloDocumento.objects.create(
+            titulo='Declaração', arquivo_template='templates_docs/DeclaraçãoVeracidade.docx'
+        )
+
+    def compilacoes(self):
+        return mock.patch('core.documentos.compilar_template', wraps=compilar_template)
+
+    def test_reaproveita_enquanto_o_arquivo_nao_muda(self):
+        cache = CacheTemplates()
+        with self.compilacoes() as compilar:
+            primeiro = cache.compilado(self.procuracao)
+            self.assertIs(cache.compilado(self.procuracao), primeiro)
+        self.assertEqual(compilar.call_count, 1)
+
+    def test_recompila_quando_o_arquivo_muda(self):
+        cache = CacheTemplates()
+        primeiro = cache.compilado(self.procuracao)
+        caminho = self.procuracao.arquivo_template.path
+        # Mesmo tamanho, só o mtime muda: a chave (caminho, mtime_ns, tamanho) já expira
+        info = os.stat(caminho)
+        os.utime(caminho, ns=(info.st_atime_ns, info.st_mtime_ns + 1_000_000_000))
+        with self.compilacoes() as compilar:
+            self.assertIsNot(cache.compilado(self.procuracao), primeiro)
+        self.assertEqual(compilar.call_count, 1)
+
+    def test_descarta_o_menos_usado_ao_passar_do_limite(self):
+        tamanhos = [os.path.getsize(modelo.arquivo_template.path) for modelo in (self.procuracao, self.declaracao)]
+        # Cabe só o maior dos dois
+        cache = CacheTemplates(tamanho_maximo=max(tamanhos))
+        cache.compilado(self.procuracao)
+        cache.compilado(self.declaracao)
+        self.assertEqual(list(cache._entradas), [self.declaracao.pk])
+        self.assertLessEqual(cache._tamanho_total, max(tamanhos))
+        with self.compilacoes() as compilar:
+            cache.compilado(self.procuracao)
+        self.assertEqual(compilar.call_count, 1)
+
+
+class DocumentosGeradosTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('advogado', password='senha-teste')
+        cls.cliente = Cliente.objects.create(
+            escritorio=cls.usuario.perfil.escritorio, nome_completo='Ana Lima', cpf_cnpj='111', estado_civil='S'
+        )
+        cls.modelo = ModeloDocumento.objects.create(
+            titulo='Procuração', arquivo_template='templates_docs/ProcuraçãoJudicialExtra.docx'
+        )
+
+    def setUp(self):
+        usar_media_temporaria(self)
+
+    def renderizacoes(self):
+        return mock.patch.object(DocxPrecompilado, 'render', autospec=True, side_effect=DocxPrecompilado.render)
+
+    def test_mesmo_conteudo_reaproveita_o_arquivo(self):
+        with self.renderizacoes() as render:
+            caminho, hash_conteudo = obter_documento_gerado(self.modelo, self.cliente)
+            self.assertEqual(obter_documento_gerado(self.modelo, self.cliente), (caminho, hash_conteudo))
+        self.assertEqual(render.call_count, 1)
+        self.assertTrue(zipfile.is_zipfile(default_storage.path(caminho)))
+
+    def test_conteudo_diferente_gera_outro_arquivo(self):
+        caminho, _ = obter_documento_gerado(self.modelo, self.cliente)
+        self.cliente.nome_completo = 'Ana Lima Souza'
+        outro, _ = obter_documento_gerado(self.modelo, self.cliente)
+        self.assertNotEqual(outro, caminho)
+        self.assertTrue(default_storage.exists(caminho) and default_storage.exists(outro))
+
+    def test_gravacao_interrompida_nao_deixa_arquivo(self):
+        caminho = caminho_gerado('ab' * 32)
+        with mock.patch('core.documentos.os.replace', side_effect=OSError('disco cheio')):
+            with self.assertRaises(OSError):
+                gravar_atomico(caminho, b'conteudo')
+        self.assertFalse(default_storage.exists(caminho))
+        self.assertEqual(os.listdir(os.path.dirname(default_storage.path(caminho))), [])
+
+
+class LoteZipTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('advogado', password='senha-teste')
+        escritorio = cls.usuario.perfil.escritorio
+        cls.clientes = [
+            Cliente.objects.create(escritorio=escritorio, nome_completo=nome, cpf_cnpj=str(i), estado_civil='S')
+            for i, nome in enumerate(['Ana Lima', 'Bruno Reis', 'Carla Dias'])
+        ]
+        cls.modelo = ModeloDocumento.objects.create(
+            titulo='Procuração', arquivo_template='templates_docs/ProcuraçãoJudicialExtra.docx'
+        )
+
+    def setUp(self):
+        usar_media_temporaria(self)
+
+    def test_uma_entrada_por_cliente_e_registros_no_fim(self):
+        conteudo = b''.join(gerar_zip_lote(self.clientes, [self.modelo], self.usuario, max_workers=2))
+        with zipfile.ZipFile(BytesIO(conteudo)) as arquivo_zip:
+            nomes = arquivo_zip.namelist()
+            self.assertIsNone(arquivo_zip.testzip())
+        self.assertEqual(nomes, [
+            f"{cliente.id} - {cliente.nome_completo}/{cliente.nome_completo}_Procuração.docx" for cliente in self.clientes
+        ])
+        self.assertEqual(
+            sorted(Documento.objects.values_list('cliente_id', flat=True)), [cliente.id for cliente in self.clientes]
+        )
+
+    def test_download_interrompido_nao_registra_documentos(self):
+        partes = gerar_zip_lote(self.clientes, [self.modelo], self.usuario, max_workers=1)
+        next(partes)
+        partes.close()
+        self.assertFalse(Documento.objects.exists())
+
+    async def test_asgi_envia_o_zip_enquanto_gera(self):
+        await self.async_client.aforce_login(self.usuario)
+        # Bloco de 1 byte: cada parte do gerador vira um envio
+        with mock.patch('core.assincrono.TAMANHO_BLOCO', 1):
+            resposta = await self.async_client.post(reverse('gerar_lote'), {
+                'clientes': [cliente.id for cliente in self.clientes], 'modelos': [self.modelo.id],
+            })
+            self.assertTrue(resposta.is_async)
+            self.assertEqual(resposta['Content-Disposition'], 'attachment; filename="documentos_lote.zip"')
+
+            blocos = aiter(resposta.streaming_content)
+            primeiro = await anext(blocos)
+            # Os registros só são gravados depois do último byte: o ZIP ainda está sendo gerado
+            self.assertFalse(await Documento.objects.aexists())
+            conteudo = primeiro + b''.join([bloco async for bloco in blocos])
+
+        self.assertEqual(await Documento.objects.acount(), len(self.clientes))
+        with zipfile.ZipFile(BytesIO(conteudo)) as arquivo_zip:
+            self.assertEqual(len(arquivo_zip.namelist()), len(self.clientes))
+
+
+class FilaDocumentosTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('advogado', password='senha-teste')
+        cls.cliente = Cliente.objects.create(
+            escritorio=cls.usuario.perfil.escritorio, nome_completo='Ana Lima', cpf_cnpj='111', estado_civil='S'
+        )
+        cls.modelo = ModeloDocumento.objects.create(
+            titulo='Procuração', arquivo_template='templates_docs/ProcuraçãoJudicialExtra.docx'
+        )
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+        usar_media_temporaria(self)
+
+    def enfileirar(self):
+        # A thread do pool não enxerga a transação do teste: processamos aqui mesmo
+        with mock.patch.object(fila_documentos, 'enfileirar') as enfileirar:
+            resposta = self.client.post(reverse('enfileirar_documento', args=[self.cliente.id, self.modelo.id]))
+        self.assertEqual(resposta.status_code, 202)
+        enfileirar.assert_called_once()
+        return resposta.json()
+
+    def test_enfileira_processa_e_baixa(self):
+        dados = self.enfileirar()
+        self.assertEqual(dados['status'], 'FIL')
+        self.assertEqual(self.client.get(dados['url_status']).json()['status'], 'FIL')
+
+        processar_documento(dados['id'])
+        status = self.client.get(dados['url_status']).json()
+        self.assertEqual(status['status'], 'OK')
+        resposta = self.client.get(status['url_download'])
+        self.assertTrue(zipfile.is_zipfile(BytesIO(b''.join(resposta.streaming_content))))
+
+    def test_falha_na_renderizacao_vira_erro(self):
+        dados = self.enfileirar()
+        os.remove(self.modelo.arquivo_template.path)
+        with self.assertLogs('core.fila', 'ERROR'):
+            processar_documento(dados['id'])
+        self.assertEqual(self.client.get(dados['url_status']).json()['status'], 'ERR')
+        self.assertEqual(self.client.get(reverse('baixar_documento', args=[dados['id']])).status_code, 404)
+
+    def test_documento_abandonado_na_fila_vira_erro(self):
+        # Processo reiniciado: o documento nunca sai da fila
+        dados = self.enfileirar()
+        Documento.objects.filter(pk=dados['id']).update(data_geracao=datetime(2020, 1, 1, tzinfo=fuso.utc))
+        with self.assertLogs('core.fila', 'WARNING') as logs:
+            self.assertEqual(self.client.get(dados['url_status']).json()['status'], 'ERR')
+        self.assertIn(f"Documento {dados['id']} abandonado na fila", logs.output[0])
+
+
+# Faz o papel do unoserver: responde info() e convert() por XML-RPC e devolve o PID no "PDF"
+UNOSERVER_FALSO = """#!{python}
+import argparse, os, xmlrpc.client, xmlrpc.server
+argumentos = argparse.ArgumentParser()
+argumentos.add_argument('--interface')
+argumentos.add_argument('--port', type=int)
+argumentos.add_argument('--uno-port')
+opcoes = argumentos.parse_args()
+servidor = xmlrpc.server.SimpleXMLRPCServer((opcoes.interface, opcoes.port), allow_none=True, logRequests=False)
+servidor.register_function(lambda: {{'api': '3'}}, 'info')
+servidor.register_function(lambda *args: xmlrpc.client.Binary(b'%PDF-' + str(os.getpid()).encode()), 'convert')
+servidor.serve_forever()
+"""
+
+
+class PoolConversoresTest(TestCase):
+
+    def setUp(self):
+        pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, pasta, ignore_errors=True)
+        self.comando = os.path.join(pasta, 'unoserver')
+        with open(self.comando, 'w') as arquivo:
+            arquivo.write(UNOSERVER_FALSO.format(python=sys.executable))
+        os.chmod(self.comando, 0o755)
+
+        with socket.socket() as livre:
+            livre.bind(('127.0.0.1', 0))
+            porta = livre.getsockname()[1]
+        self.pool = PoolConversores(tamanho=1, porta_inicial=porta, comando=self.comando, timeout=10)
+        self.addCleanup(self.pool.encerrar)
+
+    def test_reaproveita_o_processo_e_reinicia_se_morrer(self):
+        self.assertTrue(self.pool.disponivel())
+        primeiro = self.pool.converter(b'docx')
+        self.assertTrue(primeiro.startswith(b'%PDF-'))
+        self.assertEqual(self.pool.converter(b'docx'), primeiro)
+
+        processo = self.pool._processos[0]
+        processo._processo.kill()
+        processo._processo.wait()
+        self.assertNotEqual(self.pool.converter(b'docx'), primeiro)
+
+    @override_settings(PDF_PORTA_INICIAL=None)
+    def test_pools_de_processos_diferentes_nao_disputam_portas(self):
+        # Um pool por worker: sem porta configurada, cada um pede portas livres ao sistema
+        pools = [PoolConversores(tamanho=2, comando=self.comando, timeout=10) for _ in range(2)]
+        for pool in pools:
+            self.addCleanup(pool.encerrar)
+        pdfs = {pool.converter(b'docx') for pool in pools}
+        self.assertEqual(len(pdfs), 2)
+        portas = [(processo.porta, processo.porta_uno) for pool in pools for processo in pool._processos if processo.ativo()]
+        self.assertEqual(len(set(sum(portas, ()))), 4)
+
+
+@unittest.skipUnless(importlib.util.find_spec('fpdf'), 'fpdf2 não instalado')
+@override_settings(PDF_COMANDO='unoserver-inexistente')
+class PdfSimplesTest(TestCase):
+
+    def setUp(self):
+        usar_media_temporaria(self)
+
+        usuario = User.objects.create_user('advogado', password='senha-teste')
+        self.client.force_login(usuario)
+        self.cliente = Cliente.objects.create(
+            escritorio=usuario.perfil.escritorio, nome_completo='Ana Lima', estado_civil='S', cpf_cnpj='111', endereco='Rua', numero='1',
+            cep='40000', profissao='X', contato='71',
+        )
+        self.modelo = ModeloDocumento.objects.create(titulo='Procuração', arquivo_template='templates_docs/ProcuraçãoJudicialExtra.docx')
+
+    def test_gera_pdf_e_guarda_ao_lado_do_docx(self):
+        url = reverse('gerar_documento', args=[self.cliente.id, self.modelo.id])
+        resposta = self.client.get(url, {'formato': 'pdf'})
+        self.assertEqual(resposta['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(resposta.streaming_content).startswith(b'%PDF'))
+
+        documento = Documento.objects.get()
+        self.assertTrue(default_storage.exists(documento.arquivo_gerado.name.replace('.docx', '.pdf')))
+        resposta = self.client.get(reverse('baixar_documento', args=[documento.id]), {'formato': 'pdf'})
+        self.assertEqual(resposta['Content-Type'], 'application/pdf')
+
+
+class EstaticosTest(TestCase):
+
+    def setUp(self):
+        raiz = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, raiz, ignore_errors=True)
+        override = override_settings(STATIC_ROOT=raiz)
+        override.enable()
+        self.addCleanup(override.disable)
+        carregar_estatico.cache_clear()
+        self.addCleanup(carregar_estatico.cache_clear)
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def test_nome_com_hash_comprimido_e_imutavel(self):
+        url = staticfiles_storage.url('css/style.css')
+        self.assertRegex(url, r'^/static/css/style\.[0-9a-f]{12}\.css$')
+        self.assertIn(url, self.client.get(reverse('login')).content.decode())
+
+        resposta = self.client.get(url, headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(resposta['Content-Encoding'], 'gzip')
+        self.assertEqual(resposta['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(resposta['Vary'], 'Accept-Encoding')
+        with staticfiles_storage.open('css/style.css') as original:
+            self.assertEqual(gzip.decompress(resposta.content), original.read())
+
+        sem_compressao = self.client.get(url)
+        self.assertNotIn('Content-Encoding', sem_compressao)
+        revalidacao = self.client.get(url, headers={'If-Modified-Since': sem_compressao['Last-Modified']})
+        self.assertEqual(revalidacao.status_code, 304)
+
+    def test_nome_sem_hash_tem_cache_curto(self):
+        resposta = self.client.get('/static/css/style.css')
+        self.assertEqual(resposta['Cache-Control'], 'public, max-age=3600')
+
+    async def test_sob_asgi(self):
+        resposta = await self.async_client.get(
+            staticfiles_storage.url('js/autocomplete_cliente.js'), headers={'Accept-Encoding': 'gzip'}
+        )
+        self.assertEqual((resposta.status_code, resposta['Content-Encoding']), (200, 'gzip'))
+
+
+class DatasTest(TestCase):
+
+    def test_formatos_sem_locale_do_sistema(self):
+        self.assertEqual(data_por_extenso(date(2026, 3, 5)), '05 de março de 2026')
+        # 02:30 UTC ainda é o dia anterior em Brasília
+        self.assertEqual(data_hora(datetime(2026, 1, 1, 2, 30, tzinfo=fuso.utc)), '31/12/2025 23:30')
+
+    def test_filtros_de_template(self):
+        template = Template('{% load datas_br %}{{ d|data_br }} {{ d|mes_ano }} {{ d|data_extenso }} [{{ vazio|data_br }}]')
+        self.assertEqual(
+            template.render(Context({'d': date(2026, 10, 1), 'vazio': None})),
+            '01/10/2026 outubro/2026 01 de outubro de 2026 []'
+        )
+
+
+PERFIS = []
+
+
+def guardar_perfil(request, view, duracao, pilhas):
+    PERFIS.append((view, pilhas))
+
+
+@override_settings(METRICAS_TOKEN='segredo')
+class MetricasTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('advogado', password='senha-teste')
+        cls.cliente = Cliente.objects.create(
+            escritorio=cls.usuario.perfil.escritorio, nome_completo='Ana Lima', cpf_cnpj='111', estado_civil='S'
+        )
+        cls.modelo = ModeloDocumento.objects.create(
+            titulo='Procuração', arquivo_template='templates_docs/ProcuraçãoJudicialExtra.docx'
+        )
+
+    def setUp(self):
+        registro.limpar()
+        usar_media_temporaria(self)
+        self.client.force_login(self.usuario)
+
+    def test_latencia_e_queries_por_view(self):
+        with CaptureQueriesContext(connection) as contexto:
+            self.client.get(reverse('lista_clientes'))
+        self.assertEqual(DURACAO_REQUISICAO.total(view='lista_clientes', metodo='GET'), 1)
+        self.assertEqual(QUERIES_POR_REQUISICAO.total(view='lista_clientes'), 1)
+        serie = QUERIES_POR_REQUISICAO._series[('lista_clientes',)]
+        self.assertEqual(serie[1], len(contexto))
+
+        self.client.get(reverse('gerar_documento', args=[self.cliente.id, self.modelo.id])).close()
+        for etapa in ('carregar', 'renderizar', 'salvar'):
+            self.assertEqual(ETAPAS_DOCUMENTO.total(etapa=etapa), 1)
+
+        texto = self.client.get(reverse('metricas'), HTTP_AUTHORIZATION='Bearer segredo').content.decode()
+        self.assertIn('# TYPE http_requisicao_segundos histogram', texto)
+        self.assertIn('http_requisicao_segundos_count{view="lista_clientes",metodo="GET"} 1', texto)
+        self.assertIn('http_requisicoes_total{view="gerar_documento",metodo="GET",status="200"} 1', texto)
+        self.assertIn('documento_etapa_segundos_bucket{etapa="renderizar",le="+Inf"} 1', texto)
+
+    def test_acesso_ao_endpoint(self):
+        # Sem METRICAS_IPS, nem o localhost (o proxy reverso) entra sem token
+        self.assertEqual(self.client.get(reverse('metricas'), REMOTE_ADDR='127.0.0.1').status_code, 403)
+        self.client.logout()
+        externo = {'REMOTE_ADDR': '10.0.0.5'}
+        self.assertEqual(self.client.get(reverse('metricas'), **externo).status_code, 403)
+        resposta = self.client.get(reverse('metricas'), HTTP_AUTHORIZATION='Bearer segredo', **externo)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertTrue(resposta['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertEqual(self.client.get(reverse('metricas'), HTTP_AUTHORIZATION='Bearer errado', **externo).status_code, 403)
+
+        with override_settings(METRICAS_IPS=['10.0.0.5']):
+            self.assertEqual(self.client.get(reverse('metricas'), **externo).status_code, 200)
+
+    def test_acesso_da_equipe(self):
+        equipe = User.objects.create_user('gerente', password='senha-teste', is_staff=True)
+        self.client.force_login(equipe)
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, 200)
+
+    def test_amostrador_ve_a_pilha_da_thread(self):
+        amostrador = AmostradorPilhas(0.001).iniciar()
+        time.sleep(0.05)
+        pilhas = amostrador.parar()
+        nome = threading.current_thread().name
+        self.assertTrue(any(
+            pilha.startswith(nome) and 'test_amostrador_ve_a_pilha_da_thread' in pilha for pilha in pilhas
+        ))
+        self.assertFalse(any(pilha.startswith('perfilador') for pilha in pilhas))
+
+    @override_settings(
+        METRICAS_PERFIL_LIMITE_MS=1, METRICAS_PERFIL_FRACAO=1.0, METRICAS_PERFIL_INTERVALO_MS=1,
+        METRICAS_PERFIL_HOOK='core.tests.guardar_perfil',
+    )
+    def test_perfil_de_requisicao_lenta(self):
+        PERFIS.clear()
+        self.client.get(reverse('gerar_documento', args=[self.cliente.id, self.modelo.id])).close()
+        self.assertEqual([view for view, _ in PERFIS], ['gerar_documento'])
+        # A view async fica suspensa no await; o tempo aparece na thread do pool que renderiza
+        self.assertTrue(any('obter_documento_gerado' in pilha for pilha in PERFIS[0][1]))
+
+
+class BenchmarkTest(TestCase):
+
+    def test_semeadura_em_blocos(self):
+        usuario = User.objects.create_user('benchmark')
+        semear(usuario, 25, honorarios_por_cliente=2, lote=10)
+        self.assertEqual(Cliente.objects.count(), 25)
+        self.assertEqual(Cliente.objects.filter(ativo=False).count(), 3)
+        self.assertEqual(Documento.objects.count(), 25)
+        self.assertEqual(Honorario.objects.count(), 50)
+
+    def test_compara_com_execucao_anterior(self):
+        self.assertEqual(resumir([0.01, 0.02, 0.03, 0.04])['p50_ms'], 25.0)
+        anterior = {
+            'cenarios': {'painel': {'p50_ms': 10, 'p95_ms': 20, 'queries': 3}},
+            'carga': {'interface': 'wsgi', 'requisicoes_por_segundo': 100},
+        }
+        atual = {
+            'cenarios': {'painel': {'p50_ms': 11, 'p95_ms': 30, 'queries': 3}, 'novo': {'p50_ms': 1}},
+            'carga': {'interface': 'wsgi', 'requisicoes_por_segundo': 70},
+        }
+        regressoes = {(item, metrica) for item, metrica, *_, regrediu in comparar(anterior, atual) if regrediu}
+        self.assertEqual(regressoes, {('painel', 'p95_ms'), ('carga', 'requisicoes_por_segundo')})
+
+
+class ViewsAssincronasTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('advogado', password='senha-teste')
+        cls.cliente = Cliente.objects.create(
+            escritorio=cls.usuario.perfil.escritorio, nome_completo='Ana Lima', cpf_cnpj='111', estado_civil='S'
+        )
+        cls.modelo = ModeloDocumento.objects.create(
+            titulo='Procuração', arquivo_template='templates_docs/ProcuraçãoJudicialExtra.docx'
+        )
+
+    def setUp(self):
+        registro.limpar()
+        usar_media_temporaria(self)
+
+    async def test_leituras_e_download_sob_asgi(self):
+        await self.async_client.aforce_login(self.usuario)
+        for nome in ('home', 'lista_clientes', 'lista_documentos', 'lista_honorarios'):
+            with self.subTest(rota=nome):
+                self.assertEqual((await self.async_client.get(reverse(nome))).status_code, 200)
+        # Queries contadas pelo middleware mesmo rodando em outra thread: impressão
+        # digital + página (sessão e usuário já estão no cache de autenticação)
+        self.assertEqual(QUERIES_POR_REQUISICAO._series[('lista_clientes',)][1], 2)
+
+        resposta = await self.async_client.get(reverse('gerar_documento', args=[self.cliente.id, self.modelo.id]))
+        self.assertTrue(resposta.is_async)
+        conteudo = b''.join([bloco async for bloco in resposta.streaming_content])
+        self.assertEqual(int(resposta['Content-Length']), len(conteudo))
+        self.assertTrue(zipfile.is_zipfile(BytesIO(conteudo)))
+
+        documento = await Documento.objects.alatest('id')
+        resposta = await self.async_client.get(reverse('baixar_documento', args=[documento.id]))
+        self.assertIn('attachment; filename*=', resposta['Content-Disposition'])
+        self.assertEqual(b''.join([bloco async for bloco in resposta.streaming_content]), conteudo)
+
+
+class GetCondicionalTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('advogado', password='senha-teste')
+        cls.cliente = Cliente.objects.create(
+            escritorio=cls.usuario.perfil.escritorio, nome_completo='Ana Lima', cpf_cnpj='111', estado_civil='S'
+        )
+        cls.modelo = ModeloDocumento.objects.create(
+            titulo='Procuração', arquivo_template='templates_docs/ProcuraçãoJudicialExtra.docx'
+        )
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+        usar_media_temporaria(self)
+
+    def revalidar(self, url, etag):
+        return self.client.get(url, headers={'If-None-Match': etag})
+
+    def test_listagem_responde_304_ate_mudar_algo(self):
+        url = reverse('lista_clientes')
+        resposta = self.client.get(url)
+        etag = resposta['ETag']
+        self.assertIn('private', resposta['Cache-Control'])
+
+        # Só a impressão digital: sessão e usuário vêm do cache, a listagem não é consultada
+        with self.assertNumQueries(1):
+            self.assertEqual(self.revalidar(url, etag).status_code, 304)
+
+        self.cliente.save()
+        alterado = self.revalidar(url, etag)
+        self.assertEqual(alterado.status_code, 200)
+        self.assertNotEqual(alterado['ETag'], etag)
+
+        # Exclusão não mexe em atualizado_em, mas muda a contagem
+        outro = Cliente.objects.create(escritorio=self.cliente.escritorio, nome_completo='Bruno', cpf_cnpj='222')
+        etag = self.client.get(url)['ETag']
+        Cliente.objects.filter(pk=outro.pk).delete()
+        self.assertEqual(self.revalidar(url, etag).status_code, 200)
+
+    def test_documento_concluido_pela_fila_muda_o_etag(self):
+        documento = Documento.objects.create(
+            cliente=self.cliente, modelo=self.modelo, tipo='Procuração', criado_por=self.usuario, status='FIL'
+        )
+        url = reverse('lista_documentos')
+        etag = self.client.get(url)['ETag']
+        processar_documento(documento.id)
+        self.assertEqual(self.revalidar(url, etag).status_code, 200)
+
+    def test_mensagem_pendente_sempre_renderiza(self):
+        url = reverse('lista_clientes')
+        etag = self.client.get(url)['ETag']
+        sessao = self.client.session
+        sessao['_messages'] = '[]'
+        sessao.save()
+        self.assertEqual(self.revalidar(url, etag).status_code, 200)
+
+    def test_documento_gerado_responde_304_sem_renderizar(self):
+        url = reverse('gerar_documento', args=[self.cliente.id, self.modelo.id])
+        resposta = self.client.get(url)
+        etag = resposta['ETag']
+        resposta.close()
+        self.assertEqual(Documento.objects.count(), 1)
+
+        # Só cliente e modelo (sessão e usuário vêm do cache de autenticação)
+        with self.assertNumQueries(2):
+            self.assertEqual(self.revalidar(url, etag).status_code, 304)
+        self.assertEqual(Documento.objects.count(), 1)
+
+        # Cliente alterado: gera de novo
+        self.cliente.save()
+        resposta = self.revalidar(url, etag)
+        self.assertEqual(resposta.status_code, 200)
+        resposta.close()
+
+    def test_documento_de_ontem_nao_responde_304_por_data(self):
+        url = reverse('gerar_documento', args=[self.cliente.id, self.modelo.id])
+        resposta = self.client.get(url)
+        ultima = resposta['Last-Modified']
+        resposta.close()
+
+        # Só If-Modified-Since (sem ETag): no dia seguinte a data por extenso mudou
+        amanha = timezone.now() + timedelta(days=1)
+        with mock.patch('django.utils.timezone.now', return_value=amanha):
+            resposta = self.client.get(url, headers={'If-Modified-Since': ultima})
+        self.assertEqual(resposta.status_code, 200)
+        resposta.close()
+        self.assertEqual(Documento.objects.count(), 2)
+
+
+class AutenticacaoEmCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('advogado', password='senha-teste')
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+        # Aquece o cache de sessão e usuário
+        self.assertEqual(self.client.get(reverse('lista_clientes')).status_code, 200)
+
+    def test_cache_dos_testes_fora_da_pasta_do_projeto(self):
+        self.assertFalse(os.path.abspath(cache_autenticacao()._dir).startswith(str(settings.BASE_DIR)))
+
+    def test_requisicao_sem_queries_de_sessao_e_usuario(self):
+        with CaptureQueriesContext(connection) as contexto:
+            self.client.get(reverse('lista_clientes'))
+        tabelas = ' '.join(query['sql'] for query in contexto.captured_queries)
+        self.assertNotIn('django_session', tabelas)
+        self.assertNotIn('auth_user', tabelas)
+
+    def test_troca_de_senha_derruba_a_sessao(self):
+        self.usuario.set_password('senha-nova')
+        self.usuario.save()
+        self.assertEqual(self.client.get(reverse('lista_clientes')).status_code, 302)
+
+    def test_permissao_alterada_vale_na_hora(self):
+        backend = BackendUsuarioEmCache()
+        self.assertFalse(backend.get_user(self.usuario.pk).is_staff)
+        self.usuario.is_staff = True
+        self.usuario.save(update_fields=['is_staff'])
+        self.assertTrue(backend.get_user(self.usuario.pk).is_staff)
+
+    def test_sessao_gravada_tambem_no_banco(self):
+        cache_autenticacao().clear()
+        self.assertEqual(self.client.get(reverse('lista_clientes')).status_code, 200)
+
+    def test_logout_remove_a_sessao_do_cache(self):
+        cookie = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+        self.client.post(reverse('logout'))
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = cookie
+        self.assertEqual(self.client.get(reverse('lista_clientes')).status_code, 302)
@@ -3,9 +3,17 @@ from . import views
 
 urlpatterns = [
     path('', views.lista_clientes, name='lista_clientes'),
+    path('inativos/', views.lista_clientes_inativos, name='lista_clientes_inativos'),
+    path('buscar/', views.buscar_clientes_json, name='buscar_clientes'),
     path('novo/', views.novo_cliente, name='novo_cliente'),
+    path('importar/', views.importar_clientes, name='importar_clientes'),
+    path('exportar/', views.exportar_clientes, name='exportar_clientes'),
     path('documentos/', views.lista_documentos, name='lista_documentos'), 
     path('selecao/<int:cliente_id>/', views.selecionar_modelo, name='selecionar_modelo'),
     path('gerar_doc/<int:cliente_id>/<int:modelo_id>/', views.gerar_documento, name='gerar_documento'),
+    path('gerar_doc/<int:cliente_id>/<int:modelo_id>/fila/', views.enfileirar_documento, name='enfileirar_documento'),
+    path('documentos/<int:id>/status/', views.status_documento, name='status_documento'),
+    path('documentos/<int:id>/download/', views.baixar_documento, name='baixar_documento'),
+    path('gerar_lote/', views.gerar_lote, name='gerar_lote'),
     path('editar/<int:id>/', views.editar_cliente, name='editar_cliente'),
 ]
@@ -1,43 +1,51 @@
-from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse
+from datetime import datetime, timezone as dt_timezone
+
+from django.shortcuts import aget_object_or_404, render, redirect, get_object_or_404
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse
+from django.contrib import messages
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum
-from docxtpl import DocxTemplate
-import io
-from datetime import datetime
-import locale
-
-locale.setlocale(locale.LC_TIME, 'pt_BR.UTF-8')
-
+from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.http import require_GET, require_POST
 
 # Importando Modelos e Formulários
 from .models import Cliente, ModeloDocumento, Documento
-from .forms import ClienteForm
-from financeiro.models import Honorario
+from .forms import ClienteForm, GerarLoteForm, ImportarClientesForm
+from . import importacao
+from .documentos import CONTENT_TYPE_DOCX, ErroTemplate, gerar_zip_lote, nome_arquivo, obter_documento_gerado, versao_template
+from .fila import expirar_se_parado, fila_documentos
+from .pdf import CONTENT_TYPE_PDF, ErroConversao, nome_pdf, obter_pdf
+from .painel import aobter_totais
+from .paginacao import apaginar_keyset
+from .assincrono import arender, em_thread, resposta_arquivo, resposta_gerada
+from .condicional import aetag, condicional, marcar_condicional, resposta_nao_modificada
+from .escritorios import aescritorio_da_requisicao, escritorio_da_requisicao
+from .busca import buscar_clientes
+from .metricas import registro
 
 # ========================================================
 # 1. HOME (DASHBOARD) E AUTENTICAÇÃO
 # ========================================================
 
-def home(request):
-    if not request.user.is_authenticated:
+async def home(request):
+    usuario = await request.auser()
+    if not usuario.is_authenticated:
         form_login = AuthenticationForm()
-        return render(request, 'home.html', {'form_login': form_login})
-    
-    total_clientes = Cliente.objects.count()
-    total_docs = Documento.objects.count()
+        return await arender(request, 'home.html', {'form_login': form_login})
     
-    total_receber = Honorario.objects.filter(status='PEN').aggregate(Sum('valor'))['valor__sum'] or 0
-    total_recebido = Honorario.objects.filter(status='PAG').aggregate(Sum('valor'))['valor__sum'] or 0
+    # Contadores e somas vêm do cache do painel (invalidado por signals)
+    escritorio = await aescritorio_da_requisicao(request)
+    totais = await aobter_totais(escritorio)
     
-    ultimos_docs = Documento.objects.all().order_by('-data_geracao')[:5]
+    ultimos_docs = [
+        documento async for documento in
+        Documento.objects.do_escritorio(escritorio).select_related('cliente').order_by('-data_geracao')[:5]
+    ]
 
-    return render(request, 'home.html', {
-        'total_clientes': total_clientes,
-        'total_docs': total_docs,
-        'total_receber': total_receber,
-        'total_recebido': total_recebido,
+    return await arender(request, 'home.html', {
+        **totais,
         'ultimos_docs': ultimos_docs
     })
 
@@ -56,30 +64,99 @@ def cadastro(request):
 # ========================================================
 
 @login_required
-def lista_clientes(request):
-    clientes_ativos = Cliente.objects.filter(ativo=True).order_by('nome_completo')
-    clientes_inativos = Cliente.objects.filter(ativo=False).order_by('nome_completo')
-    return render(request, 'core/lista_clientes.html', {
-        'clientes_ativos': clientes_ativos, 
-        'clientes_inativos': clientes_inativos
+@condicional(Cliente)
+async def lista_clientes(request):
+    termo = request.GET.get('q', '').strip()
+    clientes = Cliente.objects.do_escritorio(await aescritorio_da_requisicao(request)).filter(ativo=True)
+    if termo:
+        clientes = buscar_clientes(clientes, termo)
+    clientes_ativos = await apaginar_keyset(clientes, ('nome_completo', 'id'), request.GET.get('cursor'))
+    return await arender(request, 'core/lista_clientes.html', {
+        'clientes_ativos': clientes_ativos,
+        'termo': termo
+    })
+
+# Type-ahead e autocomplete (core/widgets.py): JSON com os clientes cujo nome, CPF/CNPJ
+# ou contato começa com o termo, em páginas por cursor ("proximo")
+@login_required
+async def buscar_clientes_json(request):
+    termo = request.GET.get('q', '').strip()
+    try:
+        limite = max(1, min(int(request.GET.get('limite', 10)), 50))
+    except (TypeError, ValueError):
+        limite = 10
+
+    clientes = buscar_clientes(Cliente.objects.do_escritorio(await aescritorio_da_requisicao(request)), termo)
+    if request.GET.get('ativos'):
+        clientes = clientes.filter(ativo=True)
+
+    pagina = await apaginar_keyset(
+        clientes.only('id', 'nome_completo', 'cpf_cnpj', 'contato', 'ativo', 'nome_busca'),
+        ('nome_busca', 'id'), request.GET.get('cursor'), tamanho=limite
+    )
+    resultados = [
+        {
+            'id': cliente.id,
+            'nome': cliente.nome_completo,
+            'cpf_cnpj': cliente.cpf_cnpj,
+            'contato': cliente.contato,
+            'ativo': cliente.ativo,
+            'url': reverse('editar_cliente', args=[cliente.id]),
+        }
+        for cliente in pagina
+    ]
+    return JsonResponse({'resultados': resultados, 'proximo': pagina.proximo_cursor})
+
+# A aba de inativos só é carregada quando o usuário abre (fragmento HTML)
+@login_required
+@condicional(Cliente)
+async def lista_clientes_inativos(request):
+    termo = request.GET.get('q', '').strip()
+    clientes = Cliente.objects.do_escritorio(await aescritorio_da_requisicao(request)).filter(ativo=False)
+    if termo:
+        clientes = buscar_clientes(clientes, termo)
+    clientes_inativos = await apaginar_keyset(clientes, ('nome_completo', 'id'), request.GET.get('cursor'))
+    return await arender(request, 'core/_clientes_inativos.html', {
+        'clientes_inativos': clientes_inativos,
+        'termo': termo
     })
 
 @login_required
 def novo_cliente(request):
+    cliente = Cliente(escritorio_id=escritorio_da_requisicao(request))
     if request.method == 'POST':
-        form = ClienteForm(request.POST)
+        form = ClienteForm(request.POST, instance=cliente)
         if form.is_valid():
             form.save()
             return redirect('lista_clientes')
         else:
             print(form.errors)
     else:
-        form = ClienteForm()
+        form = ClienteForm(instance=cliente)
     return render(request, 'core/form_cliente.html', {'form': form})
 
+@login_required
+def importar_clientes(request):
+    resultado = None
+    form = ImportarClientesForm(request.POST or None, request.FILES or None)
+    if form.is_valid():
+        arquivo = form.cleaned_data['arquivo']
+        try:
+            resultado = importacao.importar_clientes(
+                importacao.ler_arquivo(arquivo, arquivo.name), escritorio_da_requisicao(request)
+            )
+        except importacao.ErroImportacao as erro:
+            form.add_error('arquivo', str(erro))
+    return render(request, 'core/importar_clientes.html', {'form': form, 'resultado': resultado})
+
+@login_required
+def exportar_clientes(request):
+    clientes = Cliente.objects.do_escritorio(escritorio_da_requisicao(request))
+    return resposta_gerada(request, importacao.exportar_clientes_csv(clientes), 'clientes.csv', 'text/csv; charset=utf-8')
+
 @login_required
 def editar_cliente(request, id):
-    cliente = get_object_or_404(Cliente, id=id)
+    cliente = get_object_or_404(Cliente.objects.do_escritorio(escritorio_da_requisicao(request)), id=id)
     form = ClienteForm(request.POST or None, instance=cliente)
     if form.is_valid():
         form.save()
@@ -91,69 +168,171 @@ def editar_cliente(request, id):
 # ========================================================
 
 @login_required
-def lista_documentos(request):
-    documentos = Documento.objects.all().order_by('-data_geracao')
-    return render(request, 'core/lista_documentos.html', {'documentos': documentos})
+@condicional(Documento, Cliente)
+async def lista_documentos(request):
+    documentos = await apaginar_keyset(
+        Documento.objects.do_escritorio(await aescritorio_da_requisicao(request)).select_related('cliente', 'criado_por'),
+        ('-data_geracao', '-id'), request.GET.get('cursor')
+    )
+    return await arender(request, 'core/lista_documentos.html', {'documentos': documentos})
 
 @login_required
 def selecionar_modelo(request, cliente_id):
-    cliente = get_object_or_404(Cliente, id=cliente_id)
+    cliente = get_object_or_404(Cliente.objects.do_escritorio(escritorio_da_requisicao(request)), id=cliente_id)
     modelos = ModeloDocumento.objects.all()
     return render(request, 'core/selecionar_modelo.html', {
         'cliente': cliente,
         'modelos': modelos
     })
 
+# A renderização do .docx, a conversão para PDF e a leitura do arquivo rodam no
+# pool de threads de core.assincrono; a view em si só espera.
+# O ETag sai do cliente e da versão do template (um stat do arquivo): se o navegador
+# já tem esse documento, a resposta é um 304 sem renderizar nem registrar de novo
 @login_required
-def gerar_documento(request, cliente_id, modelo_id):
-    cliente = get_object_or_404(Cliente, id=cliente_id)
-    modelo_db = get_object_or_404(ModeloDocumento, id=modelo_id)
-    
-    doc = DocxTemplate(modelo_db.arquivo_template.path)
-    
-    # Lógica de Gênero
-    sufixo = 'a' if cliente.sexo == 'F' else 'o'
-    
-    # Lógica condicional para o RG
-    rg_tag = ""
-    if cliente.rg:
-        rg_tag = f", portador{sufixo} da cédula de identidade RG nº {cliente.rg} {cliente.orgao_expeditor}"
-
-    # Mapeamento do contexto para o Word
-    contexto = {
-        'nome': cliente.nome_completo,
-        'nacionalidade': f"brasileir{sufixo}",
-        'estado_civil': cliente.get_estado_civil_display().lower(),
-        'deficiente_tag': ", deficiente" if cliente.eh_deficiente else "",
-        'nascido_tag': f"nascid{sufixo}",
-        'data_nasc': cliente.data_nascimento.strftime("%d/%m/%Y") if cliente.data_nascimento else "XX/XX/XXXX",
-        'rg_tag': rg_tag,  # Inclui a frase completa do RG ou fica vazio
-        'cpf': cliente.cpf_cnpj,
-        'rua': cliente.endereco,
-        'num': cliente.numero,
-        'bairro': cliente.bairro,
-        'cidade': cliente.cidade,
-        'cep': cliente.cep,
-        'telefone': cliente.contato,
-        'profissao': cliente.profissao,
-        'hoje': datetime.now().strftime("%d de %B de %Y"),
-    }
-    
-    doc.render(contexto)
-    
-    buffer = io.BytesIO()
-    doc.save(buffer)
-    buffer.seek(0)
+async def gerar_documento(request, cliente_id, modelo_id):
+    cliente = await aget_object_or_404(
+        Cliente.objects.do_escritorio(await aescritorio_da_requisicao(request)), id=cliente_id
+    )
+    modelo_db = await aget_object_or_404(ModeloDocumento, id=modelo_id)
     
-    Documento.objects.create(
+    formato = request.GET.get('formato', 'docx')
+    try:
+        _, mtime_template, tamanho_template = await em_thread(versao_template, modelo_db)
+    except (OSError, ValueError):
+        # Template sumiu: a geração abaixo mostra o erro de sempre
+        etag = None
+    else:
+        etag = await aetag(
+            request, cliente.pk, cliente.atualizado_em, modelo_db.pk, modelo_db.titulo,
+            mtime_template, tamanho_template, formato
+        )
+        # O documento traz a data por extenso: o Last-Modified nunca fica antes do início
+        # do dia, senão um If-Modified-Since de ontem receberia 304 (sem o registro)
+        inicio_do_dia = timezone.make_aware(datetime.combine(timezone.localdate(), datetime.min.time()))
+        modificado_em = max(
+            cliente.atualizado_em, datetime.fromtimestamp(mtime_template / 1e9, tz=dt_timezone.utc), inicio_do_dia
+        )
+        if nao_modificada := resposta_nao_modificada(request, etag, modificado_em):
+            return nao_modificada
+
+    try:
+        caminho, hash_conteudo = await em_thread(obter_documento_gerado, modelo_db, cliente)
+        if formato == 'pdf':
+            caminho_pdf = await em_thread(obter_pdf, caminho)
+    except (ErroTemplate, ErroConversao) as erro:
+        messages.error(request, f"Não foi possível gerar \"{modelo_db.titulo}\": {erro}")
+        return redirect('selecionar_modelo', cliente_id=cliente.id)
+
+    await Documento.objects.acreate(
+        escritorio_id=cliente.escritorio_id,
         cliente=cliente,
         modelo=modelo_db,
         tipo=modelo_db.titulo,
-        criado_por=request.user
+        criado_por=await request.auser(),
+        arquivo_gerado=caminho,
+        hash_conteudo=hash_conteudo
     )
 
-    filename = f"{cliente.nome_completo}_{modelo_db.titulo}.docx"
-    response = HttpResponse(buffer.getvalue(), content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document')
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    return response
\ No newline at end of file
+    if formato == 'pdf':
+        resposta = await resposta_arquivo(
+            request, caminho_pdf, nome_pdf(nome_arquivo(cliente, modelo_db)), CONTENT_TYPE_PDF
+        )
+    else:
+        resposta = await resposta_arquivo(request, caminho, nome_arquivo(cliente, modelo_db), CONTENT_TYPE_DOCX)
+    if etag:
+        marcar_condicional(resposta, etag, modificado_em)
+    return resposta
+
+@login_required
+@require_POST
+def enfileirar_documento(request, cliente_id, modelo_id):
+    cliente = get_object_or_404(Cliente.objects.do_escritorio(escritorio_da_requisicao(request)), id=cliente_id)
+    modelo_db = get_object_or_404(ModeloDocumento, id=modelo_id)
+
+    documento = Documento.objects.create(
+        escritorio_id=cliente.escritorio_id,
+        cliente=cliente,
+        modelo=modelo_db,
+        tipo=modelo_db.titulo,
+        criado_por=request.user,
+        status='FIL'
+    )
+    fila_documentos.enfileirar(documento)
+
+    return JsonResponse(_status_documento(documento), status=202)
+
+def _status_documento(documento):
+    dados = {
+        'id': documento.id,
+        'status': documento.status,
+        'status_display': documento.get_status_display(),
+        'url_status': reverse('status_documento', args=[documento.id]),
+    }
+    if documento.status == 'OK' and documento.arquivo_gerado:
+        dados['url_download'] = reverse('baixar_documento', args=[documento.id])
+    return dados
+
+@login_required
+def status_documento(request, id):
+    documento = get_object_or_404(Documento.objects.do_escritorio(escritorio_da_requisicao(request)), id=id)
+    return JsonResponse(_status_documento(expirar_se_parado(documento)))
+
+@login_required
+async def baixar_documento(request, id):
+    documento = await aget_object_or_404(
+        Documento.objects.do_escritorio(await aescritorio_da_requisicao(request)).select_related('cliente', 'modelo'),
+        id=id
+    )
+    if documento.status != 'OK' or not documento.arquivo_gerado:
+        raise Http404("Documento ainda não está disponível.")
+
+    nome = f"{documento.cliente.nome_completo}_{documento.tipo}.docx"
+    if request.GET.get('formato') == 'pdf':
+        try:
+            caminho_pdf = await em_thread(obter_pdf, documento.arquivo_gerado.name)
+        except ErroConversao as erro:
+            messages.error(request, str(erro))
+            return redirect('lista_documentos')
+        return await resposta_arquivo(request, caminho_pdf, nome_pdf(nome), CONTENT_TYPE_PDF)
+
+    return await resposta_arquivo(request, documento.arquivo_gerado.name, nome, CONTENT_TYPE_DOCX)
+
+@login_required
+def gerar_lote(request):
+    escritorio = escritorio_da_requisicao(request)
+    if request.method == 'POST':
+        form = GerarLoteForm(request.POST, escritorio=escritorio)
+        if form.is_valid():
+            clientes = form.cleaned_data['clientes'].order_by('nome_completo')
+            modelos = form.cleaned_data['modelos']
+            return resposta_gerada(
+                request, gerar_zip_lote(list(clientes), list(modelos), request.user), 'documentos_lote.zip', 'application/zip'
+            )
+    else:
+        form = GerarLoteForm(initial={'clientes': request.GET.getlist('clientes')}, escritorio=escritorio)
+
+    ids = form['clientes'].value() or []
+    clientes = form.fields['clientes'].queryset.filter(id__in=ids).order_by('nome_completo')
+    return render(request, 'core/gerar_lote.html', {'form': form, 'clientes': clientes})
+
+
+# ========================================================
+# 4. MÉTRICAS (PROMETHEUS)
+# ========================================================
+
+def _pode_ver_metricas(request):
+    # Liberado para quem mandar "Authorization: Bearer <METRICAS_TOKEN>", para usuários
+    # da equipe e para os IPs de METRICAS_IPS, se o deploy configurar algum
+    if request.META.get('REMOTE_ADDR') in settings.METRICAS_IPS:
+        return True
+    token = settings.METRICAS_TOKEN
+    if token and request.headers.get('Authorization') == f'Bearer {token}':
+        return True
+    return request.user.is_authenticated and request.user.is_staff
+
+@require_GET
+def metricas(request):
+    if not _pode_ver_metricas(request):
+        return HttpResponseForbidden()
+    return HttpResponse(registro.exportar(), content_type='text/plain; version=0.0.4; charset=utf-8')
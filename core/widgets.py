@@ -0,0 +1,35 @@
+from django import forms
+from django.urls import reverse
+
+
+# ========================================================
+# SELEÇÃO DE CLIENTE COM AUTOCOMPLETE
+# ========================================================
+# O <select> sai do servidor só com o cliente já escolhido (uma consulta por pk);
+# os demais vêm da busca JSON (buscar_clientes, só ativos) conforme o usuário
+# digita, uma página por vez. O tamanho da página não cresce com o cadastro.
+
+class AutocompleteCliente(forms.Select):
+
+    class Media:
+        js = ['js/autocomplete_cliente.js']
+
+    def get_context(self, name, value, attrs):
+        contexto = super().get_context(name, value, attrs)
+        contexto['widget']['attrs'].update({
+            'data-autocomplete': f"{reverse('buscar_clientes')}?ativos=1",
+            'data-placeholder': "Digite o nome, CPF/CNPJ ou contato",
+        })
+        return contexto
+
+    def optgroups(self, name, value, attrs=None):
+        # Valor do POST pode ser qualquer texto: só pks válidas vão para a consulta
+        # (o erro de escolha inválida fica com o campo do form)
+        selecionados = {str(item) for item in value if str(item).isdecimal()}
+        opcoes = [self.create_option(name, '', '---------', not selecionados, 0)]
+        if selecionados:
+            # self.choices é o ModelChoiceIterator do campo (queryset já filtrado pelo escritório)
+            for indice, cliente in enumerate(self.choices.queryset.filter(pk__in=selecionados), start=1):
+                valor, rotulo = self.choices.choice(cliente)
+                opcoes.append(self.create_option(name, valor, rotulo, True, indice))
+        return [(None, opcoes, 0)]
@@ -1,3 +1,31 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
-# Register your models here.
+from core.admin import BuscaClienteAdminMixin, EscritorioDoClienteAdminMixin
+from .baixa import alterar_status_em_lote
+from .models import Honorario
+
+
+@admin.register(Honorario)
+class HonorarioAdmin(BuscaClienteAdminMixin, EscritorioDoClienteAdminMixin, admin.ModelAdmin):
+    list_display = ('descricao', 'cliente', 'valor', 'data_vencimento', 'status')
+    list_select_related = ('cliente',)
+    list_filter = ('status',)
+    search_fields = ('cliente__nome_completo',)
+    search_help_text = "Início do nome, CPF/CNPJ ou contato do cliente"
+    date_hierarchy = 'data_vencimento'
+    autocomplete_fields = ('cliente',)
+    raw_id_fields = ('plano',)
+    show_full_result_count = False
+    actions = ['marcar_como_pago', 'marcar_como_cancelado']
+
+    def _alterar_status(self, request, queryset, status):
+        alterados = alterar_status_em_lote(queryset, status, request.user, origem='ADMIN')
+        self.message_user(request, f"{alterados} honorário(s) atualizado(s).", messages.SUCCESS)
+
+    @admin.action(description="Marcar selecionados como pagos")
+    def marcar_como_pago(self, request, queryset):
+        self._alterar_status(request, queryset, 'PAG')
+
+    @admin.action(description="Cancelar selecionados")
+    def marcar_como_cancelado(self, request, queryset):
+        self._alterar_status(request, queryset, 'CAN')
@@ -0,0 +1,49 @@
+from django.db import transaction
+from django.utils import timezone
+
+from core.painel import invalidar_painel
+from .models import HistoricoStatusHonorario, Honorario
+from .relatorios import recalcular_resumo
+
+
+# ========================================================
+# BAIXA / CANCELAMENTO EM LOTE
+# ========================================================
+# Os honorários escolhidos (por id ou por filtro) mudam de status com um UPDATE
+# e cada mudança vira uma linha de HistoricoStatusHonorario num bulk_create.
+# update()/bulk_create não disparam signals: resumo mensal e painel são
+# acertados no final, só para os meses envolvidos.
+
+STATUS_LOTE = ('PAG', 'CAN')
+# Ids por UPDATE (o SQLite limita a quantidade de parâmetros por consulta)
+TAMANHO_LOTE = 1000
+
+
+def alterar_status_em_lote(queryset, status, usuario=None, origem='LOTE'):
+    if status not in STATUS_LOTE:
+        raise ValueError(f"Status inválido para operação em lote: {status}")
+
+    with transaction.atomic():
+        # Só o que realmente muda; a leitura trava as linhas até o fim da transação
+        alvos = list(
+            queryset.exclude(status=status).select_for_update().order_by()
+            .values_list('id', 'status', 'data_vencimento', 'escritorio_id')
+        )
+        ids = [id for id, _, _, _ in alvos]
+        agora = timezone.now()
+        for inicio in range(0, len(ids), TAMANHO_LOTE):
+            Honorario.objects.filter(pk__in=ids[inicio:inicio + TAMANHO_LOTE]).update(status=status, atualizado_em=agora)
+
+        HistoricoStatusHonorario.objects.bulk_create([
+            HistoricoStatusHonorario(
+                honorario_id=id, status_anterior=anterior, status_novo=status, alterado_por=usuario, origem=origem,
+            )
+            for id, anterior, _, _ in alvos
+        ], batch_size=TAMANHO_LOTE)
+
+        if alvos:
+            escritorios = {escritorio_id for _, _, _, escritorio_id in alvos}
+            recalcular_resumo({vencimento for _, _, vencimento, _ in alvos}, escritorios)
+            invalidar_painel(*escritorios)
+
+    return len(alvos)
@@ -1,15 +1,122 @@
 from django import forms
-from .models import Honorario
+from core.models import Cliente
+from core.widgets import AutocompleteCliente
+from .models import Honorario, PlanoParcelamento
+from .baixa import STATUS_LOTE
 
-class HonorarioForm(forms.ModelForm):
+
+class ClientesDoEscritorioMixin:
+    # Só os clientes do escritório da requisição aparecem (e são aceitos) no campo cliente
+
+    def __init__(self, *args, escritorio, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['cliente'].queryset = Cliente.objects.do_escritorio(escritorio)
+
+
+class HonorarioForm(ClientesDoEscritorioMixin, forms.ModelForm):
     class Meta:
         model = Honorario
         fields = ['cliente', 'descricao', 'valor', 'data_vencimento', 'status', 'observacoes']
         widgets = {
-            'cliente': forms.Select(attrs={'class': 'form-select'}),
+            'cliente': AutocompleteCliente(attrs={'class': 'form-select'}),
             'descricao': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Ex: Honorários Causa Trabalhista'}),
             'valor': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
             'data_vencimento': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
             'status': forms.Select(attrs={'class': 'form-select'}),
             'observacoes': forms.Textarea(attrs={'class': 'form-control', 'rows': 2}),
-        }
\ No newline at end of file
+        }
+
+class PlanoParcelamentoForm(ClientesDoEscritorioMixin, forms.ModelForm):
+    class Meta:
+        model = PlanoParcelamento
+        fields = ['cliente', 'descricao', 'tipo', 'valor', 'quantidade_parcelas', 'primeiro_vencimento', 'intervalo_meses', 'observacoes']
+        widgets = {
+            'cliente': AutocompleteCliente(attrs={'class': 'form-select'}),
+            'descricao': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Ex: Contrato Causa Trabalhista'}),
+            'tipo': forms.Select(attrs={'class': 'form-select'}),
+            'valor': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
+            'quantidade_parcelas': forms.NumberInput(attrs={'class': 'form-control', 'min': 1, 'max': 360}),
+            'primeiro_vencimento': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}, format='%Y-%m-%d'),
+            'intervalo_meses': forms.NumberInput(attrs={'class': 'form-control', 'min': 1, 'max': 12}),
+            'observacoes': forms.Textarea(attrs={'class': 'form-control', 'rows': 2}),
+        }
+
+    def clean_quantidade_parcelas(self):
+        quantidade = self.cleaned_data['quantidade_parcelas']
+        if not 1 <= quantidade <= 360:
+            raise forms.ValidationError("Informe entre 1 e 360 parcelas.")
+        return quantidade
+
+    def clean_intervalo_meses(self):
+        intervalo = self.cleaned_data['intervalo_meses']
+        if not 1 <= intervalo <= 12:
+            raise forms.ValidationError("O intervalo deve ser de 1 a 12 meses.")
+        return intervalo
+
+    def clean_valor(self):
+        valor = self.cleaned_data['valor']
+        if valor <= 0:
+            raise forms.ValidationError("Informe um valor maior que zero.")
+        return valor
+
+
+class FiltroHonorariosForm(forms.Form):
+    status = forms.ChoiceField(
+        choices=[('', 'Todos')] + Honorario.STATUS_CHOICES, required=False,
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'}),
+    )
+    vencimento_de = forms.DateField(required=False, widget=forms.DateInput(attrs={'class': 'form-control form-control-sm', 'type': 'date'}))
+    vencimento_ate = forms.DateField(required=False, widget=forms.DateInput(attrs={'class': 'form-control form-control-sm', 'type': 'date'}))
+
+    def filtrar(self, queryset):
+        # Filtro inválido não filtra nada (a listagem mostra tudo)
+        if not self.is_valid():
+            return queryset
+        dados = self.cleaned_data
+        if dados.get('status'):
+            queryset = queryset.filter(status=dados['status'])
+        if dados.get('vencimento_de'):
+            queryset = queryset.filter(data_vencimento__gte=dados['vencimento_de'])
+        if dados.get('vencimento_ate'):
+            queryset = queryset.filter(data_vencimento__lte=dados['vencimento_ate'])
+        return queryset
+
+    def tem_filtro(self):
+        return self.is_valid() and any(self.cleaned_data.values())
+
+
+class CampoIds(forms.Field):
+    widget = forms.MultipleHiddenInput
+
+    def to_python(self, valor):
+        try:
+            return [int(item) for item in valor or []]
+        except (TypeError, ValueError):
+            raise forms.ValidationError("Seleção inválida.")
+
+
+class BaixaLoteForm(FiltroHonorariosForm):
+    ESCOPO_CHOICES = [('selecionados', 'Selecionados'), ('filtro', 'Todos do filtro')]
+
+    novo_status = forms.ChoiceField(choices=[c for c in Honorario.STATUS_CHOICES if c[0] in STATUS_LOTE])
+    escopo = forms.ChoiceField(choices=ESCOPO_CHOICES, initial='selecionados')
+    ids = CampoIds(required=False)
+
+    def __init__(self, *args, escritorio, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.escritorio = escritorio
+
+    def clean(self):
+        dados = super().clean()
+        if dados.get('escopo') == 'selecionados' and not dados.get('ids'):
+            raise forms.ValidationError("Selecione ao menos um honorário.")
+        if dados.get('escopo') == 'filtro' and not any(dados.get(campo) for campo in ('status', 'vencimento_de', 'vencimento_ate')):
+            # Evita baixar a tabela inteira por engano
+            raise forms.ValidationError("Informe ao menos um filtro.")
+        return dados
+
+    def honorarios(self):
+        queryset = Honorario.objects.do_escritorio(self.escritorio)
+        if self.cleaned_data['escopo'] == 'selecionados':
+            return queryset.filter(pk__in=self.cleaned_data['ids'])
+        return self.filtrar(queryset)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from financeiro.relatorios import recalcular_resumo
+
+
+class Command(BaseCommand):
+    help = 'Recalcula do zero a tabela ResumoMensal a partir dos honorários cadastrados.'
+
+    def handle(self, *args, **options):
+        recalcular_resumo()
+        self.stdout.write(self.style.SUCCESS('Resumo mensal recalculado.'))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_indices_paginacao'),
+        ('financeiro', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='honorario',
+            index=models.Index(fields=['data_vencimento', 'id'], name='honorario_vencimento_idx'),
+        ),
+    ]
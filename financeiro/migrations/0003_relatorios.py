@@ -0,0 +1,52 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:55
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def preencher_resumo_mensal(apps, schema_editor):
+    Honorario = apps.get_model('financeiro', 'Honorario')
+    ResumoMensal = apps.get_model('financeiro', 'ResumoMensal')
+    agrupado = (
+        Honorario.objects
+        .annotate(mes=TruncMonth('data_vencimento'))
+        .values('mes', 'status')
+        .annotate(quantidade=Count('id'), total=Sum('valor'))
+        .order_by()
+    )
+    ResumoMensal.objects.bulk_create([ResumoMensal(**linha) for linha in agrupado])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_cliente_busca'),
+        ('financeiro', '0002_indices_paginacao'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoMensal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(help_text='Primeiro dia do mês de vencimento')),
+                ('status', models.CharField(choices=[('PEN', 'Pendente'), ('PAG', 'Pago'), ('CAN', 'Cancelado')], max_length=3)),
+                ('quantidade', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='honorario',
+            index=models.Index(fields=['status', 'data_vencimento'], name='honorario_status_venc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='honorario',
+            index=models.Index(fields=['cliente', 'status'], name='honorario_cliente_status_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='resumomensal',
+            constraint=models.UniqueConstraint(fields=('mes', 'status'), name='resumo_mensal_unico'),
+        ),
+        migrations.RunPython(preencher_resumo_mensal, migrations.RunPython.noop),
+    ]
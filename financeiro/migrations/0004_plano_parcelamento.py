@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_cliente_busca'),
+        ('financeiro', '0003_relatorios'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='honorario',
+            name='numero_parcela',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='PlanoParcelamento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('descricao', models.CharField(help_text='Ex: Contrato Causa Trabalhista', max_length=200)),
+                ('tipo', models.CharField(choices=[('PAR', 'Parcelado (divide o valor total)'), ('REC', 'Recorrente (valor fixo por parcela)')], default='PAR', max_length=3)),
+                ('valor', models.DecimalField(decimal_places=2, help_text='Valor total (parcelado) ou de cada parcela (recorrente)', max_digits=10)),
+                ('quantidade_parcelas', models.PositiveSmallIntegerField()),
+                ('primeiro_vencimento', models.DateField()),
+                ('intervalo_meses', models.PositiveSmallIntegerField(default=1, help_text='1 = mensal, 3 = trimestral...')),
+                ('observacoes', models.TextField(blank=True, null=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='planos', to='core.cliente')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='honorario',
+            name='plano',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='parcelas', to='financeiro.planoparcelamento'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeiro', '0004_plano_parcelamento'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoricoStatusHonorario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status_anterior', models.CharField(choices=[('PEN', 'Pendente'), ('PAG', 'Pago'), ('CAN', 'Cancelado')], max_length=3)),
+                ('status_novo', models.CharField(choices=[('PEN', 'Pendente'), ('PAG', 'Pago'), ('CAN', 'Cancelado')], max_length=3)),
+                ('alterado_em', models.DateTimeField(auto_now_add=True)),
+                ('origem', models.CharField(choices=[('LOTE', 'Baixa em lote'), ('ADMIN', 'Admin')], default='LOTE', max_length=5)),
+                ('alterado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('honorario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='historico_status', to='financeiro.honorario')),
+            ],
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def preencher_escritorio(apps, schema_editor):
+    Cliente = apps.get_model('core', 'Cliente')
+    Honorario = apps.get_model('financeiro', 'Honorario')
+    ResumoMensal = apps.get_model('financeiro', 'ResumoMensal')
+    Escritorio = apps.get_model('core', 'Escritorio')
+
+    Honorario.objects.update(
+        escritorio=Subquery(Cliente.objects.filter(pk=OuterRef('cliente_id')).values('escritorio_id')[:1])
+    )
+    # Até aqui só existia um escritório (criado em core.0010)
+    escritorio = Escritorio.objects.order_by('id').first()
+    if escritorio is not None:
+        ResumoMensal.objects.update(escritorio=escritorio)
+    else:
+        ResumoMensal.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_escritorios'),
+        ('financeiro', '0005_historico_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='honorario',
+            name='escritorio',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='honorarios', db_index=False, to='core.escritorio'),
+        ),
+        migrations.AddField(
+            model_name='resumomensal',
+            name='escritorio',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='resumos_mensais', db_index=False, to='core.escritorio'),
+        ),
+        migrations.RunPython(preencher_escritorio, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='honorario',
+            name='escritorio',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='honorarios', db_index=False, to='core.escritorio'),
+        ),
+        migrations.AlterField(
+            model_name='resumomensal',
+            name='escritorio',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='resumos_mensais', db_index=False, to='core.escritorio'),
+        ),
+        migrations.RemoveConstraint(
+            model_name='resumomensal',
+            name='resumo_mensal_unico',
+        ),
+        migrations.AddConstraint(
+            model_name='resumomensal',
+            constraint=models.UniqueConstraint(fields=('escritorio', 'mes', 'status'), name='resumo_mensal_esc_unico'),
+        ),
+        migrations.RemoveIndex(
+            model_name='honorario',
+            name='honorario_vencimento_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='honorario',
+            name='honorario_status_venc_idx',
+        ),
+        migrations.AddIndex(
+            model_name='honorario',
+            index=models.Index(fields=['escritorio', 'data_vencimento', 'id'], name='honorario_esc_venc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='honorario',
+            index=models.Index(fields=['escritorio', 'status', 'data_vencimento'], name='honorario_esc_status_venc_idx'),
+        ),
+    ]
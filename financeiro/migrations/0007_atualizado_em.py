@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_atualizado_em'),
+        ('financeiro', '0006_escritorio'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='honorario',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='honorario',
+            index=models.Index(fields=['escritorio', 'atualizado_em'], name='honorario_esc_atualizado_idx'),
+        ),
+    ]
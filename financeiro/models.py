@@ -1,6 +1,27 @@
 from django.db import models
+from django.contrib.auth.models import User
 # Importamos o Cliente do outro app
-from core.models import Cliente
+from core.models import Cliente, Escritorio, EscritorioManager
+
+class PlanoParcelamento(models.Model):
+    TIPO_CHOICES = [
+        ('PAR', 'Parcelado (divide o valor total)'),
+        ('REC', 'Recorrente (valor fixo por parcela)'),
+    ]
+
+    cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE, related_name='planos')
+    descricao = models.CharField(max_length=200, help_text="Ex: Contrato Causa Trabalhista")
+    tipo = models.CharField(max_length=3, choices=TIPO_CHOICES, default='PAR')
+    valor = models.DecimalField(max_digits=10, decimal_places=2, help_text="Valor total (parcelado) ou de cada parcela (recorrente)")
+    quantidade_parcelas = models.PositiveSmallIntegerField()
+    primeiro_vencimento = models.DateField()
+    intervalo_meses = models.PositiveSmallIntegerField(default=1, help_text="1 = mensal, 3 = trimestral...")
+    observacoes = models.TextField(blank=True, null=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.descricao} ({self.quantidade_parcelas}x)"
+
 
 class Honorario(models.Model):
     # Baseado na entidade Honorário [cite: 54, 59]
@@ -10,12 +31,72 @@ class Honorario(models.Model):
         ('CAN', 'Cancelado'),
     ]
 
+    escritorio = models.ForeignKey(Escritorio, on_delete=models.PROTECT, related_name='honorarios', db_index=False)
     cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE, related_name='honorarios')
     descricao = models.CharField(max_length=200, help_text="Ex: Honorários da Causa Trabalhista")
     valor = models.DecimalField(max_digits=10, decimal_places=2)
     data_vencimento = models.DateField()
     status = models.CharField(max_length=3, choices=STATUS_CHOICES, default='PEN')
     observacoes = models.TextField(blank=True, null=True)
+    # Preenchidos quando o honorário é uma parcela de um plano
+    plano = models.ForeignKey(PlanoParcelamento, on_delete=models.SET_NULL, null=True, blank=True, related_name='parcelas')
+    numero_parcela = models.PositiveSmallIntegerField(null=True, blank=True)
+    # Operações em lote (update/bulk_update) preenchem à mão: auto_now só vale no save()
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    objects = EscritorioManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['escritorio', 'data_vencimento', 'id'], name='honorario_esc_venc_idx'),
+            # Relatórios: aging (status + vencimento) e saldo por cliente
+            models.Index(fields=['escritorio', 'status', 'data_vencimento'], name='honorario_esc_status_venc_idx'),
+            models.Index(fields=['cliente', 'status'], name='honorario_cliente_status_idx'),
+            # Última alteração do escritório, para o ETag da listagem (core/condicional.py)
+            models.Index(fields=['escritorio', 'atualizado_em'], name='honorario_esc_atualizado_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.descricao} - R$ {self.valor}"
+
+    def save(self, *args, **kwargs):
+        # O escritório é sempre o do cliente (repetido aqui para os índices por escritório)
+        if self.escritorio_id is None:
+            self.escritorio_id = self.cliente.escritorio_id
+        super().save(*args, **kwargs)
+
+
+class HistoricoStatusHonorario(models.Model):
+    # Trilha de auditoria das baixas/cancelamentos em lote
+    ORIGEM_CHOICES = [
+        ('LOTE', 'Baixa em lote'),
+        ('ADMIN', 'Admin'),
+    ]
+
+    honorario = models.ForeignKey(Honorario, on_delete=models.CASCADE, related_name='historico_status')
+    status_anterior = models.CharField(max_length=3, choices=Honorario.STATUS_CHOICES)
+    status_novo = models.CharField(max_length=3, choices=Honorario.STATUS_CHOICES)
+    alterado_por = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    alterado_em = models.DateTimeField(auto_now_add=True)
+    origem = models.CharField(max_length=5, choices=ORIGEM_CHOICES, default='LOTE')
+
+    def __str__(self):
+        return f"{self.honorario_id}: {self.status_anterior} -> {self.status_novo}"
+
+
+class ResumoMensal(models.Model):
+    # Totais de honorários por mês de vencimento e status, mantidos a cada alteração
+    # (ver financeiro/relatorios.py) para o fluxo mensal não varrer a tabela inteira
+    escritorio = models.ForeignKey(Escritorio, on_delete=models.PROTECT, related_name='resumos_mensais', db_index=False)
+    mes = models.DateField(help_text="Primeiro dia do mês de vencimento")
+    status = models.CharField(max_length=3, choices=Honorario.STATUS_CHOICES)
+    quantidade = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['escritorio', 'mes', 'status'], name='resumo_mensal_esc_unico'),
+        ]
 
     def __str__(self):
-        return f"{self.descricao} - R$ {self.valor}"
\ No newline at end of file
+        return f"{self.mes:%m/%Y} - {self.get_status_display()}: R$ {self.total}"
@@ -0,0 +1,127 @@
+import calendar
+from decimal import Decimal, ROUND_DOWN
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.painel import invalidar_painel
+from .models import Honorario
+from .relatorios import recalcular_resumo
+
+
+# ========================================================
+# PLANOS DE PARCELAMENTO / RECORRÊNCIA
+# ========================================================
+# O plano vira honorários comuns (um por parcela) com um único bulk_create.
+# Ao editar o plano, só as parcelas futuras ainda pendentes são refeitas, com
+# bulk_update; pagas, canceladas e vencidas ficam como estão (no parcelado, o
+# que falta do total é dividido só entre as refeitas). Como operações em
+# lote não disparam signals, o painel e o resumo mensal são acertados no final.
+
+CAMPOS_PARCELA = ['cliente', 'descricao', 'valor', 'data_vencimento', 'atualizado_em']
+
+
+def somar_meses(data, meses):
+    # 31/01 + 1 mês = 28/02 (ou 29/02): o dia é limitado ao fim do mês
+    indice = data.month - 1 + meses
+    ano, mes = data.year + indice // 12, indice % 12 + 1
+    return data.replace(year=ano, month=mes, day=min(data.day, calendar.monthrange(ano, mes)[1]))
+
+
+def dividir_valor(valor, quantidade):
+    # Os centavos que sobram da divisão vão para a última parcela
+    base = (valor / quantidade).quantize(Decimal('0.01'), rounding=ROUND_DOWN)
+    return [base] * (quantidade - 1) + [valor - base * (quantidade - 1)]
+
+
+def calcular_parcelas(plano):
+    # [(número, vencimento, valor)]
+    quantidade = plano.quantidade_parcelas
+    valor = Decimal(plano.valor)
+    if plano.tipo == 'PAR':
+        valores = dividir_valor(valor, quantidade)
+    else:
+        valores = [valor] * quantidade
+
+    return [
+        (numero, somar_meses(plano.primeiro_vencimento, (numero - 1) * plano.intervalo_meses), valores[numero - 1])
+        for numero in range(1, quantidade + 1)
+    ]
+
+
+def _descricao(plano, numero):
+    return f"{plano.descricao} ({numero}/{plano.quantidade_parcelas})"
+
+
+def _montar_parcela(plano, numero, vencimento, valor):
+    return Honorario(
+        escritorio_id=plano.cliente.escritorio_id, cliente=plano.cliente, plano=plano, numero_parcela=numero,
+        descricao=_descricao(plano, numero), valor=valor, data_vencimento=vencimento, status='PEN',
+    )
+
+
+def _finalizar(plano, meses):
+    # O cliente do plano é sempre do mesmo escritório (os forms só listam os dele)
+    escritorio_id = plano.cliente.escritorio_id
+    recalcular_resumo(meses, [escritorio_id])
+    invalidar_painel(escritorio_id)
+
+
+def gerar_parcelas(plano):
+    parcelas = [_montar_parcela(plano, *parcela) for parcela in calcular_parcelas(plano)]
+    with transaction.atomic():
+        Honorario.objects.bulk_create(parcelas)
+        _finalizar(plano, {parcela.data_vencimento for parcela in parcelas})
+    return parcelas
+
+
+def sincronizar_parcelas(plano, hoje=None):
+    # Devolve (criadas, atualizadas, removidas)
+    hoje = hoje or timezone.localdate()
+    with transaction.atomic():
+        editaveis = {
+            parcela.numero_parcela: parcela
+            for parcela in plano.parcelas.select_for_update().filter(status='PEN', data_vencimento__gte=hoje)
+        }
+        travadas = dict(
+            plano.parcelas.exclude(status='PEN', data_vencimento__gte=hoje).values_list('numero_parcela', 'valor')
+        )
+        meses = {parcela.data_vencimento for parcela in editaveis.values()}
+
+        # Parcela nova só entra se ainda não venceu
+        refeitas = [
+            (numero, vencimento, valor) for numero, vencimento, valor in calcular_parcelas(plano)
+            if numero not in travadas and (numero in editaveis or vencimento >= hoje)
+        ]
+        if plano.tipo == 'PAR' and refeitas:
+            restante = Decimal(plano.valor) - sum(travadas.values(), Decimal('0'))
+            refeitas = [
+                (numero, vencimento, valor)
+                for (numero, vencimento, _), valor in zip(refeitas, dividir_valor(restante, len(refeitas)))
+            ]
+
+        novas, alteradas = [], []
+        agora = timezone.now()
+        for numero, vencimento, valor in refeitas:
+            parcela = editaveis.pop(numero, None)
+            if parcela is None:
+                novas.append(_montar_parcela(plano, numero, vencimento, valor))
+                meses.add(vencimento)
+                continue
+            parcela.cliente = plano.cliente
+            parcela.descricao = _descricao(plano, numero)
+            parcela.valor = valor
+            parcela.data_vencimento = vencimento
+            parcela.atualizado_em = agora
+            alteradas.append(parcela)
+            meses.add(vencimento)
+
+        # O que sobrou em editaveis ficou além da nova quantidade de parcelas
+        removidas = list(editaveis.values())
+        Honorario.objects.bulk_create(novas)
+        Honorario.objects.bulk_update(alteradas, CAMPOS_PARCELA)
+        if removidas:
+            Honorario.objects.filter(pk__in=[parcela.pk for parcela in removidas]).delete()
+        _finalizar(plano, meses)
+
+    return len(novas), len(alteradas), len(removidas)
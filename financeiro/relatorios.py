@@ -0,0 +1,137 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Honorario, ResumoMensal
+
+
+# ========================================================
+# RELATÓRIOS FINANCEIROS
+# ========================================================
+# Tudo é agregado no banco (GROUP BY / Sum condicional). O fluxo mensal lê da
+# tabela ResumoMensal, atualizada por delta a cada save/delete de Honorario e
+# recalculada por mês depois de operações em lote (que não disparam signals).
+# Todo relatório é de um escritório só; o ResumoMensal tem uma linha por
+# (escritório, mês, status).
+
+FAIXAS_AGING = [
+    # (chave, rótulo, dias de atraso mínimo, máximo)
+    ('a_vencer', 'A vencer', None, 0),
+    ('ate_30', '1 a 30 dias', 1, 30),
+    ('ate_60', '31 a 60 dias', 31, 60),
+    ('ate_90', '61 a 90 dias', 61, 90),
+    ('mais_90', 'Mais de 90 dias', 91, None),
+]
+
+
+def aging(escritorio, hoje=None):
+    # Honorários pendentes agrupados por dias de atraso, numa única consulta
+    hoje = hoje or timezone.localdate()
+    agregados = {}
+    for chave, _, minimo, maximo in FAIXAS_AGING:
+        filtro = Q()
+        if minimo is not None:
+            filtro &= Q(data_vencimento__lte=hoje - timedelta(days=minimo))
+        if maximo is not None:
+            filtro &= Q(data_vencimento__gte=hoje - timedelta(days=maximo))
+        agregados[f'{chave}_total'] = Sum('valor', filter=filtro, default=Decimal('0'))
+        agregados[f'{chave}_quantidade'] = Count('id', filter=filtro)
+
+    valores = Honorario.objects.do_escritorio(escritorio).filter(status='PEN').aggregate(**agregados)
+    return [
+        {
+            'chave': chave,
+            'rotulo': rotulo,
+            'total': valores[f'{chave}_total'],
+            'quantidade': valores[f'{chave}_quantidade'],
+        }
+        for chave, rotulo, _, _ in FAIXAS_AGING
+    ]
+
+
+def fluxo_mensal(escritorio, ano):
+    meses = {
+        date(ano, numero, 1): {'mes': date(ano, numero, 1), 'a_receber': Decimal('0'), 'recebido': Decimal('0'), 'cancelado': Decimal('0')}
+        for numero in range(1, 13)
+    }
+    campos = {'PEN': 'a_receber', 'PAG': 'recebido', 'CAN': 'cancelado'}
+    for resumo in ResumoMensal.objects.filter(escritorio=escritorio, mes__year=ano):
+        meses[resumo.mes][campos[resumo.status]] = resumo.total
+    return list(meses.values())
+
+
+def saldos_por_cliente(escritorio, limite=50):
+    return (
+        Honorario.objects.do_escritorio(escritorio)
+        .values('cliente_id', 'cliente__nome_completo')
+        .annotate(
+            em_aberto=Sum('valor', filter=Q(status='PEN'), default=Decimal('0')),
+            pago=Sum('valor', filter=Q(status='PAG'), default=Decimal('0')),
+        )
+        .filter(em_aberto__gt=0)
+        .order_by('-em_aberto')[:limite]
+    )
+
+
+# --------------------------------------------------------
+# Manutenção do ResumoMensal
+# --------------------------------------------------------
+
+def inicio_do_mes(data):
+    return data.replace(day=1)
+
+
+def proximo_mes(mes):
+    return (mes.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def aplicar_delta(escritorio_id, mes, status, quantidade, total):
+    if not quantidade and not total:
+        return
+    # Garante a linha (um INSERT concorrente do mesmo mês é ignorado pelo banco, em vez
+    # de estourar a chave única) e soma no próprio UPDATE, que trava a linha
+    with transaction.atomic():
+        ResumoMensal.objects.bulk_create(
+            [ResumoMensal(escritorio_id=escritorio_id, mes=mes, status=status)], ignore_conflicts=True
+        )
+        ResumoMensal.objects.filter(escritorio_id=escritorio_id, mes=mes, status=status).update(
+            quantidade=F('quantidade') + quantidade,
+            total=F('total') + total,
+        )
+
+
+def recalcular_resumo(meses=None, escritorios=None):
+    # Refaz os totais a partir de Honorario (todos os meses, ou só os informados;
+    # todos os escritórios, ou só os informados)
+    honorarios = Honorario.objects.all()
+    resumos = ResumoMensal.objects.all()
+    if escritorios is not None:
+        escritorios = set(escritorios)
+        if not escritorios:
+            return
+        honorarios = honorarios.filter(escritorio__in=escritorios)
+        resumos = resumos.filter(escritorio__in=escritorios)
+    if meses is not None:
+        meses = {inicio_do_mes(mes) for mes in meses}
+        if not meses:
+            return
+        filtro_meses = Q()
+        for mes in meses:
+            filtro_meses |= Q(data_vencimento__gte=mes, data_vencimento__lt=proximo_mes(mes))
+        honorarios = honorarios.filter(filtro_meses)
+        resumos = resumos.filter(mes__in=meses)
+
+    agrupado = (
+        honorarios
+        .annotate(mes=TruncMonth('data_vencimento'))
+        .values('escritorio_id', 'mes', 'status')
+        .annotate(quantidade=Count('id'), total=Sum('valor'))
+        .order_by()
+    )
+    with transaction.atomic():
+        resumos.delete()
+        ResumoMensal.objects.bulk_create([ResumoMensal(**linha) for linha in agrupado])
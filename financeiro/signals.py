@@ -0,0 +1,35 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.painel import invalidar_painel
+from .models import Honorario
+from .relatorios import aplicar_delta, inicio_do_mes
+
+
+@receiver([post_save, post_delete], sender=Honorario)
+def atualizar_painel(sender, instance, **kwargs):
+    invalidar_painel(instance.escritorio_id)
+
+
+# Resumo mensal: guarda como o honorário estava antes do save para aplicar só a diferença
+@receiver(pre_save, sender=Honorario)
+def guardar_estado_anterior(sender, instance, **kwargs):
+    instance._resumo_anterior = None
+    if instance.pk:
+        instance._resumo_anterior = (
+            Honorario.objects.filter(pk=instance.pk).values_list('data_vencimento', 'status', 'valor').first()
+        )
+
+
+@receiver(post_save, sender=Honorario)
+def atualizar_resumo_mensal(sender, instance, **kwargs):
+    anterior = getattr(instance, '_resumo_anterior', None)
+    if anterior:
+        vencimento, status, valor = anterior
+        aplicar_delta(instance.escritorio_id, inicio_do_mes(vencimento), status, -1, -valor)
+    aplicar_delta(instance.escritorio_id, inicio_do_mes(instance.data_vencimento), instance.status, 1, instance.valor)
+
+
+@receiver(post_delete, sender=Honorario)
+def remover_do_resumo_mensal(sender, instance, **kwargs):
+    aplicar_delta(instance.escritorio_id, inicio_do_mes(instance.data_vencimento), instance.status, -1, -instance.valor)
@@ -1,3 +1,372 @@
+from datetime import date, datetime, timedelta, timezone as fuso
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import Cliente, Escritorio
+from core.painel import cache_painel, chave_painel, obter_totais
+from core.tests import OrcamentoQueriesMixin
+from .models import HistoricoStatusHonorario, Honorario, PlanoParcelamento, ResumoMensal
+from .baixa import alterar_status_em_lote
+from .parcelamento import calcular_parcelas, gerar_parcelas, sincronizar_parcelas, somar_meses
+from .relatorios import aging, aplicar_delta, fluxo_mensal, recalcular_resumo
+
+
+class FinanceiroOrcamentoQueriesTest(OrcamentoQueriesMixin, TestCase):
+    urlconf = 'financeiro.urls'
+    orcamentos = {
+        # sessão + usuário (se não estão em cache) + ETag (core/condicional.py) + página
+        'lista_honorarios': ('get', 4),
+        # O select de clientes só traz o escolhido (o resto vem do autocomplete)
+        'novo_honorario': ('get', 2),
+        # honorário + cliente escolhido
+        'editar_honorario': ('get', 4),
+        # aging + resumo mensal + saldos por cliente
+        'relatorios_honorarios': ('get', 5),
+        'baixa_em_lote': ('post', 12),
+        'lista_planos': ('get', 3),
+        'novo_plano': ('get', 2),
+        # plano + cliente escolhido + parcelas
+        'editar_plano': ('get', 5),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.plano = PlanoParcelamento.objects.create(
+            cliente=cls.clientes[1], descricao='Contrato', valor=1200, quantidade_parcelas=12,
+            primeiro_vencimento=date.today(),
+        )
+        gerar_parcelas(cls.plano)
+
+    def dados(self, nome):
+        if nome == 'baixa_em_lote':
+            # sessão + usuário + savepoints + select/update/insert + recálculo do resumo
+            return {'novo_status': 'PAG', 'escopo': 'filtro', 'status': 'PEN', 'vencimento_ate': date.today() + timedelta(days=30)}
+        return {}
+
+    def argumentos(self, nome):
+        if nome == 'editar_honorario':
+            return {'id': self.clientes[1].honorarios.first().id}
+        if nome == 'editar_plano':
+            return {'id': self.plano.id}
+        return {}
+
+
+class RelatoriosTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.escritorio = Escritorio.objects.create(nome='Escritório')
+        cls.cliente = Cliente.objects.create(
+            escritorio=cls.escritorio, nome_completo='Ana', estado_civil='S', cpf_cnpj='111', endereco='Rua', numero='1',
+            cep='40000', profissao='X', contato='71',
+        )
+
+    def lancar(self, valor, vencimento, status='PEN'):
+        return Honorario.objects.create(
+            cliente=self.cliente, descricao='Parcela', valor=valor, data_vencimento=vencimento, status=status
+        )
+
+    def resumo(self):
+        return sorted(ResumoMensal.objects.filter(quantidade__gt=0).values_list('mes', 'status', 'quantidade', 'total'))
+
+    def test_resumo_mensal_incremental_confere_com_recalculo(self):
+        primeiro = self.lancar(100, date(2026, 1, 10))
+        segundo = self.lancar(50, date(2026, 1, 20))
+        self.lancar(30, date(2026, 2, 5), 'PAG')
+
+        primeiro.status = 'PAG'
+        primeiro.save()
+        segundo.data_vencimento = date(2026, 3, 1)
+        segundo.valor = 70
+        segundo.save()
+        Honorario.objects.filter(valor=30).first().delete()
+
+        incremental = self.resumo()
+        recalcular_resumo()
+        self.assertEqual(incremental, self.resumo())
+
+        fluxo = fluxo_mensal(self.escritorio, 2026)
+        self.assertEqual(fluxo[0]['recebido'], Decimal('100'))
+        self.assertEqual(fluxo[2]['a_receber'], Decimal('70'))
+
+    def test_aging(self):
+        hoje = date(2026, 6, 30)
+        self.lancar(10, hoje)
+        self.lancar(20, hoje - timedelta(days=1))
+        self.lancar(30, hoje - timedelta(days=45))
+        self.lancar(40, hoje - timedelta(days=200))
+        self.lancar(99, hoje - timedelta(days=200), 'PAG')
+
+        faixas = {faixa['chave']: faixa['total'] for faixa in aging(self.escritorio, hoje)}
+        self.assertEqual(faixas, {
+            'a_vencer': Decimal('10'), 'ate_30': Decimal('20'), 'ate_60': Decimal('30'),
+            'ate_90': Decimal('0'), 'mais_90': Decimal('40'),
+        })
+
+    def test_aging_usa_a_data_de_sao_paulo(self):
+        self.lancar(10, date(2026, 3, 9))
+        # 02h UTC do dia 10 ainda é dia 9 em São Paulo: vence hoje, não está atrasado
+        with mock.patch('django.utils.timezone.now', return_value=datetime(2026, 3, 10, 2, tzinfo=fuso.utc)):
+            faixas = {faixa['chave']: faixa['quantidade'] for faixa in aging(self.escritorio)}
+        self.assertEqual(faixas['a_vencer'], 1)
+
+    def test_delta_em_mes_com_linha_criada_por_outro_save(self):
+        # Outro save criou a linha do mês entre a leitura e o INSERT deste: soma nela
+        ResumoMensal.objects.create(escritorio=self.escritorio, mes=date(2026, 5, 1), status='PEN', quantidade=1, total=5)
+        aplicar_delta(self.escritorio.id, date(2026, 5, 1), 'PEN', 1, Decimal('10'))
+        aplicar_delta(self.escritorio.id, date(2026, 6, 1), 'PEN', 1, Decimal('7'))
+        self.assertEqual(self.resumo(), [
+            (date(2026, 5, 1), 'PEN', 2, Decimal('15')), (date(2026, 6, 1), 'PEN', 1, Decimal('7')),
+        ])
+
+
+class ParcelamentoTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.escritorio = Escritorio.objects.create(nome='Escritório')
+        cls.cliente = Cliente.objects.create(
+            escritorio=cls.escritorio, nome_completo='Ana', estado_civil='S', cpf_cnpj='111', endereco='Rua', numero='1',
+            cep='40000', profissao='X', contato='71',
+        )
+
+    def resumo(self):
+        return sorted(ResumoMensal.objects.filter(quantidade__gt=0).values_list('mes', 'status', 'quantidade', 'total'))
+
+    def novo_plano(self, **campos):
+        dados = dict(cliente=self.cliente, descricao='Contrato', valor=100, quantidade_parcelas=3, primeiro_vencimento=date(2026, 1, 31))
+        dados.update(campos)
+        return PlanoParcelamento.objects.create(**dados)
+
+    def test_somar_meses_limita_ao_fim_do_mes(self):
+        self.assertEqual(somar_meses(date(2026, 1, 31), 1), date(2026, 2, 28))
+        self.assertEqual(somar_meses(date(2026, 11, 30), 3), date(2027, 2, 28))
+
+    def test_parcelado_divide_o_total(self):
+        valores = [valor for _, _, valor in calcular_parcelas(self.novo_plano())]
+        self.assertEqual(valores, [Decimal('33.33'), Decimal('33.33'), Decimal('33.34')])
+        recorrente = calcular_parcelas(self.novo_plano(tipo='REC', intervalo_meses=3))
+        self.assertEqual([(vencimento, valor) for _, vencimento, valor in recorrente], [
+            (date(2026, 1, 31), Decimal('100')), (date(2026, 4, 30), Decimal('100')), (date(2026, 7, 31), Decimal('100')),
+        ])
+
+    def test_gera_em_uma_query_de_insert(self):
+        plano = self.novo_plano(quantidade_parcelas=24)
+        with CaptureQueriesContext(connection) as contexto:
+            gerar_parcelas(plano)
+        inserts = [q for q in contexto.captured_queries if q['sql'].startswith('INSERT INTO "financeiro_honorario"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(plano.parcelas.count(), 24)
+        incremental = self.resumo()
+        recalcular_resumo()
+        self.assertEqual(incremental, self.resumo())
+
+    def test_sincroniza_so_parcelas_futuras_pendentes(self):
+        plano = self.novo_plano(tipo='REC', quantidade_parcelas=4)
+        gerar_parcelas(plano)
+        primeira, segunda, terceira, quarta = plano.parcelas.order_by('numero_parcela')
+        primeira.status = 'PAG'
+        primeira.save()
+
+        plano.valor = 150
+        plano.quantidade_parcelas = 3
+        plano.save()
+        # Em 15/03 a 2ª parcela (28/02) já venceu e fica como estava
+        criadas, atualizadas, removidas = sincronizar_parcelas(plano, hoje=date(2026, 3, 15))
+
+        self.assertEqual((criadas, atualizadas, removidas), (0, 1, 1))
+        parcelas = list(plano.parcelas.order_by('numero_parcela').values_list('numero_parcela', 'valor', 'status'))
+        self.assertEqual(parcelas, [(1, Decimal('100'), 'PAG'), (2, Decimal('100'), 'PEN'), (3, Decimal('150'), 'PEN')])
+        incremental = self.resumo()
+        recalcular_resumo()
+        self.assertEqual(incremental, self.resumo())
+
+    def test_parcelado_editado_fecha_o_total_com_as_pagas(self):
+        plano = self.novo_plano(quantidade_parcelas=4)
+        gerar_parcelas(plano)
+        primeira = plano.parcelas.get(numero_parcela=1)
+        primeira.status = 'PAG'
+        primeira.save()
+
+        plano.valor = 150
+        plano.save()
+        sincronizar_parcelas(plano, hoje=date(2026, 1, 1))
+
+        valores = list(plano.parcelas.order_by('numero_parcela').values_list('valor', flat=True))
+        # 25 pagos; os 125 restantes divididos entre as três refeitas
+        self.assertEqual(valores, [Decimal('25'), Decimal('41.66'), Decimal('41.66'), Decimal('41.68')])
+        self.assertEqual(sum(valores), Decimal('150'))
+
+    def test_sincroniza_com_a_data_de_sao_paulo(self):
+        plano = self.novo_plano(tipo='REC')
+        gerar_parcelas(plano)
+        plano.valor = 150
+        plano.save()
+        # 02h UTC de 01/03 ainda é 28/02 em São Paulo: a 2ª parcela (28/02) vence hoje e é refeita
+        with mock.patch('django.utils.timezone.now', return_value=datetime(2026, 3, 1, 2, tzinfo=fuso.utc)):
+            self.assertEqual(sincronizar_parcelas(plano), (0, 2, 0))
+
+
+class BaixaEmLoteTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('advogado', password='senha-teste')
+        cls.cliente = Cliente.objects.create(
+            escritorio=cls.usuario.perfil.escritorio, nome_completo='Ana', estado_civil='S', cpf_cnpj='111', endereco='Rua', numero='1',
+            cep='40000', profissao='X', contato='71',
+        )
+        Honorario.objects.bulk_create([
+            Honorario(
+                escritorio=cls.cliente.escritorio, cliente=cls.cliente, descricao='Parcela', valor=10 * i,
+                data_vencimento=date(2026, 1 + i % 3, 10), status='PEN',
+            )
+            for i in range(1, 10)
+        ])
+        recalcular_resumo()
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def resumo(self):
+        return sorted(ResumoMensal.objects.filter(quantidade__gt=0).values_list('mes', 'status', 'quantidade', 'total'))
+
+    def test_selecionados_em_um_update_com_auditoria(self):
+        ids = list(Honorario.objects.order_by('id').values_list('id', flat=True)[:4])
+        with CaptureQueriesContext(connection) as contexto:
+            resposta = self.client.post(reverse('baixa_em_lote'), {'novo_status': 'PAG', 'escopo': 'selecionados', 'ids': ids})
+        self.assertEqual(resposta.status_code, 302)
+        updates = [q for q in contexto.captured_queries if q['sql'].startswith('UPDATE "financeiro_honorario"')]
+        self.assertEqual(len(updates), 1)
+
+        self.assertEqual(set(Honorario.objects.filter(status='PAG').values_list('id', flat=True)), set(ids))
+        historico = HistoricoStatusHonorario.objects.filter(honorario_id__in=ids)
+        self.assertEqual(historico.count(), 4)
+        self.assertTrue(all(h.status_anterior == 'PEN' and h.alterado_por == self.usuario for h in historico))
+
+        incremental = self.resumo()
+        recalcular_resumo()
+        self.assertEqual(incremental, self.resumo())
+
+    def test_por_filtro_ignora_quem_ja_esta_no_status(self):
+        Honorario.objects.filter(data_vencimento__month=1).update(status='CAN')
+        alterados = alterar_status_em_lote(Honorario.objects.filter(data_vencimento__lte=date(2026, 2, 28)), 'CAN', self.usuario)
+        self.assertEqual(alterados, 3)
+        self.assertEqual(HistoricoStatusHonorario.objects.count(), 3)
+
+    def test_filtro_vazio_nao_altera_tudo(self):
+        self.client.post(reverse('baixa_em_lote'), {'novo_status': 'PAG', 'escopo': 'filtro'})
+        self.assertFalse(Honorario.objects.filter(status='PAG').exists())
+
+    def test_baixa_muda_o_etag_da_listagem(self):
+        url = reverse('lista_honorarios')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 304)
+        # O UPDATE em lote não passa pelo auto_now: a baixa preenche atualizado_em
+        alterar_status_em_lote(Honorario.objects.filter(data_vencimento__month=1), 'PAG', self.usuario)
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 200)
+
+
+class EscritoriosFinanceiroTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('advogado', password='senha-teste')
+        vizinho = User.objects.create_user('vizinho', password='senha-teste')
+        dados = dict(estado_civil='S', cpf_cnpj='111', endereco='Rua', numero='1', cep='40000', profissao='X', contato='71')
+        cls.cliente = Cliente.objects.create(escritorio=cls.usuario.perfil.escritorio, nome_completo='Ana', **dados)
+        cls.cliente_vizinho = Cliente.objects.create(escritorio=vizinho.perfil.escritorio, nome_completo='Bia', **dados)
+        cls.nosso = Honorario.objects.create(cliente=cls.cliente, descricao='A', valor=10, data_vencimento=date(2026, 1, 10))
+        cls.alheio = Honorario.objects.create(
+            cliente=cls.cliente_vizinho, descricao='B', valor=20, data_vencimento=date(2026, 1, 10)
+        )
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def test_honorarios_e_relatorios_do_proprio_escritorio(self):
+        self.assertEqual(self.alheio.escritorio_id, self.cliente_vizinho.escritorio_id)
+        self.assertEqual(self.client.get(reverse('editar_honorario', args=[self.alheio.id])).status_code, 404)
+        resposta = self.client.get(reverse('lista_honorarios'))
+        self.assertEqual([honorario.id for honorario in resposta.context['honorarios']], [self.nosso.id])
+        fluxo = self.client.get(reverse('relatorios_honorarios'), {'ano': 2026}).context['fluxo']
+        self.assertEqual(fluxo[0]['a_receber'], Decimal('10'))
+
+    def test_baixa_em_lote_ignora_outro_escritorio(self):
+        self.client.post(reverse('baixa_em_lote'), {
+            'novo_status': 'PAG', 'escopo': 'selecionados', 'ids': [self.nosso.id, self.alheio.id],
+        })
+        self.assertEqual(Honorario.objects.get(pk=self.alheio.pk).status, 'PEN')
+        self.assertEqual(Honorario.objects.get(pk=self.nosso.pk).status, 'PAG')
+
+    def test_formulario_nao_aceita_cliente_de_outro_escritorio(self):
+        resposta = self.client.post(reverse('novo_honorario'), {
+            'cliente': self.cliente_vizinho.id, 'descricao': 'X', 'valor': '5', 'data_vencimento': '2026-02-01',
+            'status': 'PEN',
+        })
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn('cliente', resposta.context['form'].errors)
+
+    def test_formulario_com_cliente_invalido(self):
+        resposta = self.client.post(reverse('novo_honorario'), {
+            'cliente': 'abc', 'descricao': 'X', 'valor': '5', 'data_vencimento': '2026-02-01', 'status': 'PEN',
+        })
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn('cliente', resposta.context['form'].errors)
+        self.assertFalse(Honorario.objects.filter(descricao='X').exists())
+
+    def test_formulario_so_renderiza_o_cliente_escolhido(self):
+        Cliente.objects.create(
+            escritorio=self.usuario.perfil.escritorio, nome_completo='Carla Outra', estado_civil='S', cpf_cnpj='222',
+            endereco='Rua', numero='1', cep='40000', profissao='X', contato='71',
+        )
+        novo = self.client.get(reverse('novo_honorario')).content.decode()
+        self.assertNotIn('Carla Outra', novo)
+        self.assertIn('data-autocomplete="/clientes/buscar/?ativos=1"', novo)
+        self.assertIn('js/autocomplete_cliente.js', novo)
+        edicao = self.client.get(reverse('editar_honorario', args=[self.nosso.id])).content.decode()
+        self.assertIn(f'<option value="{self.cliente.id}" selected>Ana</option>', edicao)
+        self.assertNotIn('Carla Outra', edicao)
+
+
+class PainelTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.escritorio = Escritorio.objects.create(nome='Principal')
+        cls.cliente = Cliente.objects.create(escritorio=cls.escritorio, nome_completo='Ana', cpf_cnpj='111', estado_civil='S')
+        cls.honorario = Honorario.objects.create(
+            escritorio=cls.escritorio, cliente=cls.cliente, descricao='Consulta', valor=100,
+            data_vencimento=date(2026, 1, 10), status='PEN',
+        )
+
+    def setUp(self):
+        cache_painel().clear()
+
+    def test_salvar_honorario_invalida_os_totais(self):
+        self.assertEqual(obter_totais(self.escritorio.pk)['total_recebido'], 0)
+        with self.assertNumQueries(0):
+            obter_totais(self.escritorio.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.honorario.status = 'PAG'
+            self.honorario.save()
+        self.assertIsNone(cache_painel().get(chave_painel(self.escritorio.pk)))
+        self.assertEqual(obter_totais(self.escritorio.pk)['total_recebido'], 100)
 
-# Create your tests here.
+    def test_invalidacao_vale_para_outro_worker(self):
+        # Outro processo da máquina = outra instância do backend na mesma pasta
+        outro_worker = FileBasedCache(cache_painel()._dir, {})
+        obter_totais(self.escritorio.pk)
+        self.assertIsNotNone(outro_worker.get(chave_painel(self.escritorio.pk)))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.honorario.save()
+        self.assertIsNone(outro_worker.get(chave_painel(self.escritorio.pk)))
@@ -4,5 +4,10 @@ from . import views
 urlpatterns = [
     path('', views.lista_honorarios, name='lista_honorarios'),
     path('novo/', views.novo_honorario, name='novo_honorario'),
+    path('baixa-em-lote/', views.baixa_em_lote, name='baixa_em_lote'),
     path('editar/<int:id>/', views.editar_honorario, name='editar_honorario'),
+    path('relatorios/', views.relatorios_honorarios, name='relatorios_honorarios'),
+    path('planos/', views.lista_planos, name='lista_planos'),
+    path('planos/novo/', views.novo_plano, name='novo_plano'),
+    path('planos/editar/<int:id>/', views.editar_plano, name='editar_plano'),
 ]
\ No newline at end of file
@@ -1,16 +1,57 @@
 from django.shortcuts import render, redirect, get_object_or_404 
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from .models import Honorario
-from .forms import HonorarioForm
+from django.db import transaction
+from django.db.models import Count, Q
+from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.http import require_POST
+from core.assincrono import arender
+from core.condicional import condicional
+from core.models import Cliente
+from core.escritorios import aescritorio_da_requisicao, escritorio_da_requisicao
+from core.paginacao import apaginar_keyset, paginar_keyset
+from .models import Honorario, PlanoParcelamento
+from .forms import BaixaLoteForm, FiltroHonorariosForm, HonorarioForm, PlanoParcelamentoForm
+from .baixa import alterar_status_em_lote
+from . import parcelamento, relatorios
 
 @login_required
-def lista_honorarios(request):
-    honorarios = Honorario.objects.all().order_by('data_vencimento')
-    return render(request, 'financeiro/lista_honorarios.html', {'honorarios': honorarios})
+@condicional(Honorario, Cliente)
+async def lista_honorarios(request):
+    filtro = FiltroHonorariosForm(request.GET or None)
+    honorarios = await apaginar_keyset(
+        filtro.filtrar(Honorario.objects.do_escritorio(await aescritorio_da_requisicao(request)).select_related('cliente')),
+        ('data_vencimento', 'id'), request.GET.get('cursor')
+    )
+    parametros = request.GET.copy()
+    parametros.pop('cursor', None)
+    return await arender(request, 'financeiro/lista_honorarios.html', {
+        'honorarios': honorarios,
+        'filtro': filtro,
+        'parametros': parametros.urlencode(),
+    })
+
+@login_required
+@require_POST
+def baixa_em_lote(request):
+    form = BaixaLoteForm(request.POST, escritorio=escritorio_da_requisicao(request))
+    if not form.is_valid():
+        for erro in form.non_field_errors() or ["Operação em lote inválida."]:
+            messages.error(request, erro)
+    else:
+        status = form.cleaned_data['novo_status']
+        alterados = alterar_status_em_lote(form.honorarios(), status, request.user)
+        rotulo = dict(Honorario.STATUS_CHOICES)[status].lower()
+        messages.success(request, f"{alterados} honorário(s) marcado(s) como {rotulo}.")
+
+    # Volta para a listagem com o mesmo filtro
+    return redirect(f"{reverse('lista_honorarios')}?{request.POST.get('parametros', '')}")
 
 @login_required
 def novo_honorario(request):
-    form = HonorarioForm(request.POST or None)
+    escritorio = escritorio_da_requisicao(request)
+    form = HonorarioForm(request.POST or None, instance=Honorario(escritorio_id=escritorio), escritorio=escritorio)
     if form.is_valid():
         form.save()
         return redirect('lista_honorarios')
@@ -19,11 +60,77 @@ def novo_honorario(request):
 # --- NOVA FUNÇÃO PARA EDITAR/BAIXAR ---
 @login_required
 def editar_honorario(request, id):
-    honorario = get_object_or_404(Honorario, id=id)
-    form = HonorarioForm(request.POST or None, instance=honorario)
+    escritorio = escritorio_da_requisicao(request)
+    honorario = get_object_or_404(Honorario.objects.do_escritorio(escritorio), id=id)
+    form = HonorarioForm(request.POST or None, instance=honorario, escritorio=escritorio)
     
     if form.is_valid():
         form.save()
         return redirect('lista_honorarios')
         
-    return render(request, 'financeiro/form_honorario.html', {'form': form})
\ No newline at end of file
+    return render(request, 'financeiro/form_honorario.html', {'form': form})
+
+@login_required
+def relatorios_honorarios(request):
+    escritorio = escritorio_da_requisicao(request)
+    hoje = timezone.localdate()
+    try:
+        ano = int(request.GET.get('ano', hoje.year))
+    except ValueError:
+        ano = hoje.year
+
+    fluxo = relatorios.fluxo_mensal(escritorio, ano)
+    return render(request, 'financeiro/relatorios.html', {
+        'ano': ano,
+        'aging': relatorios.aging(escritorio, hoje),
+        'fluxo': fluxo,
+        'total_a_receber': sum(mes['a_receber'] for mes in fluxo),
+        'total_recebido': sum(mes['recebido'] for mes in fluxo),
+        'saldos': relatorios.saldos_por_cliente(escritorio),
+    })
+
+# ========================================================
+# PLANOS DE PARCELAMENTO
+# ========================================================
+
+@login_required
+def lista_planos(request):
+    planos = paginar_keyset(
+        PlanoParcelamento.objects.filter(cliente__escritorio=escritorio_da_requisicao(request))
+        .select_related('cliente').annotate(
+            parcelas_pagas=Count('parcelas', filter=Q(parcelas__status='PAG')),
+            parcelas_pendentes=Count('parcelas', filter=Q(parcelas__status='PEN')),
+        ),
+        ('-criado_em', '-id'), request.GET.get('cursor')
+    )
+    return render(request, 'financeiro/lista_planos.html', {'planos': planos})
+
+@login_required
+def novo_plano(request):
+    form = PlanoParcelamentoForm(request.POST or None, escritorio=escritorio_da_requisicao(request))
+    if form.is_valid():
+        with transaction.atomic():
+            plano = form.save()
+            parcelas = parcelamento.gerar_parcelas(plano)
+        messages.success(request, f"{len(parcelas)} parcela(s) lançada(s).")
+        return redirect('editar_plano', id=plano.id)
+    return render(request, 'financeiro/form_plano.html', {'form': form})
+
+@login_required
+def editar_plano(request, id):
+    escritorio = escritorio_da_requisicao(request)
+    # O plano não tem coluna própria de escritório: é o do cliente
+    plano = get_object_or_404(PlanoParcelamento.objects.filter(cliente__escritorio=escritorio), id=id)
+    form = PlanoParcelamentoForm(request.POST or None, instance=plano, escritorio=escritorio)
+    if form.is_valid():
+        with transaction.atomic():
+            plano = form.save()
+            criadas, atualizadas, removidas = parcelamento.sincronizar_parcelas(plano)
+        messages.success(
+            request,
+            f"Parcelas futuras atualizadas: {atualizadas} alterada(s), {criadas} criada(s), {removidas} removida(s)."
+        )
+        return redirect('editar_plano', id=plano.id)
+
+    parcelas = plano.parcelas.order_by('numero_parcela', 'id')
+    return render(request, 'financeiro/form_plano.html', {'form': form, 'plano': plano, 'parcelas': parcelas})